@@ -0,0 +1,94 @@
+"""add chat_turns and transfer_interviews tables
+
+Revision ID: 0002_chat_turns
+Revises: 0001_add_team_managers
+Create Date: 2026-10-17 09:00:00.000000
+"""
+import json
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = "0002_chat_turns"
+down_revision = "0001_add_team_managers"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "chat_turns",
+        sa.Column("transfer_id", sa.Integer(), nullable=False),
+        sa.Column("seq", sa.Integer(), autoincrement=False, nullable=False),
+        sa.Column("role", sa.String(length=20), nullable=False),
+        sa.Column("content", sa.Text(), nullable=False),
+        sa.Column("created_at", sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=False),
+        sa.ForeignKeyConstraint(["transfer_id"], ["transfers.id"], ondelete="CASCADE"),
+        sa.PrimaryKeyConstraint("transfer_id", "seq"),
+    )
+    op.create_table(
+        "transfer_interviews",
+        sa.Column("transfer_id", sa.Integer(), nullable=False),
+        sa.Column("state", sa.Text(), nullable=False),
+        sa.Column("turn_count", sa.Integer(), nullable=False, server_default="0"),
+        sa.Column("updated_at", sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=False),
+        sa.ForeignKeyConstraint(["transfer_id"], ["transfers.id"], ondelete="CASCADE"),
+        sa.PrimaryKeyConstraint("transfer_id"),
+    )
+    _backfill()
+
+
+def _backfill() -> None:
+    """Copia el estado JSON legado de transfers.manager_instructions a las tablas nuevas."""
+    conn = op.get_bind()
+    transfers = sa.table("transfers", sa.column("id", sa.Integer), sa.column("manager_instructions", sa.Text))
+    chat_turns = sa.table(
+        "chat_turns",
+        sa.column("transfer_id", sa.Integer),
+        sa.column("seq", sa.Integer),
+        sa.column("role", sa.String),
+        sa.column("content", sa.Text),
+    )
+    interviews = sa.table(
+        "transfer_interviews",
+        sa.column("transfer_id", sa.Integer),
+        sa.column("state", sa.Text),
+        sa.column("turn_count", sa.Integer),
+    )
+
+    for transfer_id, raw in conn.execute(sa.select(transfers.c.id, transfers.c.manager_instructions)):
+        try:
+            data = json.loads(raw or "")
+        except ValueError:
+            continue
+        if not isinstance(data, dict) or "pending_step" not in data:
+            continue  # instrucciones del manager en texto libre
+        thread = [t for t in (data.get("thread") or []) if isinstance(t, dict)]
+        if thread:
+            conn.execute(
+                chat_turns.insert(),
+                [
+                    {
+                        "transfer_id": transfer_id,
+                        "seq": i,
+                        "role": t.get("role", "assistant"),
+                        "content": t.get("content", ""),
+                    }
+                    for i, t in enumerate(thread)
+                ],
+            )
+        state = {k: data.get(k) for k in ("responsabilidades", "tareas", "pending_step", "last_assistant")}
+        conn.execute(
+            interviews.insert().values(
+                transfer_id=transfer_id,
+                state=json.dumps(state, ensure_ascii=False),
+                turn_count=len(thread),
+            )
+        )
+
+
+def downgrade() -> None:
+    op.drop_table("transfer_interviews")
+    op.drop_table("chat_turns")
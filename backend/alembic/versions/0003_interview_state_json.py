@@ -0,0 +1,73 @@
+"""interview state as JSON/JSONB with indexed derived columns
+
+Revision ID: 0003_interview_state_json
+Revises: 0002_chat_turns
+Create Date: 2026-10-17 10:00:00.000000
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision = "0003_interview_state_json"
+down_revision = "0002_chat_turns"
+branch_labels = None
+depends_on = None
+
+
+def _json_type() -> sa.types.TypeEngine:
+    return sa.JSON().with_variant(postgresql.JSONB(), "postgresql")
+
+
+def upgrade() -> None:
+    is_pg = op.get_bind().dialect.name == "postgresql"
+    with op.batch_alter_table("transfer_interviews") as batch_op:
+        batch_op.alter_column(
+            "state",
+            existing_type=sa.Text(),
+            type_=_json_type(),
+            existing_nullable=False,
+            postgresql_using="state::jsonb" if is_pg else None,
+        )
+        batch_op.add_column(
+            sa.Column("pending_step", sa.String(length=20), nullable=False, server_default="ask_resp")
+        )
+        batch_op.alter_column("updated_at", new_column_name="last_activity_at")
+    with op.batch_alter_table("transfer_interviews") as batch_op:
+        batch_op.create_index("ix_transfer_interviews_pending_step", ["pending_step"])
+        batch_op.create_index("ix_transfer_interviews_turn_count", ["turn_count"])
+        batch_op.create_index("ix_transfer_interviews_last_activity_at", ["last_activity_at"])
+
+    # Rellena la columna derivada a partir del JSON
+    interviews = sa.table(
+        "transfer_interviews",
+        sa.column("state", _json_type()),
+        sa.column("pending_step", sa.String),
+    )
+    if is_pg:
+        step_expr = interviews.c.state.op("->>")("pending_step")
+    else:
+        step_expr = sa.func.json_extract(interviews.c.state, "$.pending_step")
+    op.execute(
+        interviews.update()
+        .values(pending_step=sa.func.coalesce(step_expr, "ask_resp"))
+    )
+
+
+def downgrade() -> None:
+    is_pg = op.get_bind().dialect.name == "postgresql"
+    with op.batch_alter_table("transfer_interviews") as batch_op:
+        batch_op.drop_index("ix_transfer_interviews_last_activity_at")
+        batch_op.drop_index("ix_transfer_interviews_turn_count")
+        batch_op.drop_index("ix_transfer_interviews_pending_step")
+    with op.batch_alter_table("transfer_interviews") as batch_op:
+        batch_op.alter_column("last_activity_at", new_column_name="updated_at")
+        batch_op.drop_column("pending_step")
+        batch_op.alter_column(
+            "state",
+            existing_type=_json_type(),
+            type_=sa.Text(),
+            existing_nullable=False,
+            postgresql_using="state::text" if is_pg else None,
+        )
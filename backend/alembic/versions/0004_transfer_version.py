@@ -0,0 +1,25 @@
+"""transfer version column for optimistic concurrency
+
+Revision ID: 0004_transfer_version
+Revises: 0003_interview_state_json
+Create Date: 2026-10-17 11:00:00.000000
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = "0004_transfer_version"
+down_revision = "0003_interview_state_json"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    with op.batch_alter_table("transfers") as batch_op:
+        batch_op.add_column(sa.Column("version", sa.Integer(), nullable=False, server_default="1"))
+
+
+def downgrade() -> None:
+    with op.batch_alter_table("transfers") as batch_op:
+        batch_op.drop_column("version")
@@ -0,0 +1,24 @@
+"""composite indexes for keyset pagination
+
+Revision ID: 0006_keyset_indexes
+Revises: 0005_idempotency_keys
+Create Date: 2026-10-17 15:00:00.000000
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = "0006_keyset_indexes"
+down_revision = "0005_idempotency_keys"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_index("ix_transfers_created_at_id", "transfers", ["created_at", "id"])
+    op.create_index("ix_teams_project_id_id", "teams", ["project_id", "id"])
+
+
+def downgrade() -> None:
+    op.drop_index("ix_teams_project_id_id", table_name="teams")
+    op.drop_index("ix_transfers_created_at_id", table_name="transfers")
@@ -0,0 +1,29 @@
+"""row_counts table for cached list totals
+
+Revision ID: 0007_row_counts
+Revises: 0006_keyset_indexes
+Create Date: 2026-10-17 16:00:00.000000
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = "0007_row_counts"
+down_revision = "0006_keyset_indexes"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # Vacía: cada contador se calcula con COUNT(*) la primera vez que se pide
+    op.create_table(
+        "row_counts",
+        sa.Column("key", sa.String(length=255), primary_key=True),
+        sa.Column("value", sa.Integer(), nullable=False),
+        sa.Column("refreshed_at", sa.DateTime(), nullable=False),
+    )
+
+
+def downgrade() -> None:
+    op.drop_table("row_counts")
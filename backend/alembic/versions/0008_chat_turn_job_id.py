@@ -0,0 +1,27 @@
+"""chat_turns.job_id: turns written by a queued chat job
+
+Revision ID: 0008_chat_turn_job_id
+Revises: 0007_row_counts
+Create Date: 2026-10-17 18:00:00.000000
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = "0008_chat_turn_job_id"
+down_revision = "0007_row_counts"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    with op.batch_alter_table("chat_turns") as batch_op:
+        batch_op.add_column(sa.Column("job_id", sa.String(length=32), nullable=True))
+        batch_op.create_index("ix_chat_turns_job_id", ["job_id"])
+
+
+def downgrade() -> None:
+    with op.batch_alter_table("chat_turns") as batch_op:
+        batch_op.drop_index("ix_chat_turns_job_id")
+        batch_op.drop_column("job_id")
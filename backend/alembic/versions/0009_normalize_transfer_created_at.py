@@ -0,0 +1,30 @@
+"""normalize transfers.created_at text on SQLite for typed keyset cursors
+
+Revision ID: 0009_normalize_transfer_created_at
+Revises: 0008_chat_turn_job_id
+Create Date: 2026-10-17 19:00:00.000000
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = "0009_normalize_transfer_created_at"
+down_revision = "0008_chat_turn_job_id"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # Solo SQLite guarda las fechas como texto. CURRENT_TIMESTAMP escribe
+    # "YYYY-MM-DD HH:MM:SS"; SQLAlchemy escribe y compara con microsegundos.
+    # Con ambos formatos mezclados, el orden del texto no es el de las fechas
+    if op.get_bind().dialect.name != "sqlite":
+        return
+    op.execute(
+        "UPDATE transfers SET created_at = created_at || '.000000' WHERE length(created_at) = 19"
+    )
+
+
+def downgrade() -> None:
+    # Los valores normalizados siguen siendo válidos
+    pass
@@ -0,0 +1,176 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+from typing import Callable, Dict, List, Optional, Protocol, Tuple
+
+from app.core.config import Settings
+from app.core.metrics import metrics
+
+
+Extraction = Tuple[List[str], Dict[str, List[str]], str]
+
+
+def normalize_text(text: str) -> str:
+    """Normaliza el texto del usuario para la clave: NFC, espacios colapsados, sin líneas vacías."""
+    text = unicodedata.normalize("NFC", text or "")
+    lines = (" ".join(line.split()) for line in text.splitlines())
+    return "\n".join(line for line in lines if line)
+
+
+def cache_key(step: str, user_text: str, known_resps: List[str] | None, model: str) -> str:
+    """Clave de caché: (paso, texto normalizado, hash de known_resps, modelo)."""
+    resps_hash = hashlib.sha256(json.dumps(known_resps or [], ensure_ascii=False).encode("utf-8")).hexdigest()
+    raw = "\x1f".join([step, normalize_text(user_text), resps_hash, model])
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+class ExtractionCache(Protocol):
+    """Interfaz de caché de extracciones (enchufable en LLMAdapter)."""
+
+    def get(self, key: str) -> Optional[Extraction]: ...
+
+    def set(self, key: str, value: Extraction) -> None: ...
+
+
+def _dump(value: Extraction) -> str:
+    return json.dumps(list(value), ensure_ascii=False)
+
+
+def _load(raw: str) -> Extraction:
+    resps, tasks, assistant = json.loads(raw)
+    return list(resps), {str(k): list(v) for k, v in tasks.items()}, str(assistant)
+
+
+class MemoryLRUCache:
+    """LRU en memoria con TTL y tamaño máximo (por proceso)."""
+
+    def __init__(self, max_entries: int = 1024, ttl: float = 3600.0, clock: Callable[[], float] = time.monotonic) -> None:
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._data: "OrderedDict[str, Tuple[float, Extraction]]" = OrderedDict()
+
+    def get(self, key: str) -> Optional[Extraction]:
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                return None
+            expires_at, value = item
+            if expires_at <= self._clock():
+                del self._data[key]
+                metrics.inc("llm.cache.memory.expired")
+                return None
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key: str, value: Extraction) -> None:
+        with self._lock:
+            self._data[key] = (self._clock() + self.ttl, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+                metrics.inc("llm.cache.evictions")
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+
+class SQLiteCache:
+    """
+    Nivel en disco (SQLite) compartido entre workers del mismo host.
+    Las expiradas se ignoran al leer y se purgan al escribir.
+    """
+
+    def __init__(self, path: str, max_entries: int = 10000, ttl: float = 3600.0, clock: Callable[[], float] = time.time) -> None:
+        self.path = path
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._clock = clock
+        self._local = threading.local()
+        with self._conn() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS llm_extraction_cache ("
+                " key TEXT PRIMARY KEY, value TEXT NOT NULL, expires_at REAL NOT NULL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS ix_llm_cache_expires ON llm_extraction_cache (expires_at)")
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5.0)
+            conn.execute("PRAGMA journal_mode=WAL")
+            self._local.conn = conn
+        return conn
+
+    def get(self, key: str) -> Optional[Extraction]:
+        row = self._conn().execute(
+            "SELECT value FROM llm_extraction_cache WHERE key = ? AND expires_at > ?",
+            (key, self._clock()),
+        ).fetchone()
+        return _load(row[0]) if row else None
+
+    def set(self, key: str, value: Extraction) -> None:
+        now = self._clock()
+        with self._conn() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO llm_extraction_cache (key, value, expires_at) VALUES (?, ?, ?)",
+                (key, _dump(value), now + self.ttl),
+            )
+            expired = conn.execute("DELETE FROM llm_extraction_cache WHERE expires_at <= ?", (now,)).rowcount
+            overflow = conn.execute(
+                "DELETE FROM llm_extraction_cache WHERE key IN ("
+                " SELECT key FROM llm_extraction_cache ORDER BY expires_at DESC LIMIT -1 OFFSET ?)",
+                (self.max_entries,),
+            ).rowcount
+        if expired or overflow:
+            metrics.inc("llm.cache.evictions", expired + overflow)
+
+
+class TieredCache:
+    """Memoria primero; si falla, disco (y promociona a memoria). Cuenta hits/misses."""
+
+    def __init__(self, memory: MemoryLRUCache, disk: Optional[SQLiteCache] = None) -> None:
+        self.memory = memory
+        self.disk = disk
+
+    def get(self, key: str) -> Optional[Extraction]:
+        value = self.memory.get(key)
+        if value is not None:
+            metrics.inc("llm.cache.hits")
+            metrics.inc("llm.cache.memory.hits")
+            return value
+        if self.disk is not None:
+            value = self.disk.get(key)
+            if value is not None:
+                self.memory.set(key, value)
+                metrics.inc("llm.cache.hits")
+                metrics.inc("llm.cache.disk.hits")
+                return value
+        metrics.inc("llm.cache.misses")
+        return None
+
+    def set(self, key: str, value: Extraction) -> None:
+        self.memory.set(key, value)
+        if self.disk is not None:
+            self.disk.set(key, value)
+
+
+def build_extraction_cache(settings: Settings) -> Optional[ExtractionCache]:
+    if not settings.LLM_CACHE_ENABLED:
+        return None
+    memory = MemoryLRUCache(settings.LLM_CACHE_MAX_ENTRIES, settings.LLM_CACHE_TTL_SECONDS)
+    disk = None
+    if settings.LLM_CACHE_SQLITE_PATH:
+        disk = SQLiteCache(
+            settings.LLM_CACHE_SQLITE_PATH,
+            max_entries=settings.LLM_CACHE_SQLITE_MAX_ENTRIES,
+            ttl=settings.LLM_CACHE_TTL_SECONDS,
+        )
+    return TieredCache(memory, disk)
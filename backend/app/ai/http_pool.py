@@ -0,0 +1,88 @@
+from __future__ import annotations
+
+from typing import Any
+
+import httpx
+
+from app.core.config import Settings
+from app.core.metrics import metrics
+
+
+POOL_HITS = "llm.pool.hits"
+POOL_MISSES = "llm.pool.misses"
+
+
+def _limits(settings: Settings) -> httpx.Limits:
+    return httpx.Limits(
+        max_connections=settings.LLM_POOL_MAX_CONNECTIONS,
+        max_keepalive_connections=settings.LLM_POOL_MAX_KEEPALIVE,
+        keepalive_expiry=settings.LLM_POOL_KEEPALIVE_EXPIRY,
+    )
+
+
+def http_timeout(settings: Settings) -> httpx.Timeout:
+    return httpx.Timeout(
+        settings.LLM_READ_TIMEOUT,
+        connect=settings.LLM_CONNECT_TIMEOUT,
+    )
+
+
+class _Trace:
+    """Callback de traza de httpcore: detecta si la petición abrió conexión nueva."""
+
+    def __init__(self) -> None:
+        self.connected = False
+
+    def __call__(self, event_name: str, info: Any) -> None:
+        if event_name.startswith("connection.connect_tcp."):
+            self.connected = True
+
+
+class _AsyncTrace(_Trace):
+    """httpcore exige un callback async con el transporte async."""
+
+    async def __call__(self, event_name: str, info: Any) -> None:  # type: ignore[override]
+        _Trace.__call__(self, event_name, info)
+
+
+class CountingTransport(httpx.HTTPTransport):
+    """Transporte que cuenta reutilizaciones (hit) y conexiones nuevas (miss) del pool."""
+
+    def handle_request(self, request: httpx.Request) -> httpx.Response:
+        trace = _Trace()
+        request.extensions = {**request.extensions, "trace": trace}
+        response = super().handle_request(request)
+        metrics.inc(POOL_MISSES if trace.connected else POOL_HITS)
+        return response
+
+
+class AsyncCountingTransport(httpx.AsyncHTTPTransport):
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        trace = _AsyncTrace()
+        request.extensions = {**request.extensions, "trace": trace}
+        response = await super().handle_async_request(request)
+        metrics.inc(POOL_MISSES if trace.connected else POOL_HITS)
+        return response
+
+
+def build_http_client(settings: Settings) -> httpx.Client:
+    """Cliente HTTP persistente (keep-alive) con pool acotado para el proveedor LLM."""
+    limits = _limits(settings)
+    return httpx.Client(
+        transport=CountingTransport(limits=limits),
+        limits=limits,
+        timeout=http_timeout(settings),
+    )
+
+
+def build_async_http_client(settings: Settings) -> httpx.AsyncClient:
+    limits = _limits(settings)
+    return httpx.AsyncClient(
+        transport=AsyncCountingTransport(limits=limits),
+        limits=limits,
+        timeout=http_timeout(settings),
+    )
+
+
+def pool_stats() -> dict[str, int]:
+    return {"hits": metrics.counter(POOL_HITS), "misses": metrics.counter(POOL_MISSES)}
@@ -1,24 +1,35 @@
 from __future__ import annotations
 
-from typing import Dict, Callable
+from typing import Any, Callable, Dict
 
+from langchain_core.runnables import RunnableLambda  # type: ignore
 from langgraph.graph import StateGraph, START, END  # type: ignore
+from sqlalchemy.orm import Session
 
 from app.ai.langgraph.nodes import (
     node_start,
+    anode_start,
     node_process_user,
-    node_persist_factory,
+    anode_process_user,
+    node_persist,
+    anode_persist,
 )
 
 
-def build_start_app(db_session_getter: Callable, transfer_id: int):
+# Cada nodo tiene variante síncrona (invoke/stream) y async (ainvoke/astream)
+start_node = RunnableLambda(node_start, afunc=anode_start, name="start")
+process_user_node = RunnableLambda(node_process_user, afunc=anode_process_user, name="process_user")
+persist_node = RunnableLambda(node_persist, afunc=anode_persist, name="persist")
+
+
+def build_start_app():
     """
     Grafo para iniciar la entrevista (primer turno del asistente).
     START -> start -> persist -> END
     """
     graph = StateGraph(Dict)  # tipo de estado dict (serializable)
-    graph.add_node("start", node_start)
-    graph.add_node("persist", node_persist_factory(db_session_getter, transfer_id))
+    graph.add_node("start", start_node)
+    graph.add_node("persist", persist_node)
 
     graph.add_edge(START, "start")
     graph.add_edge("start", "persist")
@@ -26,16 +37,44 @@ def build_start_app(db_session_getter: Callable, transfer_id: int):
     return graph.compile()
 
 
-def build_message_app(db_session_getter: Callable, transfer_id: int):
+def build_message_app():
     """
     Grafo para procesar un mensaje del usuario.
     START -> process_user -> persist -> END
     """
     graph = StateGraph(Dict)
-    graph.add_node("process_user", node_process_user)
-    graph.add_node("persist", node_persist_factory(db_session_getter, transfer_id))
+    graph.add_node("process_user", process_user_node)
+    graph.add_node("persist", persist_node)
 
     graph.add_edge(START, "process_user")
     graph.add_edge("process_user", "persist")
     graph.add_edge("persist", END)
     return graph.compile()
+
+
+# Grafos compilados una sola vez por proceso. Lo específico de cada petición
+# (transfer_id, factoría de sesiones) viaja en config["configurable"].
+start_app = build_start_app()
+message_app = build_message_app()
+
+
+def graph_config(
+    transfer_id: int,
+    db_session_getter: Callable | None = None,
+    stream: bool = False,
+    db: Session | None = None,
+) -> Dict[str, Any]:
+    """
+    Config de invocación para los grafos precompilados.
+    db: sesión de la petición (unidad de trabajo única); tiene prioridad
+    sobre db_session_getter.
+    stream=True: el nodo process_user emite eventos por stream_mode="custom".
+    """
+    configurable: Dict[str, Any] = {"transfer_id": transfer_id}
+    if db is not None:
+        configurable["db"] = db
+    if db_session_getter is not None:
+        configurable["db_session_getter"] = db_session_getter
+    if stream:
+        configurable["stream"] = True
+    return {"configurable": configurable}
@@ -1,10 +1,22 @@
 from __future__ import annotations
 
-import json
-from typing import Dict, List
+import asyncio
+import contextvars
+import threading
+from concurrent.futures import Future, as_completed
+from functools import lru_cache
+from typing import Any, Callable, Dict, List, Optional, Tuple
 
-from app.ai.llm import get_llm_adapter, ASK_RESP_TEXT, REVIEW_TEXT
-from app.ai.langgraph.state import InterviewState
+import anyio
+from langchain_core.runnables import RunnableConfig  # type: ignore
+from langgraph.config import get_stream_writer  # type: ignore
+
+from app.ai.llm import get_llm_adapter, split_by_responsibility, ASK_RESP_TEXT, REVIEW_TEXT
+from app.ai.langgraph.state import ChatTurn, InterviewState
+from app.core.config import get_settings
+from app.core.executors import get_llm_executor
+
+Extraction = Tuple[List[str], Dict[str, List[str]], str]
 
 
 def node_start(state: Dict) -> Dict:
@@ -14,15 +26,178 @@ def node_start(state: Dict) -> Dict:
     s = InterviewState(**state)
     s.pending_step = "ask_resp"
     s.last_assistant = ASK_RESP_TEXT
-    s.thread.append({"role": "assistant", "content": s.last_assistant})
+    s.thread.append(ChatTurn(role="assistant", content=s.last_assistant))
     return s.model_dump()
 
 
-def node_process_user(state: Dict) -> Dict:
+async def anode_start(state: Dict) -> Dict:
+    return node_start(state)
+
+
+def node_process_user(state: Dict, config: RunnableConfig) -> Dict:
     """
     Procesa el último mensaje del usuario con ayuda del LLM (o heurística),
     actualiza responsabilidades/tareas y decide el siguiente paso.
+    Con config["configurable"]["stream"] reenvía tokens y bloques parciales
+    por el stream "custom" del grafo.
+    """
+    s, user_text = _begin_turn(state)
+    if not user_text:
+        return s.model_dump()
+
+    llm = get_llm_adapter()
+    chunks = _task_chunks(s, user_text)
+    if chunks:
+        on_done = _chunk_writer() if _wants_stream(config) else None
+        results = _extract_chunks(llm, chunks, on_done)
+        return _finish_chunks(s, chunks, results)
+
+    if _wants_stream(config):
+        writer = get_stream_writer()
+        result = ([], {}, "")
+        for event, data in llm.stream_extract(s.pending_step, user_text, known_resps=s.responsabilidades or []):
+            if event == "result":
+                result = data
+            else:
+                writer({"event": event, "data": data})
+        resps, tasks, assistant = result
+    else:
+        resps, tasks, assistant = llm.extract(s.pending_step, user_text, known_resps=s.responsabilidades or [])
+    return _finish_turn(s, resps, tasks, assistant)
+
+
+async def anode_process_user(state: Dict, config: RunnableConfig) -> Dict:
+    """Versión async de node_process_user (ainvoke/astream): la llamada al LLM no ocupa hilos."""
+    s, user_text = _begin_turn(state)
+    if not user_text:
+        return s.model_dump()
+
+    llm = get_llm_adapter()
+    chunks = _task_chunks(s, user_text)
+    if chunks:
+        on_done = _chunk_writer() if _wants_stream(config) else None
+        sem = asyncio.Semaphore(_chunk_limit(chunks))
+
+        async def _one(resp: str, text: str) -> Extraction:
+            async with sem:
+                result = await llm.aextract("ask_tasks", text, known_resps=[resp])
+            if on_done:
+                on_done(resp, result)
+            return result
+
+        results = await asyncio.gather(*(_one(resp, text) for resp, text in chunks))
+        return _finish_chunks(s, chunks, list(results))
+
+    if _wants_stream(config):
+        writer = get_stream_writer()
+        result = ([], {}, "")
+        async for event, data in llm.astream_extract(s.pending_step, user_text, known_resps=s.responsabilidades or []):
+            if event == "result":
+                result = data
+            else:
+                writer({"event": event, "data": data})
+        resps, tasks, assistant = result
+    else:
+        resps, tasks, assistant = await llm.aextract(s.pending_step, user_text, known_resps=s.responsabilidades or [])
+    return _finish_turn(s, resps, tasks, assistant)
+
+
+def _wants_stream(config: RunnableConfig) -> bool:
+    return bool((config or {}).get("configurable", {}).get("stream"))
+
+
+def _task_chunks(s: InterviewState, user_text: str) -> List[Tuple[str, str]]:
+    """Trozos por responsabilidad si aplica la extracción paralela de tareas."""
+    if s.pending_step != "ask_tasks" or not get_settings().LLM_TASKS_PARALLEL:
+        return []
+    return split_by_responsibility(user_text, s.responsabilidades)
+
+
+def _chunk_limit(chunks: List[Tuple[str, str]]) -> int:
+    return max(1, min(get_settings().LLM_TASKS_MAX_CONCURRENCY, len(chunks)))
+
+
+@lru_cache(maxsize=1)
+def _fanout_slots() -> threading.BoundedSemaphore:
+    """Hilos de llm-io que pueden ocupar los trozos (la mitad; el resto queda para los intentos)."""
+    return threading.BoundedSemaphore(max(1, get_settings().LLM_IO_THREADS // 2))
+
+
+def _extract_chunks(
+    llm: Any, chunks: List[Tuple[str, str]], on_done: Optional[Callable[[str, Extraction], None]]
+) -> List[Extraction]:
+    """
+    Extracción síncrona de los trozos, hasta _chunk_limit a la vez, en el
+    pool compartido de llm-io. Cada trozo llama a llm.extract, que lanza sus
+    intentos en ese mismo pool: para que nunca esperen a hilos ocupados por
+    trozos, estos no pasan de _fanout_slots y, si no hay hueco, el hilo del
+    llamante procesa el trozo él mismo.
     """
+    pool = get_llm_executor()
+    slots = _fanout_slots()
+    limit = _chunk_limit(chunks)
+    results: List[Optional[Extraction]] = [None] * len(chunks)
+    futures: Dict[Future, int] = {}
+
+    def _extract(i: int) -> Extraction:
+        resp, text = chunks[i]
+        return llm.extract("ask_tasks", text, [resp])
+
+    def _record(i: int, result: Extraction) -> None:
+        results[i] = result
+        if on_done:
+            on_done(chunks[i][0], result)
+
+    pending = list(reversed(range(len(chunks))))
+    while pending:
+        # El llamante cuenta como uno de los `limit` en curso
+        while pending and len(futures) < limit - 1 and slots.acquire(blocking=False):
+            i = pending.pop()
+            try:
+                # copy_context: los hilos heredan la prioridad LLM del llamante
+                fut = pool.submit(contextvars.copy_context().run, _extract, i)
+            except BaseException:
+                slots.release()
+                raise
+            fut.add_done_callback(lambda _: slots.release())
+            futures[fut] = i
+        if pending:
+            i = pending.pop()
+            _record(i, _extract(i))
+        for fut in [f for f in futures if f.done()]:
+            _record(futures.pop(fut), fut.result())
+    for fut in as_completed(futures):
+        _record(futures[fut], fut.result())
+    return results  # type: ignore[return-value]
+
+
+def _chunk_tasks(resp: str, result: Extraction) -> Dict[str, List[str]]:
+    # Cada trozo habla de una sola responsabilidad: sus tareas van a esa clave
+    return {resp: [t for ts in result[1].values() for t in ts]}
+
+
+def _chunk_writer() -> Callable[[str, Extraction], None]:
+    """Emite el bloque "tareas" acumulado cada vez que termina un trozo."""
+    writer = get_stream_writer()
+    done: Dict[str, List[str]] = {}
+
+    def _on_done(resp: str, result: Extraction) -> None:
+        done.update(_chunk_tasks(resp, result))
+        writer({"event": "tareas", "data": dict(done)})
+
+    return _on_done
+
+
+def _finish_chunks(s: InterviewState, chunks: List[Tuple[str, str]], results: List[Extraction]) -> Dict:
+    """Mezcla (en orden) las extracciones por responsabilidad y cierra el turno."""
+    for (resp, _), result in zip(chunks, results):
+        s.merge_tareas(_chunk_tasks(resp, result))
+    assistant = next((a for _, tasks, a in results if tasks), results[-1][2])
+    return _finish_turn(s, [], {}, assistant)
+
+
+def _begin_turn(state: Dict) -> Tuple[InterviewState, str]:
+    """Valida el estado y registra el turno del usuario (si lo hay)."""
     s = InterviewState(**state)
     user_text = (s.user_message or "").strip()
     if not user_text:
@@ -30,14 +205,17 @@ def node_process_user(state: Dict) -> Dict:
         s.last_assistant = s.last_assistant or (
             ASK_RESP_TEXT if s.pending_step == "ask_resp" else REVIEW_TEXT
         )
-        return s.model_dump()
+        return s, ""
 
     # Guarda turno del usuario
-    s.thread.append({"role": "user", "content": user_text})
+    s.thread.append(ChatTurn(role="user", content=user_text))
+    return s, user_text
 
-    llm = get_llm_adapter()
-    resps, tasks, assistant = llm.extract(s.pending_step, user_text, known_resps=s.responsabilidades or [])
 
+def _finish_turn(
+    s: InterviewState, resps: List[str], tasks: Dict[str, List[str]], assistant: str
+) -> Dict:
+    """Mezcla la extracción, decide el siguiente paso y añade el turno del asistente."""
     # Mezcla resultados
     if resps:
         s.merge_responsabilidades(resps)
@@ -55,38 +233,57 @@ def node_process_user(state: Dict) -> Dict:
             assistant = REVIEW_TEXT
 
     s.last_assistant = assistant or s.last_assistant or REVIEW_TEXT
-    s.thread.append({"role": "assistant", "content": s.last_assistant})
+    s.thread.append(ChatTurn(role="assistant", content=s.last_assistant))
     # Limpia mensaje temporal
     s.user_message = None
     return s.model_dump()
 
 
-def node_persist_factory(db_session_getter, transfer_id: int):
+def node_persist(state: Dict, config: RunnableConfig) -> Dict:
     """
-    Crea un nodo que persiste el estado en Transfer.manager_instructions (JSON).
-    db_session_getter: callable -> Session (por ejemplo, sessionmaker())
+    Persiste el estado: añade los turnos nuevos a chat_turns y actualiza la
+    fila de estructura (transfer_interviews). La escritura es compare-and-swap
+    sobre Transfer.version: si otra petición se adelantó, lanza
+    StaleInterviewError (la ruta responde 409).
+    config["configurable"]:
+      - transfer_id: id de la transferencia (obligatorio)
+      - db: sesión de la petición; si se pasa, se reutiliza (un solo commit
+        y sin segunda conexión) y no se cierra aquí
+      - db_session_getter: callable -> Session si no hay `db` (por defecto, SessionLocal)
     """
-    from app.models.transfer import Transfer  # import tardío
-
-    def _persist(state: Dict) -> Dict:
-        s = InterviewState(**state)
-        payload: Dict = {
-            "responsabilidades": s.responsabilidades,
-            "tareas": s.tareas,
-            "pending_step": s.pending_step,
-            "last_assistant": s.last_assistant,
-            "thread": s.thread,
-        }
+    from app.repositories.interview_cache import get_interview_cache
+    from app.repositories.interviews import save_interview_state
+
+    configurable = (config or {}).get("configurable", {})
+    transfer_id = configurable["transfer_id"]
+    db = configurable.get("db")
+    owns_session = db is None
+    if owns_session:
+        db_session_getter = configurable.get("db_session_getter")
+        if db_session_getter is None:
+            from app.db.session import SessionLocal  # import tardío
+
+            db_session_getter = SessionLocal
         db = db_session_getter()
-        try:
-            t = db.get(Transfer, transfer_id)
-            if not t:
-                raise ValueError(f"Transfer {transfer_id} no encontrada")
-            t.manager_instructions = json.dumps(payload, ensure_ascii=False)
-            db.add(t)
-            db.commit()
-        finally:
+
+    s = InterviewState(**state)
+    try:
+        s.version = save_interview_state(db, transfer_id, s)
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        if owns_session:
             db.close()
-        return s.model_dump()
+    # Write-through: el siguiente turno parte de este estado sin recargarlo
+    # (con los turnos ya guardados fuera de `thread`). La salida conserva los
+    # turnos de esta ejecución para la respuesta
+    saved = s.model_copy(update={"thread": [], "persisted_turns": s.persisted_turns + len(s.thread)})
+    get_interview_cache().put(transfer_id, s.version, saved)
+    return s.model_dump()
+
 
-    return _persist
+async def anode_persist(state: Dict, config: RunnableConfig) -> Dict:
+    """Versión async de node_persist: la escritura (SQLAlchemy síncrono) va a un hilo."""
+    return await anyio.to_thread.run_sync(node_persist, state, config)
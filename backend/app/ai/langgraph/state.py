@@ -1,7 +1,7 @@
 from __future__ import annotations
 
 from typing import Dict, List, Literal, Optional
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, ConfigDict, Field
 
 
 # Pasos del flujo de entrevista
@@ -9,6 +9,9 @@ Step = Literal["ask_resp", "ask_tasks", "review"]
 
 
 class ChatTurn(BaseModel):
+    # Inmutable: los turnos solo se añaden; las copias del estado los comparten
+    model_config = ConfigDict(frozen=True)
+
     role: Literal["user", "assistant"]
     content: str
 
@@ -16,7 +19,9 @@ class ChatTurn(BaseModel):
 class InterviewState(BaseModel):
     """
     Estado simplificado del flujo de entrevista para una transferencia.
-    Se serializa en JSON dentro de Transfer.manager_instructions (PoC).
+    Se persiste en chat_turns (hilo, append-only) y transfer_interviews (resto).
+    `thread` solo lleva los turnos de esta ejecución (seq desde
+    persisted_turns): el historial no viaja en el estado del grafo.
     """
     responsabilidades: List[str] = Field(default_factory=list)
     tareas: Dict[str, List[str]] = Field(default_factory=dict)  # {responsabilidad: [tareas]}
@@ -24,8 +29,14 @@ class InterviewState(BaseModel):
     last_assistant: Optional[str] = None
     thread: List[ChatTurn] = Field(default_factory=list)
 
-    # Campo temporal solo para la ejecución del grafo (no se persiste)
+    # Campos temporales solo para la ejecución del grafo (no se persisten)
     user_message: Optional[str] = None
+    # Nº de turnos ya guardados en chat_turns (= seq del primer turno de `thread`)
+    persisted_turns: int = 0
+    # Transfer.version leída al cargar (compare-and-swap al persistir)
+    version: int = 0
+    # Trabajo de la cola que ejecuta el turno (se anota en sus filas de chat_turns)
+    job_id: Optional[str] = None
 
     def merge_responsabilidades(self, nuevas: List[str]) -> None:
         if not nuevas:
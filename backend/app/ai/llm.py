@@ -1,9 +1,22 @@
 from __future__ import annotations
 
+import hashlib
 import json
+import logging
 import os
 import re
-from typing import Dict, List, Literal, Tuple
+import time
+from functools import lru_cache
+from typing import Any, AsyncIterator, Dict, Iterator, List, Literal, Tuple
+
+import httpx
+
+from app.ai.cache import ExtractionCache, build_extraction_cache, cache_key
+from app.ai.http_pool import build_http_client, build_async_http_client, http_timeout, pool_stats
+from app.ai.resilience import ResilientCaller
+from app.ai.scheduler import LLMScheduler, estimate_tokens
+from app.core.config import Settings, get_settings
+from app.core.metrics import metrics
 
 try:
     # Optional: only used if OPENAI_API_KEY is available
@@ -13,8 +26,12 @@ except Exception:  # pragma: no cover
     ChatOpenAI = None  # type: ignore
 
 
+logger = logging.getLogger("llm")
+
 Step = Literal["ask_resp", "ask_tasks", "review"]
 
+DEFAULT_OPENAI_BASE_URL = "https://api.openai.com/v1"
+
 
 SYSTEM_PROMPT = """Eres un asistente de entrevistas para traspasos (transfer learning) en español.
 Tu tarea es estructurar las respuestas del usuario en:
@@ -26,6 +43,9 @@ No añadas explicaciones ni texto fuera de JSON.
 Si el usuario solo aporta una parte (p.ej. responsabilidades), completa solo ese bloque.
 """
 
+# Forma parte de la clave de caché: cambiar el prompt invalida resultados previos
+PROMPT_VERSION = hashlib.sha256(SYSTEM_PROMPT.encode("utf-8")).hexdigest()[:12]
+
 ASK_RESP_TEXT = (
     "Para empezar, dime entre 2 y 5 RESPONSABILIDADES principales del puesto o persona. "
     "Usa viñetas o frases cortas (ej.: '- Coordinación de equipo')."
@@ -43,6 +63,71 @@ REVIEW_TEXT = (
 )
 
 
+# Encabezado "Responsabilidad: ..." en las respuestas de tareas
+RESP_PATTERN = re.compile(r"^(?:-?\s*)?(?:Responsabilidad|Resp)\s*[:\-]\s*(.+)$", re.I)
+_BULLET_PATTERN = re.compile(r"^\s*[-•*]\s+")
+
+
+def score_heuristic(
+    step: Step,
+    user_text: str,
+    known_resps: List[str] | None,
+    resps: List[str],
+    tasks: Dict[str, List[str]],
+) -> float:
+    """
+    Confianza (0..1) en el resultado del parser heurístico:
+    - ask_resp: líneas en viñetas, entre 2 y 7 responsabilidades, ninguna descartada
+    - ask_tasks: encabezados que casan con responsabilidades conocidas, todas
+      cubiertas y cada una con 2-7 tareas
+    En "review" no hay heurística útil: 0.
+    """
+    lines = [l for l in user_text.splitlines() if l.strip()]
+    if not lines:
+        return 0.0
+    if step == "ask_resp":
+        bullets = [l for l in lines if _BULLET_PATTERN.match(l)]
+        structure = len(bullets) / len(lines)
+        count_ok = 1.0 if 2 <= len(resps) <= 7 else 0.0
+        complete = 1.0 if resps and len(resps) == len(bullets) else 0.0
+        return round(0.4 * structure + 0.4 * count_ok + 0.2 * complete, 3)
+    if step == "ask_tasks":
+        known = known_resps or []
+        if not known or not tasks:
+            return 0.0
+        has_headers = any(RESP_PATTERN.match(l.strip()) for l in lines)
+        structure = 1.0 if has_headers and all(k in known for k in tasks) else 0.0
+        covered = [r for r in known if tasks.get(r)]
+        coverage = len(covered) / len(known)
+        counts_ok = sum(1 for r in covered if 2 <= len(tasks[r]) <= 7) / len(known)
+        return round(0.3 * structure + 0.3 * counts_ok + 0.4 * coverage, 3)
+    return 0.0
+
+
+def split_by_responsibility(text: str, known_resps: List[str] | None = None) -> List[Tuple[str, str]]:
+    """
+    Divide una respuesta de tareas por encabezados "Responsabilidad: ...".
+    Devuelve [(responsabilidad, trozo)] en orden; vacío si hay menos de dos
+    encabezados o si hay texto antes del primero (no se sabe a qué
+    responsabilidad pertenece: se extrae la respuesta entera). El nombre se
+    normaliza al de known_resps si coincide sin distinguir mayúsculas.
+    """
+    canon = {r.casefold(): r for r in known_resps or []}
+    chunks: List[Tuple[str, List[str]]] = []
+    for raw in (text or "").splitlines():
+        m = RESP_PATTERN.match(raw.strip())
+        if m:
+            name = m.group(1).strip().rstrip(":").strip()
+            chunks.append((canon.get(name.casefold(), name), [raw]))
+        elif chunks:
+            chunks[-1][1].append(raw)
+        elif raw.strip():
+            return []
+    if len(chunks) < 2:
+        return []
+    return [(name, "\n".join(lines)) for name, lines in chunks]
+
+
 def _fallback_parse_responsabilities(text: str) -> List[str]:
     lines = [l.strip("-•* ").strip() for l in text.splitlines()]
     cands = [l for l in lines if l and len(l.split()) <= 12]
@@ -55,14 +140,11 @@ def _fallback_parse_tasks(text: str, known_resps: List[str]) -> Dict[str, List[s
     tasks: Dict[str, List[str]] = {}
     current: str | None = None
 
-    # Intenta formato "Responsabilidad: ..."
-    resp_pattern = re.compile(r"^(?:-?\s*)?(?:Responsabilidad|Resp)\s*[:\-]\s*(.+)$", re.I)
-
     for raw in text.splitlines():
         line = raw.strip()
         if not line:
             continue
-        m = resp_pattern.match(line)
+        m = RESP_PATTERN.match(line)
         if m:
             current = m.group(1).strip()
             tasks.setdefault(current, [])
@@ -96,51 +178,389 @@ def _fallback_parse_tasks(text: str, known_resps: List[str]) -> Dict[str, List[s
     return tasks
 
 
-class LLMAdapter:
-    """Pequeño adaptador a LLM con fallback determinista sin clave."""
+def _parse_llm_json(content: str) -> Dict[str, Any]:
+    try:
+        data = json.loads(content)
+    except Exception:
+        # Intenta extraer bloque JSON con regex
+        m = re.search(r"\{.*\}", content, re.S)
+        data = json.loads(m.group(0)) if m else {}
+    return data if isinstance(data, dict) else {}
+
+
+def _structure_from_data(data: Dict[str, Any]) -> Tuple[List[str], Dict[str, List[str]], str]:
+    responsabilidades = list(map(str, data.get("responsabilidades", []) or []))[:7]
+    tareas_raw = data.get("tareas", {}) or {}
+    if not isinstance(tareas_raw, dict):
+        tareas_raw = {}
+    tareas: Dict[str, List[str]] = {str(k): [str(x) for x in (v or [])][:7] for k, v in tareas_raw.items()}
+    mensajes = data.get("mensajes", {}) or {}
+    assistant = str((mensajes.get("assistant") if isinstance(mensajes, dict) else "") or "")
+    return responsabilidades, tareas, assistant
+
+
+def _parse_partial_json(text: str) -> Dict[str, Any]:
+    """
+    Interpreta un documento JSON incompleto (streaming): corta en el último
+    valor completo y cierra las llaves/corchetes abiertos.
+    Devuelve {} si aún no hay nada legible.
+    """
+    start = text.find("{")
+    if start < 0:
+        return {}
+    doc = text[start:]
+
+    stack: List[str] = []  # "{" / "["
+    in_value: List[bool] = []  # por objeto: True tras ":" (esperando/leyendo valor)
+    in_str = False
+    escaped = False
+    safe_end = 0
+    safe_stack: List[str] = []
+
+    def _is_value_position() -> bool:
+        return not stack or stack[-1] == "[" or in_value[-1]
+
+    for i, ch in enumerate(doc):
+        if in_str:
+            if escaped:
+                escaped = False
+            elif ch == "\\":
+                escaped = True
+            elif ch == '"':
+                in_str = False
+                if _is_value_position():
+                    safe_end, safe_stack = i + 1, list(stack)
+            continue
+        if ch == '"':
+            in_str = True
+        elif ch in "{[":
+            stack.append(ch)
+            in_value.append(False)
+            safe_end, safe_stack = i + 1, list(stack)
+        elif ch in "}]":
+            if not stack:
+                break
+            stack.pop()
+            in_value.pop()
+            safe_end, safe_stack = i + 1, list(stack)
+            if not stack:
+                break
+        elif ch == ":" and stack and stack[-1] == "{":
+            in_value[-1] = True
+        elif ch == "," and stack and stack[-1] == "{":
+            in_value[-1] = False
+
+    if not safe_end:
+        return {}
+    closers = "".join("}" if c == "{" else "]" for c in reversed(safe_stack))
+    try:
+        data = json.loads(doc[:safe_end] + closers)
+    except Exception:
+        return {}
+    return data if isinstance(data, dict) else {}
+
+
+def _result_events(result: Tuple[List[str], Dict[str, List[str]], str]) -> Iterator[Tuple[str, Any]]:
+    """Eventos de streaming para un resultado ya completo (caché o fallback)."""
+    resps, tasks, _ = result
+    if resps:
+        yield "responsabilidades", resps
+    if tasks:
+        yield "tareas", tasks
+    yield "result", result
+
+
+class _PartialBlocks:
+    """
+    Acumula tokens de una respuesta JSON en streaming y emite los bloques
+    responsabilidades/tareas cada vez que cambian.
+    """
 
     def __init__(self) -> None:
-        self.has_openai = bool(os.environ.get("OPENAI_API_KEY")) and ChatOpenAI is not None
+        self.buf = ""
+        self._resps: List[str] = []
+        self._tasks: Dict[str, List[str]] = {}
+
+    def feed(self, token: str) -> List[Tuple[str, Any]]:
+        self.buf += token
+        # Solo puede completarse un valor al cerrar cadena/lista/objeto
+        if not any(c in token for c in '"]}'):
+            return []
+        events: List[Tuple[str, Any]] = []
+        resps, tasks, _ = _structure_from_data(_parse_partial_json(self.buf))
+        if resps and resps != self._resps:
+            self._resps = resps
+            events.append(("responsabilidades", resps))
+        if tasks and tasks != self._tasks:
+            self._tasks = tasks
+            events.append(("tareas", tasks))
+        return events
+
+    def result(self) -> Tuple[List[str], Dict[str, List[str]], str]:
+        return _structure_from_data(_parse_llm_json(self.buf))
+
+
+class LLMAdapter:
+    """
+    Pequeño adaptador a LLM con fallback determinista sin clave.
+    Se comparte por proceso (ver get_llm_adapter) para reutilizar el pool HTTP.
+    """
+
+    def __init__(self, settings: Settings | None = None, cache: ExtractionCache | None = None) -> None:
+        settings = settings or get_settings()
+        api_key = settings.OPENAI_API_KEY or os.environ.get("OPENAI_API_KEY")
+        self.has_openai = bool(api_key) and ChatOpenAI is not None
+        self.model = settings.OPENAI_MODEL
+        self._api_key = api_key
+        self._base_url = (settings.OPENAI_BASE_URL or DEFAULT_OPENAI_BASE_URL).rstrip("/")
         self._llm = None
+        self._http: httpx.Client | None = None
+        self._ahttp: httpx.AsyncClient | None = None
+        # "llm": siempre el proveedor; "hybrid": heurística si su puntuación es suficiente
+        self.extraction_mode = settings.LLM_EXTRACTION_MODE
+        self.hybrid_threshold = settings.LLM_HYBRID_THRESHOLD
+        # Caché de extracciones (solo resultados del LLM; el fallback es barato)
+        self.cache = cache if cache is not None else build_extraction_cache(settings)
+        # Plazo, reintentos, breaker y hedging alrededor de cada llamada al proveedor
+        self.resilience = ResilientCaller.from_settings(settings)
+        # Prioridad por clase (interactive > review > bulk) y cubos RPM/TPM del proveedor
+        self.scheduler = LLMScheduler.from_settings(settings)
         if self.has_openai:
-            # Modelo ligero para estructura; configurable por env var OPENAI_MODEL si se desea
-            model = os.environ.get("OPENAI_MODEL", "gpt-4o-mini")
-            self._llm = ChatOpenAI(model=model, temperature=0.1)  # type: ignore
+            # Cliente HTTP persistente: keep-alive entre turnos (sin nuevo handshake TLS)
+            self._http = build_http_client(settings)
+            self._ahttp = build_async_http_client(settings)
+            self._llm = ChatOpenAI(  # type: ignore
+                model=self.model,
+                temperature=0.1,
+                api_key=api_key,
+                base_url=self._base_url,
+                http_client=self._http,
+                http_async_client=self._ahttp,
+                timeout=http_timeout(settings),
+                max_retries=0,  # los reintentos los gestiona self.resilience
+            )
+
+    def warmup(self) -> bool:
+        """
+        Abre (y deja en el pool) la conexión con el proveedor.
+        Devuelve True si hubo respuesta HTTP; nunca lanza excepción.
+        """
+        if not self.has_openai or self._http is None:
+            return False
+        try:
+            self._http.get(f"{self._base_url}/models", headers={"Authorization": f"Bearer {self._api_key}"})
+            return True
+        except Exception:
+            logger.warning("Warmup del LLM fallido", exc_info=True)
+            return False
+
+    def pool_stats(self) -> Dict[str, int]:
+        return pool_stats()
+
+    def close(self) -> None:
+        self.resilience.close()
+        if self._http is not None:
+            self._http.close()
+
+    async def aclose(self) -> None:
+        """close() más el cliente async del pool (solo se puede cerrar desde un event loop)."""
+        self.close()
+        if self._ahttp is not None:
+            await self._ahttp.aclose()
+
+    def _cache_key(self, step: Step, user_text: str, known_resps: List[str] | None) -> str | None:
+        if self.cache is None:
+            return None
+        return cache_key(step, user_text, known_resps, f"{self.model}:{PROMPT_VERSION}")
+
+    def _cache_get(self, key: str | None) -> Tuple[List[str], Dict[str, List[str]], str] | None:
+        return self.cache.get(key) if (self.cache is not None and key) else None
+
+    def _cache_set(self, key: str | None, value: Tuple[List[str], Dict[str, List[str]], str]) -> None:
+        if self.cache is not None and key:
+            self.cache.set(key, value)
+
+    def _messages(self, user_text: str) -> list:
+        return [SystemMessage(content=SYSTEM_PROMPT), HumanMessage(content=user_text)]
+
+    def _tokens(self, user_text: str) -> int:
+        return estimate_tokens(SYSTEM_PROMPT, user_text)
 
     def _call_openai(self, user_text: str) -> Tuple[List[str], Dict[str, List[str]], str]:
         assert self._llm is not None
-        msgs = [SystemMessage(content=SYSTEM_PROMPT), HumanMessage(content=user_text)]
-        out = self._llm.invoke(msgs)  # type: ignore
+        out = self._llm.invoke(self._messages(user_text))  # type: ignore
         content = out.content if hasattr(out, "content") else str(out)
-        try:
-            data = json.loads(content)
-        except Exception:
-            # Intenta extraer bloque JSON con regex
-            m = re.search(r"\{.*\}", content, re.S)
-            data = json.loads(m.group(0)) if m else {}
+        return _structure_from_data(_parse_llm_json(content))
 
-        responsabilidades = list(map(str, data.get("responsabilidades", []) or []))[:7]
-        tareas_raw = data.get("tareas", {}) or {}
-        tareas: Dict[str, List[str]] = {str(k): [str(x) for x in (v or [])][:7] for k, v in tareas_raw.items()}
-        assistant = str(data.get("mensajes", {}).get("assistant") or "")
-        return responsabilidades, tareas, assistant
+    def _stream_openai(self, user_text: str) -> Iterator[str]:
+        """Itera los fragmentos de texto que devuelve el proveedor en streaming."""
+        assert self._llm is not None
+        for chunk in self._llm.stream(self._messages(user_text)):  # type: ignore
+            text = chunk.content if hasattr(chunk, "content") else str(chunk)
+            if text:
+                yield str(text)
 
     def extract(self, step: Step, user_text: str, known_resps: List[str] | None = None) -> Tuple[List[str], Dict[str, List[str]], str]:
         """
         Devuelve (responsabilidades, tareas, assistant_next_text).
         Si no hay clave de OpenAI, usa un parser heurístico.
+        En modo "hybrid" usa el parser heurístico también cuando su puntuación
+        supera LLM_HYBRID_THRESHOLD, sin llamar al LLM.
         """
-        if self.has_openai:
+        started = time.perf_counter()
+        key, result, route = self._pre_route(step, user_text, known_resps)
+        if result is None and route == "llm":
+            try:
+                with self.scheduler.slot(self._tokens(user_text)):
+                    raw = self.resilience.call(lambda: self._call_openai(user_text))
+                result = self._with_default_assistant(step, raw)
+                self._cache_set(key, result)
+            except Exception:
+                # cae al fallback
+                route = "fallback"
+        if result is None:
+            result = self._fallback_extract(step, user_text, known_resps)
+        self._record_route(step, route, started)
+        return result
+
+    def stream_extract(
+        self, step: Step, user_text: str, known_resps: List[str] | None = None
+    ) -> Iterator[Tuple[str, Any]]:
+        """
+        Variante en streaming de `extract`. Emite tuplas (evento, datos):
+        - ("token", str): fragmento de texto recibido del LLM
+        - ("responsabilidades", [...]) / ("tareas", {...}): bloques parciales
+          en cuanto se pueden leer del JSON aún incompleto
+        - ("result", (resps, tasks, assistant)): siempre el último evento
+        """
+        started = time.perf_counter()
+        key, result, route = self._pre_route(step, user_text, known_resps)
+        if result is None and route == "llm":
+            blocks = _PartialBlocks()
+            try:
+                with self.scheduler.slot(self._tokens(user_text)):
+                    for token in self.resilience.guard_stream(lambda: self._stream_openai(user_text)):
+                        yield "token", token
+                        yield from blocks.feed(token)
+                result = self._with_default_assistant(step, blocks.result())
+            except Exception:
+                # cae al fallback
+                route = "fallback"
+            else:
+                self._cache_set(key, result)
+                self._record_route(step, route, started)
+                yield "result", result
+                return
+        if result is None:
+            result = self._fallback_extract(step, user_text, known_resps)
+        self._record_route(step, route, started)
+        yield from _result_events(result)
+
+    # ---- Variante async (cliente async del proveedor; no ocupa hilos) ----
+
+    async def _acall_openai(self, user_text: str) -> Tuple[List[str], Dict[str, List[str]], str]:
+        assert self._llm is not None
+        out = await self._llm.ainvoke(self._messages(user_text))  # type: ignore
+        content = out.content if hasattr(out, "content") else str(out)
+        return _structure_from_data(_parse_llm_json(content))
+
+    async def _astream_openai(self, user_text: str) -> AsyncIterator[str]:
+        assert self._llm is not None
+        async for chunk in self._llm.astream(self._messages(user_text)):  # type: ignore
+            text = chunk.content if hasattr(chunk, "content") else str(chunk)
+            if text:
+                yield str(text)
+
+    async def aextract(
+        self, step: Step, user_text: str, known_resps: List[str] | None = None
+    ) -> Tuple[List[str], Dict[str, List[str]], str]:
+        """Versión async de `extract`."""
+        started = time.perf_counter()
+        key, result, route = self._pre_route(step, user_text, known_resps)
+        if result is None and route == "llm":
             try:
-                resps, tasks, assistant = self._call_openai(user_text)
-                if not assistant:
-                    assistant = ASK_TASKS_TEXT if step == "ask_resp" else REVIEW_TEXT
-                return resps, tasks, assistant
+                async with self.scheduler.aslot(self._tokens(user_text)):
+                    raw = await self.resilience.acall(lambda: self._acall_openai(user_text))
+                result = self._with_default_assistant(step, raw)
+                self._cache_set(key, result)
             except Exception:
                 # cae al fallback
-                pass
+                route = "fallback"
+        if result is None:
+            result = self._fallback_extract(step, user_text, known_resps)
+        self._record_route(step, route, started)
+        return result
+
+    async def astream_extract(
+        self, step: Step, user_text: str, known_resps: List[str] | None = None
+    ) -> AsyncIterator[Tuple[str, Any]]:
+        """Versión async de `stream_extract` (mismos eventos)."""
+        started = time.perf_counter()
+        key, result, route = self._pre_route(step, user_text, known_resps)
+        if result is None and route == "llm":
+            blocks = _PartialBlocks()
+            try:
+                async with self.scheduler.aslot(self._tokens(user_text)):
+                    async for token in self.resilience.aguard_stream(lambda: self._astream_openai(user_text)):
+                        yield "token", token
+                        for event in blocks.feed(token):
+                            yield event
+                result = self._with_default_assistant(step, blocks.result())
+            except Exception:
+                # cae al fallback
+                route = "fallback"
+            else:
+                self._cache_set(key, result)
+                self._record_route(step, route, started)
+                yield "result", result
+                return
+        if result is None:
+            result = self._fallback_extract(step, user_text, known_resps)
+        self._record_route(step, route, started)
+        for event in _result_events(result):
+            yield event
+
+    # ---- Enrutado: caché / heurística / LLM ----
+
+    def _pre_route(
+        self, step: Step, user_text: str, known_resps: List[str] | None
+    ) -> Tuple[str | None, Tuple[List[str], Dict[str, List[str]], str] | None, str]:
+        """
+        Decide cómo resolver la extracción antes de llamar al proveedor.
+        Devuelve (clave de caché, resultado si ya está resuelto, ruta):
+        ruta = "cache" | "heuristic" | "llm" | "fallback".
+        """
+        if not self.has_openai:
+            return None, None, "fallback"
+        key = self._cache_key(step, user_text, known_resps)
+        cached = self._cache_get(key)
+        if cached is not None:
+            return key, cached, "cache"
+        if self.extraction_mode == "hybrid":
+            heuristic = self._fallback_extract(step, user_text, known_resps)
+            score = score_heuristic(step, user_text, known_resps, heuristic[0], heuristic[1])
+            metrics.observe(f"llm.heuristic_score.{step}", score)
+            if score >= self.hybrid_threshold:
+                return key, heuristic, "heuristic"
+        return key, None, "llm"
+
+    def _record_route(self, step: Step, route: str, started: float) -> None:
+        metrics.inc(f"llm.route.{route}")
+        metrics.inc(f"llm.route.{step}.{route}")
+        metrics.observe(f"llm.extract.{step}.{route}", time.perf_counter() - started)
+
+    def _with_default_assistant(
+        self, step: Step, result: Tuple[List[str], Dict[str, List[str]], str]
+    ) -> Tuple[List[str], Dict[str, List[str]], str]:
+        resps, tasks, assistant = result
+        if not assistant:
+            assistant = ASK_TASKS_TEXT if step == "ask_resp" else REVIEW_TEXT
+        return resps, tasks, assistant
 
-        # Fallback determinista
+    def _fallback_extract(
+        self, step: Step, user_text: str, known_resps: List[str] | None = None
+    ) -> Tuple[List[str], Dict[str, List[str]], str]:
+        """Extracción determinista (sin LLM)."""
         resps: List[str] = []
         tasks: Dict[str, List[str]] = {}
 
@@ -157,5 +577,7 @@ class LLMAdapter:
         return resps, tasks, assistant
 
 
+@lru_cache(maxsize=1)
 def get_llm_adapter() -> LLMAdapter:
+    """Adaptador compartido por proceso (cliente y pool HTTP persistentes)."""
     return LLMAdapter()
@@ -0,0 +1,300 @@
+from __future__ import annotations
+
+import asyncio
+import random
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from typing import AsyncIterator, Awaitable, Callable, Iterator, Optional, Set, TypeVar, Union
+
+import httpx
+
+from app.core.config import Settings
+from app.core.executors import NamedExecutor, get_llm_executor
+from app.core.metrics import metrics
+
+try:
+    # Opcional: errores transitorios del SDK de OpenAI (conexión/timeout)
+    from openai import APIConnectionError  # type: ignore
+
+    _TRANSIENT_ERRORS: tuple = (TimeoutError, ConnectionError, httpx.TransportError, APIConnectionError)
+except Exception:  # pragma: no cover
+    _TRANSIENT_ERRORS = (TimeoutError, ConnectionError, httpx.TransportError)
+
+
+T = TypeVar("T")
+
+
+class CircuitOpenError(RuntimeError):
+    """El breaker está abierto: no se llama al proveedor (se usa el fallback)."""
+
+
+def is_retryable(exc: BaseException) -> bool:
+    """Timeouts, errores de red, 408/429 y 5xx. El resto (4xx, JSON...) no se reintenta."""
+    if isinstance(exc, _TRANSIENT_ERRORS):
+        return True
+    status = getattr(exc, "status_code", None)
+    if status is None:
+        status = getattr(getattr(exc, "response", None), "status_code", None)
+    return isinstance(status, int) and (status in (408, 429) or status >= 500)
+
+
+class CircuitBreaker:
+    """
+    Breaker clásico closed -> open -> half_open.
+    - closed: deja pasar; tras `failure_threshold` fallos seguidos se abre
+    - open: rechaza hasta que pasan `reset_timeout` segundos
+    - half_open: deja pasar una sola sonda; si va bien se cierra, si falla se reabre
+    """
+
+    def __init__(
+        self,
+        failure_threshold: int = 5,
+        reset_timeout: float = 30.0,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._clock = clock
+        self._lock = threading.Lock()
+        self.state = "closed"
+        self._failures = 0
+        self._opened_at = 0.0
+
+    def allow(self) -> bool:
+        with self._lock:
+            if self.state == "closed":
+                return True
+            if self.state == "open" and self._clock() - self._opened_at >= self.reset_timeout:
+                self.state = "half_open"
+                return True
+            metrics.inc("llm.breaker.rejected")
+            return False
+
+    def record_success(self) -> None:
+        with self._lock:
+            self.state = "closed"
+            self._failures = 0
+            metrics.set_gauge("llm.breaker.open", 0)
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self._failures += 1
+            if self.state == "half_open" or self._failures >= self.failure_threshold:
+                if self.state != "open":
+                    metrics.inc("llm.breaker.opened")
+                self.state = "open"
+                self._opened_at = self._clock()
+                metrics.set_gauge("llm.breaker.open", 1)
+
+
+class ResilientCaller:
+    """
+    Envuelve las llamadas al proveedor LLM:
+    - deadline total por llamada (incluye reintentos)
+    - reintentos acotados con backoff exponencial y jitter completo
+    - circuit breaker (abierto => CircuitOpenError sin llamar)
+    - hedging opcional: si no hay respuesta en `hedge_delay` s, lanza una
+      segunda petición idéntica y se queda con la primera que responda
+    """
+
+    def __init__(
+        self,
+        breaker: Optional[CircuitBreaker] = None,
+        deadline: float = 30.0,
+        attempts: int = 3,
+        base_delay: float = 0.2,
+        max_delay: float = 2.0,
+        hedge_delay: Optional[float] = None,
+        max_workers: int = 20,
+        rng: Callable[[], float] = random.random,
+        executor: Optional[NamedExecutor] = None,
+    ) -> None:
+        self.breaker = breaker or CircuitBreaker()
+        self.deadline = deadline
+        self.attempts = max(1, attempts)
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.hedge_delay = hedge_delay
+        self._rng = rng
+        self._max_workers = max_workers
+        # Ejecutor compartido (get_llm_executor) o, si no se pasa, un pool propio perezoso
+        self._shared = executor
+        self._pool: Optional[ThreadPoolExecutor] = None
+        self._pool_lock = threading.Lock()
+
+    @classmethod
+    def from_settings(cls, settings: Settings) -> "ResilientCaller":
+        return cls(
+            breaker=CircuitBreaker(settings.LLM_BREAKER_FAILURE_THRESHOLD, settings.LLM_BREAKER_RESET_SECONDS),
+            deadline=settings.LLM_CALL_DEADLINE,
+            attempts=settings.LLM_RETRY_ATTEMPTS,
+            base_delay=settings.LLM_RETRY_BASE_DELAY,
+            max_delay=settings.LLM_RETRY_MAX_DELAY,
+            hedge_delay=settings.LLM_HEDGE_DELAY,
+            executor=get_llm_executor(),
+        )
+
+    def backoff(self, attempt: int) -> float:
+        """Espera antes del reintento `attempt` (1, 2, ...): uniforme en [0, min(max, base*2^n)]."""
+        return self._rng() * min(self.max_delay, self.base_delay * (2 ** (attempt - 1)))
+
+    def close(self) -> None:
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
+
+    # ---- Síncrono ----
+
+    def call(self, fn: Callable[[], T]) -> T:
+        if not self.breaker.allow():
+            raise CircuitOpenError("LLM circuit breaker abierto")
+        deadline = time.monotonic() + self.deadline
+        attempt = 0
+        while True:
+            try:
+                result = self._attempt(fn, deadline - time.monotonic())
+            except Exception as exc:
+                attempt += 1
+                time.sleep(self._on_failure(exc, attempt, deadline))
+                continue
+            self.breaker.record_success()
+            return result
+
+    def _executor(self) -> Union[NamedExecutor, ThreadPoolExecutor]:
+        if self._shared is not None:
+            return self._shared
+        with self._pool_lock:
+            if self._pool is None:
+                self._pool = ThreadPoolExecutor(max_workers=self._max_workers, thread_name_prefix="llm-io")
+            return self._pool
+
+    def _attempt(self, fn: Callable[[], T], timeout: float) -> T:
+        # La llamada corre en un hilo del pool para poder abandonarla al vencer el plazo
+        pool = self._executor()
+        start = time.monotonic()
+        hedge_at = self.hedge_delay
+        primary = pool.submit(fn)
+        futures: Set[Future] = {primary}
+        error: Optional[BaseException] = None
+        while futures:
+            elapsed = time.monotonic() - start
+            wait_for = timeout - elapsed
+            if hedge_at is not None:
+                wait_for = min(wait_for, hedge_at - elapsed)
+            done, futures = wait(futures, timeout=max(0.0, wait_for), return_when=FIRST_COMPLETED)
+            for fut in done:
+                if fut.exception() is None:
+                    for other in futures:
+                        other.cancel()
+                    if fut is not primary:
+                        metrics.inc("llm.hedge.wins")
+                    return fut.result()
+                error = fut.exception()
+            if done:
+                continue
+            if hedge_at is not None and time.monotonic() - start < timeout:
+                metrics.inc("llm.hedge.sent")
+                futures.add(pool.submit(fn))
+                hedge_at = None
+                continue
+            metrics.inc("llm.timeouts")
+            raise TimeoutError(f"LLM sin respuesta en {timeout:.2f}s")
+        assert error is not None
+        raise error
+
+    # ---- Async ----
+
+    async def acall(self, fn: Callable[[], Awaitable[T]]) -> T:
+        if not self.breaker.allow():
+            raise CircuitOpenError("LLM circuit breaker abierto")
+        deadline = time.monotonic() + self.deadline
+        attempt = 0
+        while True:
+            try:
+                result = await self._aattempt(fn, deadline - time.monotonic())
+            except Exception as exc:
+                attempt += 1
+                await asyncio.sleep(self._on_failure(exc, attempt, deadline))
+                continue
+            self.breaker.record_success()
+            return result
+
+    async def _aattempt(self, fn: Callable[[], Awaitable[T]], timeout: float) -> T:
+        loop = asyncio.get_running_loop()
+        start = loop.time()
+        hedge_at = self.hedge_delay
+        primary = asyncio.ensure_future(fn())
+        tasks: Set[asyncio.Future] = {primary}
+        error: Optional[BaseException] = None
+        try:
+            while tasks:
+                elapsed = loop.time() - start
+                wait_for = timeout - elapsed
+                if hedge_at is not None:
+                    wait_for = min(wait_for, hedge_at - elapsed)
+                done, tasks = await asyncio.wait(tasks, timeout=max(0.0, wait_for), return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        if task is not primary:
+                            metrics.inc("llm.hedge.wins")
+                        return task.result()
+                    error = task.exception()
+                if done:
+                    continue
+                if hedge_at is not None and loop.time() - start < timeout:
+                    metrics.inc("llm.hedge.sent")
+                    tasks.add(asyncio.ensure_future(fn()))
+                    hedge_at = None
+                    continue
+                metrics.inc("llm.timeouts")
+                raise TimeoutError(f"LLM sin respuesta en {timeout:.2f}s")
+        finally:
+            # Las peticiones perdedoras o vencidas se cancelan de verdad
+            for task in tasks:
+                task.cancel()
+        assert error is not None
+        raise error
+
+    # ---- Streaming (sin reintentos: los tokens ya emitidos no se pueden deshacer) ----
+
+    def guard_stream(self, tokens: Callable[[], Iterator[str]]) -> Iterator[str]:
+        if not self.breaker.allow():
+            raise CircuitOpenError("LLM circuit breaker abierto")
+        try:
+            yield from tokens()
+        except Exception as exc:
+            self._record(exc)
+            raise
+        self.breaker.record_success()
+
+    async def aguard_stream(self, tokens: Callable[[], AsyncIterator[str]]) -> AsyncIterator[str]:
+        if not self.breaker.allow():
+            raise CircuitOpenError("LLM circuit breaker abierto")
+        try:
+            async for token in tokens():
+                yield token
+        except Exception as exc:
+            self._record(exc)
+            raise
+        self.breaker.record_success()
+
+    # ---- Comunes ----
+
+    def _record(self, exc: BaseException) -> bool:
+        """Un error no transitorio implica que el proveedor respondió: no cuenta para el breaker."""
+        if is_retryable(exc):
+            self.breaker.record_failure()
+            return True
+        self.breaker.record_success()
+        return False
+
+    def _on_failure(self, exc: Exception, attempt: int, deadline: float) -> float:
+        """Devuelve la espera antes del siguiente intento o relanza si no procede reintentar."""
+        if not self._record(exc):
+            raise exc
+        delay = self.backoff(attempt)
+        if attempt >= self.attempts or self.breaker.state != "closed" or time.monotonic() + delay >= deadline:
+            raise exc
+        metrics.inc("llm.retries")
+        return delay
@@ -0,0 +1,230 @@
+from __future__ import annotations
+
+import asyncio
+import bisect
+import itertools
+import threading
+import time
+from contextlib import asynccontextmanager, contextmanager
+from contextvars import ContextVar
+from typing import AsyncIterator, Callable, Dict, Iterator, List, Optional
+
+from app.core.config import Settings
+from app.core.metrics import metrics
+
+# Clases de trabajo LLM, de mayor a menor prioridad
+PRIORITIES: Dict[str, int] = {"interactive": 0, "review": 1, "bulk": 2}
+
+_priority: ContextVar[str] = ContextVar("llm_priority", default="interactive")
+
+
+@contextmanager
+def llm_priority(name: str) -> Iterator[None]:
+    """
+    Clase de prioridad de las llamadas al LLM hechas dentro del bloque
+    (p. ej. `with llm_priority("bulk"): ...` en un backfill). Por defecto "interactive".
+    """
+    if name not in PRIORITIES:
+        raise ValueError(f"Prioridad LLM desconocida: {name}")
+    token = _priority.set(name)
+    try:
+        yield
+    finally:
+        _priority.reset(token)
+
+
+def current_priority() -> str:
+    return _priority.get()
+
+
+def estimate_tokens(*texts: str, completion: int = 256) -> int:
+    """Estimación barata (~4 caracteres por token) más una reserva para la respuesta."""
+    return sum(len(t) for t in texts) // 4 + completion
+
+
+class TokenBucket:
+    """Cubo de `capacity` unidades por minuto, recargado de forma continua."""
+
+    def __init__(self, per_minute: float, clock: Callable[[], float] = time.monotonic) -> None:
+        self.capacity = float(per_minute)
+        self.rate = per_minute / 60.0
+        self._clock = clock
+        self._level = self.capacity
+        self._at = clock()
+
+    def _refill(self) -> None:
+        now = self._clock()
+        self._level = min(self.capacity, self._level + (now - self._at) * self.rate)
+        self._at = now
+
+    def wait_time(self, amount: float) -> float:
+        """Segundos hasta poder tomar `amount` (0 si ya se puede)."""
+        self._refill()
+        amount = min(amount, self.capacity)
+        return 0.0 if self._level >= amount else (amount - self._level) / self.rate
+
+    def take(self, amount: float) -> None:
+        self._level -= min(amount, self.capacity)
+
+
+class _Waiter:
+    __slots__ = ("order", "klass", "tokens", "wake", "granted")
+
+    def __init__(self, order: tuple, klass: str, tokens: int, wake: Callable[[], None]) -> None:
+        self.order = order
+        self.klass = klass
+        self.tokens = tokens
+        self.wake = wake
+        self.granted = False
+
+    def __lt__(self, other: "_Waiter") -> bool:
+        return self.order < other.order
+
+
+class LLMScheduler:
+    """
+    Reparto de llamadas al proveedor por clase de prioridad.
+    - Límite de concurrencia por clase (una clase llena no frena a las demás)
+    - Cubos RPM/TPM globales: si no hay saldo, el primero en la cola (el de
+      mayor prioridad) reserva el turno; nadie de menor prioridad se cuela
+    - Dentro de una clase, orden de llegada
+    Métricas: llm.scheduler.wait.<clase>, gauges llm.scheduler.active.<clase>
+    y llm.scheduler.waiting.
+    """
+
+    def __init__(
+        self,
+        limits: Dict[str, int],
+        rpm: Optional[int] = None,
+        tpm: Optional[int] = None,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self.limits = {name: limits.get(name, 1) for name in PRIORITIES}
+        self._clock = clock
+        self.requests = TokenBucket(rpm, clock) if rpm else None
+        self.tokens = TokenBucket(tpm, clock) if tpm else None
+        self._lock = threading.Lock()
+        self._active: Dict[str, int] = {name: 0 for name in PRIORITIES}
+        self._waiting: List[_Waiter] = []
+        self._seq = itertools.count()
+
+    @classmethod
+    def from_settings(cls, settings: Settings) -> "LLMScheduler":
+        return cls(
+            limits={
+                "interactive": settings.LLM_CONCURRENCY_INTERACTIVE,
+                "review": settings.LLM_CONCURRENCY_REVIEW,
+                "bulk": settings.LLM_CONCURRENCY_BULK,
+            },
+            rpm=settings.LLM_RATE_RPM,
+            tpm=settings.LLM_RATE_TPM,
+        )
+
+    def active(self, klass: str) -> int:
+        with self._lock:
+            return self._active[klass]
+
+    # ---- Núcleo (siempre con self._lock) ----
+
+    def _enqueue(self, klass: str, tokens: int, wake: Callable[[], None]) -> _Waiter:
+        if klass not in PRIORITIES:
+            raise ValueError(f"Prioridad LLM desconocida: {klass}")
+        waiter = _Waiter((PRIORITIES[klass], next(self._seq)), klass, tokens, wake)
+        bisect.insort(self._waiting, waiter)
+        return waiter
+
+    def _dispatch(self) -> Optional[float]:
+        """Concede los turnos posibles; devuelve la espera hasta recargar los cubos si bloquean."""
+        for waiter in list(self._waiting):
+            if self._active[waiter.klass] >= self.limits[waiter.klass]:
+                continue
+            delay = max(
+                self.requests.wait_time(1) if self.requests else 0.0,
+                self.tokens.wait_time(waiter.tokens) if self.tokens else 0.0,
+            )
+            if delay > 0:
+                self._gauges()
+                return delay
+            if self.requests:
+                self.requests.take(1)
+            if self.tokens:
+                self.tokens.take(waiter.tokens)
+            self._active[waiter.klass] += 1
+            self._waiting.remove(waiter)
+            waiter.granted = True
+            waiter.wake()
+        self._gauges()
+        return None
+
+    def _withdraw(self, waiter: _Waiter) -> None:
+        if waiter.granted:
+            self._active[waiter.klass] -= 1
+        else:
+            self._waiting.remove(waiter)
+        self._dispatch()
+
+    def _gauges(self) -> None:
+        metrics.set_gauge("llm.scheduler.waiting", len(self._waiting))
+        for name, n in self._active.items():
+            metrics.set_gauge(f"llm.scheduler.active.{name}", n)
+
+    def release(self, klass: str) -> None:
+        with self._lock:
+            self._active[klass] -= 1
+            self._dispatch()
+
+    # ---- Síncrono ----
+
+    @contextmanager
+    def slot(self, tokens: int = 0, klass: Optional[str] = None) -> Iterator[None]:
+        klass = klass or current_priority()
+        started = time.perf_counter()
+        event = threading.Event()
+        with self._lock:
+            waiter = self._enqueue(klass, tokens, event.set)
+            delay = self._dispatch()
+        while not event.is_set():
+            event.wait(delay)
+            with self._lock:
+                if not waiter.granted:
+                    delay = self._dispatch()
+        metrics.observe(f"llm.scheduler.wait.{klass}", time.perf_counter() - started)
+        try:
+            yield
+        finally:
+            self.release(klass)
+
+    # ---- Async ----
+
+    @asynccontextmanager
+    async def aslot(self, tokens: int = 0, klass: Optional[str] = None) -> AsyncIterator[None]:
+        klass = klass or current_priority()
+        started = time.perf_counter()
+        loop = asyncio.get_running_loop()
+        granted = loop.create_future()
+
+        def _wake() -> None:
+            # Puede llamarse desde otro hilo (release de una llamada síncrona)
+            loop.call_soon_threadsafe(lambda: granted.done() or granted.set_result(None))
+
+        with self._lock:
+            waiter = self._enqueue(klass, tokens, _wake)
+            delay = self._dispatch()
+        try:
+            while not waiter.granted or not granted.done():
+                try:
+                    await asyncio.wait_for(asyncio.shield(granted), delay)
+                except asyncio.TimeoutError:
+                    with self._lock:
+                        if not waiter.granted:
+                            delay = self._dispatch()
+        except BaseException:
+            # Cancelada mientras esperaba: deja la cola (o devuelve el turno si llegó a tiempo)
+            with self._lock:
+                self._withdraw(waiter)
+            raise
+        metrics.observe(f"llm.scheduler.wait.{klass}", time.perf_counter() - started)
+        try:
+            yield
+        finally:
+            self.release(klass)
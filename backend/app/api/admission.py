@@ -0,0 +1,175 @@
+from __future__ import annotations
+
+import asyncio
+import math
+import time
+from collections import OrderedDict, deque
+from contextlib import asynccontextmanager
+from functools import lru_cache
+from typing import AsyncIterator, Callable, Deque, Dict, Hashable, Optional
+
+from fastapi import Header, HTTPException
+
+from app.ai.scheduler import TokenBucket
+from app.api.deps import ALLOWED_ROLES
+from app.core.config import get_settings
+from app.core.metrics import metrics
+
+
+def _reject(status_code: int, reason: str, detail: str, retry_after: float) -> HTTPException:
+    metrics.inc(f"admission.rejected.{reason}")
+    return HTTPException(
+        status_code=status_code, detail=detail, headers={"Retry-After": str(max(1, math.ceil(retry_after)))}
+    )
+
+
+class AdmissionController:
+    """
+    Límite de peticiones en curso por worker con cola FIFO acotada.
+    - Hueco libre: entra directamente
+    - Cola llena, o espera estimada (media móvil del tiempo de servicio) por
+      encima de `queue_timeout`: 503 inmediato con Retry-After
+    - En cola más de `queue_timeout`: 503
+    Se rechaza antes de ejecutar nada: una petición descartada no llama al LLM.
+    """
+
+    def __init__(self, max_in_flight: int = 32, max_queue: int = 64, queue_timeout: float = 10.0) -> None:
+        self.max_in_flight = max_in_flight
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self.in_flight = 0
+        self._queue: Deque["asyncio.Future[None]"] = deque()
+        self._avg_service = 0.0  # segundos (EWMA)
+
+    def estimated_wait(self, position: int) -> float:
+        """Espera estimada para quien entra en la cola en `position` (0 = el siguiente)."""
+        return (position + 1) * self._avg_service / self.max_in_flight
+
+    def _gauges(self) -> None:
+        metrics.set_gauge("admission.in_flight", self.in_flight)
+        metrics.set_gauge("admission.queued", len(self._queue))
+
+    async def acquire(self) -> None:
+        if self.in_flight < self.max_in_flight and not self._queue:
+            self.in_flight += 1
+            self._gauges()
+            return
+        eta = self.estimated_wait(len(self._queue))
+        if len(self._queue) >= self.max_queue:
+            raise _reject(503, "queue_full", "Servicio saturado; reintenta más tarde", eta or self.queue_timeout)
+        if eta > self.queue_timeout:
+            raise _reject(503, "deadline", "Servicio saturado; reintenta más tarde", eta)
+
+        granted: "asyncio.Future[None]" = asyncio.get_running_loop().create_future()
+        self._queue.append(granted)
+        self._gauges()
+        started = time.perf_counter()
+        try:
+            await asyncio.wait_for(asyncio.shield(granted), self.queue_timeout)
+        except asyncio.TimeoutError:
+            if not granted.done():
+                granted.cancel()
+                raise _reject(503, "timeout", "Servicio saturado; reintenta más tarde", self.queue_timeout)
+        except BaseException:
+            # Cancelada en cola; si ya tenía el hueco, lo devuelve
+            if granted.done() and not granted.cancelled():
+                self.release()
+            granted.cancel()
+            raise
+        finally:
+            if granted in self._queue:
+                self._queue.remove(granted)
+            self._gauges()
+        metrics.observe("admission.wait", time.perf_counter() - started)
+
+    def release(self, service_time: Optional[float] = None) -> None:
+        if service_time is not None:
+            self._avg_service = service_time if not self._avg_service else 0.8 * self._avg_service + 0.2 * service_time
+        # El hueco pasa al siguiente de la cola (in_flight no cambia)
+        while self._queue:
+            nxt = self._queue.popleft()
+            if not nxt.done():
+                nxt.set_result(None)
+                self._gauges()
+                return
+        self.in_flight -= 1
+        self._gauges()
+
+
+class KeyedRateLimiter:
+    """Cubo de tokens por clave (rol, transferencia...), acotado a `max_keys` claves (LRU)."""
+
+    def __init__(self, per_minute: int, max_keys: int = 10000, clock: Callable[[], float] = time.monotonic) -> None:
+        self.per_minute = per_minute
+        self.max_keys = max_keys
+        self._clock = clock
+        self._buckets: "OrderedDict[Hashable, TokenBucket]" = OrderedDict()
+
+    def hit(self, key: Hashable) -> float:
+        """Consume una petición; devuelve 0 si se admite o los segundos a esperar."""
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            bucket = self._buckets[key] = TokenBucket(self.per_minute, self._clock)
+            while len(self._buckets) > self.max_keys:
+                self._buckets.popitem(last=False)
+        self._buckets.move_to_end(key)
+        wait = bucket.wait_time(1)
+        if wait == 0:
+            bucket.take(1)
+        return wait
+
+
+class ChatAdmission:
+    """Control de admisión de las rutas de chat: límites por rol y por transferencia + capacidad."""
+
+    def __init__(
+        self,
+        controller: AdmissionController,
+        role_limits: Optional[Dict[str, int]] = None,
+        transfer_limit: Optional[int] = None,
+    ) -> None:
+        self.controller = controller
+        self.role_limiters = {role: KeyedRateLimiter(n) for role, n in (role_limits or {}).items()}
+        self.transfer_limiter = KeyedRateLimiter(transfer_limit) if transfer_limit else None
+
+    def check_rate(self, role: str, transfer_id: int) -> None:
+        """429 + Retry-After si el rol o la transferencia superan su límite por minuto."""
+        limiter = self.role_limiters.get(role)
+        if limiter is not None:
+            wait = limiter.hit(role)
+            if wait:
+                raise _reject(429, "rate_role", f"Límite de peticiones para el rol {role}", wait)
+        if self.transfer_limiter is not None:
+            wait = self.transfer_limiter.hit(transfer_id)
+            if wait:
+                raise _reject(429, "rate_transfer", "Límite de mensajes para esta transferencia", wait)
+
+    @asynccontextmanager
+    async def admit(self, role: str, transfer_id: int) -> AsyncIterator[None]:
+        self.check_rate(role, transfer_id)
+        await self.controller.acquire()
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.controller.release(time.perf_counter() - started)
+
+
+@lru_cache(maxsize=1)
+def get_chat_admission() -> ChatAdmission:
+    """Instancia por proceso (worker); se inyecta con Depends en las rutas de chat."""
+    settings = get_settings()
+    return ChatAdmission(
+        AdmissionController(settings.CHAT_MAX_IN_FLIGHT, settings.CHAT_MAX_QUEUE, settings.CHAT_QUEUE_TIMEOUT),
+        role_limits={role.upper(): n for role, n in settings.CHAT_ROLE_RPM.items()},
+        transfer_limit=settings.CHAT_TRANSFER_RPM,
+    )
+
+
+def get_chat_role(x_role: str | None = Header(default=None)) -> str:
+    """
+    Rol de X-Role para los límites. Las rutas de chat no exigen ni validan el
+    rol: sin cabecera o con un valor desconocido se usa ANONYMOUS (sin 403).
+    """
+    role = (x_role or "").strip().upper()
+    return role if role in ALLOWED_ROLES else "ANONYMOUS"
@@ -1,7 +1,11 @@
+from typing import Any
+
 from fastapi import APIRouter
 
+from app.core.metrics import metrics
+
 # Los siguientes módulos serán añadidos como stubs:
-from app.api.routes import users, projects, teams, positions, auth, transfers, chat_transfer  # type: ignore[unused-import]
+from app.api.routes import users, projects, teams, positions, auth, transfers, chat_transfer, jobs, org_tree  # type: ignore[unused-import]
 
 api_router = APIRouter(prefix="/api/v1")
 
@@ -10,6 +14,12 @@ api_router = APIRouter(prefix="/api/v1")
 def health() -> dict[str, str]:
     return {"status": "ok"}
 
+
+# Métricas en proceso (contadores/gauges/tiempos) para diagnóstico
+@api_router.get("/metrics", tags=["health"])
+def get_metrics() -> dict[str, Any]:
+    return metrics.snapshot()
+
 # Rutas
 # Se incluirán con prefijos específicos
 try:
@@ -20,6 +30,8 @@ try:
     api_router.include_router(auth.router)  # type: ignore[attr-defined]
     api_router.include_router(transfers.router, prefix="/transfers", tags=["transfers"])  # type: ignore[attr-defined]
     api_router.include_router(chat_transfer.router, prefix="/chat-transfer", tags=["chat-transfer"])  # type: ignore[attr-defined]
+    api_router.include_router(jobs.router, prefix="/jobs", tags=["jobs"])  # type: ignore[attr-defined]
+    api_router.include_router(org_tree.router, prefix="/org-tree", tags=["org-tree"])  # type: ignore[attr-defined]
 except Exception:
     # Durante el bootstrap inicial puede no existir alguno; no romper la importación
     pass
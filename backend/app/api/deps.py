@@ -1,4 +1,4 @@
-from typing import Any, Dict, Tuple
+from typing import Any, Dict, Literal, Tuple
 
 from fastapi import Depends, Query, Header, HTTPException, status
 from sqlalchemy.orm import Session
@@ -57,10 +57,32 @@ def pagination_params(
     return page, size
 
 
+def cursor_param(
+    cursor: str | None = Query(
+        default=None,
+        description="Paginación por cursor (keyset): vacío para la primera página, luego el next_cursor recibido",
+    ),
+) -> str | None:
+    """Cursor opaco; None = paginación clásica por page."""
+    return cursor
+
+
+def include_total_param(
+    include_total: Literal["false", "approx", "exact"] = Query(
+        default="exact",
+        description="Total del listado: exact (COUNT, por defecto), approx (contador en caché, "
+        "puede ir algo retrasado) o false (sin total)",
+    ),
+) -> str:
+    return include_total
+
+
 __all__ = [
     "get_settings_dep",
     "get_db_dep",
     "pagination_params",
+    "cursor_param",
+    "include_total_param",
     "get_request_role",
     "require_roles",
 ]
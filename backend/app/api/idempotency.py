@@ -0,0 +1,172 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import re
+from functools import lru_cache
+from typing import Any, Dict, List, Optional, Pattern
+
+import anyio
+
+from app.core.config import get_settings
+from app.core.metrics import metrics
+from app.repositories.idempotency import IdempotencyStore
+
+HEADER = b"idempotency-key"
+MAX_KEY_LENGTH = 255
+
+# Rutas POST que aceptan Idempotency-Key (el streaming SSE no se guarda)
+IDEMPOTENT_PATHS: List[Pattern[str]] = [
+    re.compile(r"^/api/v1/(transfers|users|teams)/?$"),
+    re.compile(r"^/api/v1/chat-transfer/\d+/(start|message)$"),
+]
+
+# Respuestas que no se guardan: el cliente debe poder reintentar con la misma clave
+_RETRYABLE_STATUS = {409, 429}
+
+
+@lru_cache(maxsize=1)
+def get_idempotency_store() -> IdempotencyStore:
+    from app.db.session import SessionLocal  # import tardío
+
+    settings = get_settings()
+    return IdempotencyStore(
+        SessionLocal,
+        ttl=settings.IDEMPOTENCY_TTL_SECONDS,
+        max_entries=settings.IDEMPOTENCY_MAX_ENTRIES,
+    )
+
+
+def _request_hash(scope: Dict[str, Any], body: bytes) -> str:
+    # El rol y la query (?mode=, ?view=...) forman parte de la huella: la misma
+    # clave con otro X-Role u otros parámetros no reutiliza la respuesta
+    headers = dict(scope.get("headers") or [])
+    h = hashlib.sha256(headers.get(b"x-role", b"").strip().upper())
+    h.update(b"\x1f")
+    h.update(scope.get("query_string") or b"")
+    h.update(b"\x1f")
+    h.update(body)
+    return h.hexdigest()
+
+
+class IdempotencyMiddleware:
+    """
+    Middleware ASGI para la cabecera Idempotency-Key en IDEMPOTENT_PATHS.
+    - Primera petición: reserva la clave, ejecuta y guarda la respuesta
+      (salvo 5xx/409/429, que liberan la reserva).
+    - Repetición con el mismo cuerpo: devuelve la respuesta guardada sin
+      volver a ejecutar la ruta (ni el LLM ni las escrituras en BD).
+    - Repetición mientras la original sigue en curso: 409 + Retry-After.
+    - Misma clave con otro cuerpo o query string: 422.
+    """
+
+    def __init__(self, app: Any, store: Optional[IdempotencyStore] = None) -> None:
+        self.app = app
+        self._store = store
+
+    @property
+    def store(self) -> IdempotencyStore:
+        return self._store or get_idempotency_store()
+
+    async def __call__(self, scope: Dict[str, Any], receive: Any, send: Any) -> None:
+        if scope["type"] != "http" or scope["method"] != "POST" or not any(
+            p.match(scope["path"]) for p in IDEMPOTENT_PATHS
+        ):
+            await self.app(scope, receive, send)
+            return
+        raw_key = dict(scope.get("headers") or []).get(HEADER)
+        if not raw_key:
+            await self.app(scope, receive, send)
+            return
+        key = raw_key.decode("latin-1").strip()
+        if not key or len(key) > MAX_KEY_LENGTH:
+            await _send_json(send, 400, {"detail": "Idempotency-Key inválida"})
+            return
+
+        body = await _read_body(receive)
+        route = f"POST {scope['path'].rstrip('/')}"
+        outcome, stored = await anyio.to_thread.run_sync(
+            self.store.claim, route, key, _request_hash(scope, body)
+        )
+        if outcome == "replay":
+            metrics.inc("idempotency.replays")
+            status_code, content_type, stored_body = stored  # type: ignore[misc]
+            await _send_raw(send, status_code, content_type, stored_body.encode("utf-8"), replayed=True)
+            return
+        if outcome == "in_progress":
+            metrics.inc("idempotency.in_progress")
+            await _send_json(
+                send, 409, {"detail": "Petición con la misma Idempotency-Key en curso"}, retry_after=1
+            )
+            return
+        if outcome == "mismatch":
+            await _send_json(send, 422, {"detail": "Idempotency-Key reutilizada con otra petición"})
+            return
+
+        metrics.inc("idempotency.claims")
+        captured: Dict[str, Any] = {"status": 500, "content_type": None, "body": bytearray()}
+        body_sent = False
+
+        async def _replay_receive() -> Dict[str, Any]:
+            # El cuerpo ya se leyó: se entrega una vez; después, los mensajes reales (disconnect)
+            nonlocal body_sent
+            if body_sent:
+                return await receive()
+            body_sent = True
+            return {"type": "http.request", "body": body, "more_body": False}
+
+        async def _capture_send(message: Dict[str, Any]) -> None:
+            if message["type"] == "http.response.start":
+                captured["status"] = message["status"]
+                headers = dict(message.get("headers") or [])
+                ctype = headers.get(b"content-type")
+                captured["content_type"] = ctype.decode("latin-1") if ctype else None
+            elif message["type"] == "http.response.body":
+                captured["body"].extend(message.get("body", b""))
+            await send(message)
+
+        try:
+            await self.app(scope, _replay_receive, _capture_send)
+        except BaseException:
+            await anyio.to_thread.run_sync(self.store.release, route, key)
+            raise
+        status_code = captured["status"]
+        if status_code >= 500 or status_code in _RETRYABLE_STATUS:
+            await anyio.to_thread.run_sync(self.store.release, route, key)
+            return
+        response = (status_code, captured["content_type"], bytes(captured["body"]).decode("utf-8", "replace"))
+        await anyio.to_thread.run_sync(self.store.complete, route, key, response)
+
+
+async def _read_body(receive: Any) -> bytes:
+    chunks = []
+    more = True
+    while more:
+        message = await receive()
+        chunks.append(message.get("body", b""))
+        more = message.get("more_body", False)
+    return b"".join(chunks)
+
+
+async def _send_raw(
+    send: Any,
+    status_code: int,
+    content_type: Optional[str],
+    body: bytes,
+    replayed: bool = False,
+    retry_after: Optional[int] = None,
+) -> None:
+    headers = [(b"content-length", str(len(body)).encode())]
+    if content_type:
+        headers.append((b"content-type", content_type.encode("latin-1")))
+    if replayed:
+        headers.append((b"idempotent-replayed", b"true"))
+    if retry_after is not None:
+        headers.append((b"retry-after", str(retry_after).encode()))
+    await send({"type": "http.response.start", "status": status_code, "headers": headers})
+    await send({"type": "http.response.body", "body": body})
+
+
+async def _send_json(send: Any, status_code: int, data: Any, retry_after: Optional[int] = None) -> None:
+    body = json.dumps(data, ensure_ascii=False).encode("utf-8")
+    await _send_raw(send, status_code, "application/json", body, retry_after=retry_after)
@@ -0,0 +1,120 @@
+from __future__ import annotations
+
+from collections import defaultdict
+from typing import Any, Callable, Dict, Iterable, List, NamedTuple, Optional, Set, Type
+
+from fastapi import HTTPException, Query, status
+from pydantic import BaseModel
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from app.models.associations import team_managers
+from app.models.project import Project
+from app.models.user import User
+from app.schemas.project import ProjectRead
+from app.schemas.projection import dump_rows, schema_columns
+from app.schemas.user import UserRead
+
+# Relaciones embebidas en los listados (?include=) y campos dispersos
+# (?fields=). Cada relación se resuelve con UNA consulta "IN" sobre los ids
+# de la página (al estilo de selectinload): el número de sentencias SQL no
+# depende del tamaño de la página.
+
+
+def _load_projects(db: Session, ids: List[int]) -> Dict[int, Any]:
+    rows = db.execute(select(*schema_columns(Project, ProjectRead)).where(Project.id.in_(ids))).all()
+    return {row.id: item for row, item in zip(rows, dump_rows(ProjectRead, rows))}
+
+
+def _load_users(db: Session, ids: List[int]) -> Dict[int, Any]:
+    rows = db.execute(select(*schema_columns(User, UserRead)).where(User.id.in_(ids))).all()
+    return {row.id: item for row, item in zip(rows, dump_rows(UserRead, rows))}
+
+
+def _load_team_managers(db: Session, team_ids: List[int]) -> Dict[int, Any]:
+    rows = db.execute(
+        select(team_managers.c.team_id, *schema_columns(User, UserRead))
+        .select_from(User)
+        .join(team_managers, team_managers.c.user_id == User.id)
+        .where(team_managers.c.team_id.in_(team_ids))
+        .order_by(team_managers.c.team_id, User.id)
+    ).all()
+    managers: Dict[int, List[Any]] = defaultdict(list)
+    for row, item in zip(rows, dump_rows(UserRead, rows)):
+        managers[row.team_id].append(item)
+    # Equipo sin managers: lista vacía
+    return {tid: managers.get(tid, []) for tid in team_ids}
+
+
+class Embed(NamedTuple):
+    key: str  # atributo de la fila con el que se buscan los relacionados
+    load: Callable[[Session, List[int]], Dict[int, Any]]
+
+
+TEAM_EMBEDS: Dict[str, Embed] = {
+    "project": Embed("project_id", _load_projects),
+    "managers": Embed("id", _load_team_managers),
+}
+
+TRANSFER_EMBEDS: Dict[str, Embed] = {
+    "outgoing_user": Embed("outgoing_user_id", _load_users),
+}
+
+
+def _split(value: Optional[str]) -> List[str]:
+    return list(dict.fromkeys(v.strip() for v in (value or "").split(",") if v.strip()))
+
+
+def _check(names: Iterable[str], allowed: Iterable[str], param: str) -> None:
+    unknown = sorted(set(names) - set(allowed))
+    if unknown:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"{param} no válido: {', '.join(unknown)} (permitidos: {', '.join(allowed)})",
+        )
+
+
+def fields_param(schema: Type[BaseModel]):
+    """Dependency ?fields=a,b: subconjunto de campos de `schema` (el id siempre se devuelve)."""
+    allowed = list(schema.model_fields)
+
+    def _dep(
+        fields: Optional[str] = Query(
+            default=None, description=f"Campos a devolver, separados por comas: {', '.join(allowed)}"
+        ),
+    ) -> Optional[Set[str]]:
+        names = _split(fields)
+        if not names:
+            return None
+        _check(names, allowed, "fields")
+        return {"id", *names}
+
+    return _dep
+
+
+def include_param(embeds: Dict[str, Embed]):
+    """Dependency ?include=a,b: relaciones de `embeds` a embeber en cada elemento."""
+
+    def _dep(
+        include: Optional[str] = Query(
+            default=None, description=f"Relaciones a embeber, separadas por comas: {', '.join(embeds)}"
+        ),
+    ) -> List[str]:
+        names = _split(include)
+        _check(names, embeds, "include")
+        return names
+
+    return _dep
+
+
+def embed(
+    db: Session, items: List[Dict[str, Any]], rows: List[Any], include: List[str], embeds: Dict[str, Embed]
+) -> List[Dict[str, Any]]:
+    """Añade a cada elemento (alineado con su fila) las relaciones pedidas: una consulta por relación."""
+    for name in include:
+        spec = embeds[name]
+        keys = list(dict.fromkeys(getattr(row, spec.key) for row in rows))
+        found = spec.load(db, keys) if keys else {}
+        for item, row in zip(items, rows):
+            item[name] = found.get(getattr(row, spec.key))
+    return items
@@ -0,0 +1,96 @@
+from __future__ import annotations
+
+import base64
+import json
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from fastapi import HTTPException, status
+from sqlalchemy import Select, and_
+from sqlalchemy.orm import InstrumentedAttribute, Session
+
+# Paginación keyset (?cursor=): el cursor es opaco (base64 de los valores de
+# orden de la última fila). La siguiente página filtra por "después de esa
+# fila" con esos valores como parámetros, de modo que la BD busca en el
+# índice (SEARCH, no SCAN) en vez de OFFSET: una página profunda cuesta lo
+# mismo que la primera. Los valores se decodifican al tipo de la columna y
+# se comparan con su tipo nativo (timestamp en Postgres). En SQLite las
+# fechas son texto: las claves de orden deben guardarse con el mismo formato
+# que SQLAlchemy da a los parámetros (ver Transfer.created_at y la migración
+# 0009), o el orden del texto no coincidiría con el de las fechas.
+
+
+def encode_cursor(values: Sequence[Any]) -> str:
+    raw = [v.isoformat() if isinstance(v, datetime) else v for v in values]
+    return base64.urlsafe_b64encode(json.dumps(raw, separators=(",", ":")).encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str, keys: Sequence[InstrumentedAttribute]) -> List[Any]:
+    """Valores del cursor validados contra el tipo de cada columna; 400 si no es válido."""
+    try:
+        raw = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+        if not isinstance(raw, list) or len(raw) != len(keys):
+            raise ValueError(cursor)
+        values = []
+        for key, v in zip(keys, raw):
+            python_type = key.type.python_type
+            values.append(datetime.fromisoformat(v) if python_type is datetime else python_type(v))
+        return values
+    except (ValueError, TypeError, NotImplementedError):
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Cursor no válido")
+
+
+def _after(keys: Sequence[InstrumentedAttribute], values: Sequence[Any], descending: bool) -> List[Any]:
+    """
+    "Fila posterior al cursor" para el orden (k1, ..., id), con los valores
+    como parámetros, partida en un rango por clave y en el orden del listado.
+    Para (created_at, id) descendente: [created_at = :ts AND id < :id,
+    created_at < :ts]. Cada rango es una búsqueda directa en el índice
+    (created_at, id); con un OR, SQLite solo acota created_at y recorre todas
+    las filas empatadas.
+    """
+    ranges = []
+    for i in reversed(range(len(keys))):
+        step = keys[i] < values[i] if descending else keys[i] > values[i]
+        ranges.append(and_(*[keys[j] == values[j] for j in range(i)], step))
+    return ranges
+
+
+def keyset_page(
+    db: Session,
+    stmt: Select,
+    keys: Sequence[InstrumentedAttribute],
+    cursor: str,
+    size: int,
+    descending: bool = False,
+) -> Tuple[List[Any], Optional[str]]:
+    """
+    Ejecuta `stmt` (select de columnas) ordenado por
+    `keys` (la última debe ser el id) a partir de `cursor` ("" = desde el
+    principio). Devuelve (filas, next_cursor); como mucho una consulta por clave.
+    """
+    order = [key.desc() if descending else key.asc() for key in keys]
+    stmt = stmt.add_columns(*[key.label(f"keyset_{i}") for i, key in enumerate(keys)])
+    # Pide una fila de más para saber si hay página siguiente
+    if not cursor:
+        rows = db.execute(stmt.order_by(*order).limit(size + 1)).all()
+    else:
+        # Rangos consecutivos y disjuntos: se leen en orden hasta completar la página
+        rows = []
+        for after in _after(keys, decode_cursor(cursor, keys), descending):
+            rows += db.execute(stmt.where(after).order_by(*order).limit(size + 1 - len(rows))).all()
+            if len(rows) > size:
+                break
+    if len(rows) <= size:
+        return list(rows), None
+    last = rows[size - 1]
+    return list(rows[:size]), encode_cursor([getattr(last, f"keyset_{i}") for i in range(len(keys))])
+
+
+def list_response(items: List[Any], total: Optional[int], **extra: Any) -> Dict[str, Any]:
+    """Cuerpo de los listados; "total" solo si se calculó (include_total != false)."""
+    body: Dict[str, Any] = {"items": items}
+    if total is not None:
+        body["total"] = total
+    body.update(extra)
+    return body
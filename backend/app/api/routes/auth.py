@@ -1,11 +1,11 @@
+import anyio
 from fastapi import APIRouter, Depends, HTTPException, Header, status
 from pydantic import BaseModel, EmailStr
-from sqlalchemy import select
 from sqlalchemy.orm import Session
 
 from app.api.deps import get_db_dep
-from app.models.user import User
-from app.core.security import create_access_token, verify_password, decode_access_token
+from app.repositories.users import get_user_by_email
+from app.core.security import averify_password, create_access_token, decode_access_token
 
 router = APIRouter(prefix="/auth", tags=["auth"])
 
@@ -21,14 +21,16 @@ class TokenResponse(BaseModel):
 
 
 @router.post("/login", response_model=TokenResponse)
-def login(payload: LoginRequest, db: Session = Depends(get_db_dep)) -> TokenResponse:
+async def login(payload: LoginRequest, db: Session = Depends(get_db_dep)) -> TokenResponse:
     """
     Login real para PoC:
     - Valida email/contraseña contra la base de datos
     - Emite un token cuyo payload incluye el rol real del usuario
+    Async: la consulta va a un hilo y bcrypt al pool de hash, sin retener un
+    hilo del pool por defecto mientras se verifica la contraseña.
     """
-    user = db.execute(select(User).where(User.email == payload.email)).scalar_one_or_none()
-    if not user or not user.is_active or not verify_password(payload.password, user.hashed_password):
+    user = await anyio.to_thread.run_sync(get_user_by_email, db, payload.email)
+    if not user or not user.is_active or not await averify_password(payload.password, user.hashed_password):
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Credenciales inválidas")
 
     token = create_access_token(subject=user.email, role=user.role)
@@ -49,7 +51,7 @@ def me(
     payload = decode_access_token(token)
     if not payload or "sub" not in payload:
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Token inválido")
-    user = db.execute(select(User).where(User.email == payload["sub"])).scalar_one_or_none()
+    user = get_user_by_email(db, payload["sub"])
     if not user or not user.is_active:
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Usuario no válido")
     return {
@@ -1,92 +1,328 @@
 from __future__ import annotations
 
+import functools
 import json
-from typing import Any, Dict
+import logging
+from contextlib import AsyncExitStack
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, Literal, Optional, Tuple
 
-from fastapi import APIRouter, Depends, HTTPException, status
+import anyio
+from fastapi import APIRouter, Depends, HTTPException, Query, Response, status
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
 from sqlalchemy.orm import Session
+from starlette.types import Receive, Scope, Send
 
+from app.api.admission import ChatAdmission, get_chat_admission, get_chat_role
 from app.api.deps import get_db_dep  # roles opcionales en el futuro
+from app.core.coalesce import chat_coalescer
+from app.core.config import get_settings
+from app.core.locks import transfer_locks
+from app.core.metrics import metrics
 from app.db.session import SessionLocal
-from app.models.transfer import Transfer
+from app.repositories.interviews import (
+    StaleInterviewError,
+    get_interview_state,
+    job_turns,
+    list_turns,
+    read_thread,
+    transfer_version,
+)
 from app.ai.langgraph.state import InterviewState
-from app.ai.langgraph.flows import build_start_app, build_message_app
+from app.ai.langgraph.flows import start_app, message_app, graph_config
+from app.services.jobs import Job, get_job_pool
 
 router = APIRouter(tags=["chat-transfer"])
-
-
-def _load_state(t: Transfer) -> Dict[str, Any]:
-    raw = (t.manager_instructions or "").strip()
-    if not raw:
-        return InterviewState().model_dump()
-    try:
-        data = json.loads(raw)
-        # Normaliza al modelo
-        s = InterviewState(
-            responsabilidades=data.get("responsabilidades") or [],
-            tareas=data.get("tareas") or {},
-            pending_step=data.get("pending_step") or "ask_resp",
-            last_assistant=data.get("last_assistant"),
-            thread=[
-                {"role": turn.get("role", "assistant"), "content": turn.get("content", "")}
-                for turn in (data.get("thread") or [])
-                if isinstance(turn, dict)
-            ],
-        )
-        return s.model_dump()
-    except Exception:
-        # Si está corrupto, reinicia
-        return InterviewState().model_dump()
+logger = logging.getLogger("chat_transfer")
 
 
 class ChatMessage(BaseModel):
     message: str
 
 
-@router.post("/{transfer_id}/start", response_model=dict)
-def start_interview(
-    transfer_id: int,
-    db: Session = Depends(get_db_dep),
-) -> dict:
-    t = db.get(Transfer, transfer_id)
-    if not t:
-        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Transfer no encontrada")
-    state = _load_state(t)
+# view=full: estado completo (incluye todo el hilo); view=delta: solo los turnos
+# añadidos por esta petición + cursor (tamaño constante por turno)
+View = Literal["full", "delta"]
+VIEW_QUERY = Query("full", description="full: estado completo; delta: solo turnos nuevos y cursor")
 
-    app = build_start_app(lambda: SessionLocal(), transfer_id)
-    out: Dict[str, Any] = app.invoke(state)  # type: ignore
-    return {
+
+def _chat_response(out: Dict[str, Any], view: View = "full", base: int = 0) -> Dict[str, Any]:
+    """
+    Respuesta de los endpoints de chat. `out["thread"]` son los turnos que
+    escribió esta petición (seq desde base); en modo full debe llegar ya con
+    el hilo completo (ver _full_view). En modo delta, `turns` son esos turnos
+    y `cursor` el seq del último, para seguir con GET /{id}/thread?after=cursor.
+    """
+    data: Dict[str, Any] = {
         "assistant": out.get("last_assistant"),
         "pending_step": out.get("pending_step"),
         "responsabilidades": out.get("responsabilidades", []),
         "tareas": out.get("tareas", {}),
-        "state": out,
     }
+    if view == "full":
+        data["state"] = out
+        return data
+    thread = out.get("thread", [])
+    data["turns"] = [
+        {"seq": base + i, "role": turn["role"], "content": turn["content"]} for i, turn in enumerate(thread)
+    ]
+    end = base + len(thread)
+    data["cursor"] = end - 1 if end else None
+    return data
+
+
+def _full_view_sync(db: Session, transfer_id: int, out: Dict[str, Any], base: int) -> Dict[str, Any]:
+    return dict(out, thread=read_thread(db, transfer_id, base + len(out.get("thread", []))))
+
+
+async def _respond(db: Session, transfer_id: int, out: Dict[str, Any], view: View, base: int) -> Dict[str, Any]:
+    """_chat_response; view=full lee el hilo completo (el grafo solo lleva los turnos nuevos)."""
+    if view == "full":
+        out = await anyio.to_thread.run_sync(_full_view_sync, db, transfer_id, out, base)
+    return _chat_response(out, view, base)
+
+
+def _sse(event: str, data: Any) -> str:
+    """Serializa un evento Server-Sent Events."""
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+
+def _load_state_sync(db: Session, transfer_id: int) -> InterviewState | None:
+    state = get_interview_state(db, transfer_id)
+    # Termina la transacción de lectura (no hay cambios que confirmar): la
+    # conexión vuelve al pool durante la llamada al LLM y el nodo persist
+    # la retoma con esta misma sesión para el único commit
+    db.rollback()
+    return state
+
+
+async def _load_state(db: Session, transfer_id: int) -> InterviewState:
+    # SQLAlchemy es síncrono: la lectura va a un hilo para no bloquear el event loop
+    state = await anyio.to_thread.run_sync(_load_state_sync, db, transfer_id)
+    if state is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Transfer no encontrada")
+    return state
+
+
+CONFLICT_DETAIL = "La transferencia cambió durante el turno; reintenta"
+
+
+async def _ainvoke(graph: Any, state: Dict[str, Any], config: Dict[str, Any]) -> Dict[str, Any]:
+    """Ejecuta el grafo; un compare-and-swap fallido se traduce en 409 reintentable."""
+    try:
+        return await graph.ainvoke(state, config=config)
+    except StaleInterviewError:
+        metrics.inc("chat.conflicts")
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT, detail=CONFLICT_DETAIL, headers={"Retry-After": "1"}
+        )
+
+
+@router.post("/{transfer_id}/start", response_model=dict)
+async def start_interview(
+    transfer_id: int,
+    view: View = VIEW_QUERY,
+    db: Session = Depends(get_db_dep),
+    role: str = Depends(get_chat_role),
+    admission: ChatAdmission = Depends(get_chat_admission),
+) -> dict:
+    # Admisión antes de nada: una petición rechazada no llega a llamar al LLM.
+    # Un turno a la vez por transferencia: las peticiones concurrentes esperan
+    async with admission.admit(role, transfer_id), transfer_locks.hold(transfer_id):
+        state = await _load_state(db, transfer_id)
+        out = await _ainvoke(start_app, state.model_dump(), graph_config(transfer_id, db=db))
+    return await _respond(db, transfer_id, out, view, state.persisted_turns)
+
+
+async def _message_turn(
+    db: Session, transfer_id: int, message: str, job_id: Optional[str] = None
+) -> Tuple[Dict[str, Any], int]:
+    """
+    Un turno de usuario completo; devuelve (estado final, nº de turnos previos).
+    Con job_id (trabajo de la cola), los turnos se anotan con él; si ese
+    trabajo ya guardó su turno (reclamado otra vez tras caerse el proceso
+    antes de marcarlo como hecho), lo devuelve sin volver a ejecutarlo.
+    """
+    async with transfer_locks.hold(transfer_id):
+        done = None
+        if job_id is not None:
+            done = await anyio.to_thread.run_sync(job_turns, db, transfer_id, job_id)
+        # Carga dentro del lock: incluye el turno de la petición anterior
+        s = await _load_state(db, transfer_id)
+        if done is not None:
+            metrics.inc("jobs.replayed")
+            base, thread = done
+            return dict(s.model_dump(), thread=thread), base
+        # Inserta el último mensaje del usuario en el estado
+        s.user_message = message
+        s.job_id = job_id
+        out = await _ainvoke(message_app, s.model_dump(), graph_config(transfer_id, db=db))
+    return out, s.persisted_turns
+
+
+async def _detached_message_turn(transfer_id: int, message: str) -> Tuple[Dict[str, Any], int]:
+    """
+    _message_turn con sesión propia, para turnos que pueden sobrevivir a la
+    petición que los lanzó (lotes de chat_coalescer): la sesión inyectada se
+    cierra al terminar esa petición y no se puede compartir con el lote.
+    """
+    db = SessionLocal()
+    try:
+        return await _message_turn(db, transfer_id, message)
+    finally:
+        db.close()
+
+
+async def run_message_job(job: Job) -> Dict[str, Any]:
+    """Turno encolado por /message?mode=async; lo ejecuta un worker con sesión propia."""
+    db = SessionLocal()
+    try:
+        out, base = await _message_turn(db, job.transfer_id, job.message, job_id=job.id)
+        return await _respond(db, job.transfer_id, out, job.view, base)  # type: ignore[arg-type]
+    finally:
+        db.close()
 
 
 @router.post("/{transfer_id}/message", response_model=dict)
-def user_message(
+async def user_message(
     transfer_id: int,
     payload: ChatMessage,
+    response: Response,
+    view: View = VIEW_QUERY,
+    mode: Literal["sync", "async"] = Query("sync", description="async: encola el turno y responde 202 con job_id"),
     db: Session = Depends(get_db_dep),
+    role: str = Depends(get_chat_role),
+    admission: ChatAdmission = Depends(get_chat_admission),
 ) -> dict:
-    t = db.get(Transfer, transfer_id)
-    if not t:
+    if mode == "async":
+        # Encolar es barato: solo límites de ritmo (la cola de trabajos acota la concurrencia)
+        admission.check_rate(role, transfer_id)
+        if await anyio.to_thread.run_sync(transfer_version, db, transfer_id) is None:
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Transfer no encontrada")
+        job_id = await get_job_pool().submit(transfer_id, payload.message, view)
+        response.status_code = status.HTTP_202_ACCEPTED
+        response.headers["Location"] = f"/api/v1/jobs/{job_id}"
+        return {"job_id": job_id, "status": "queued"}
+
+    window_ms = get_settings().CHAT_COALESCE_WINDOW_MS
+    async with admission.admit(role, transfer_id):
+        if window_ms > 0:
+            # Mensajes en ráfaga: un solo turno (una extracción) y la misma respuesta para todos.
+            # El lote no usa `db`: puede seguir cuando esta petición ya terminó
+            run = functools.partial(_detached_message_turn, transfer_id)
+            out, base = await chat_coalescer.submit(transfer_id, payload.message, run, window_ms / 1000)
+        else:
+            out, base = await _message_turn(db, transfer_id, payload.message)
+    return await _respond(db, transfer_id, out, view, base)
+
+
+class _AdmittedStreamingResponse(StreamingResponse):
+    """
+    StreamingResponse que libera el hueco de admisión al terminar de
+    responder, en un único punto: fin normal, error o desconexión (aunque el
+    generador no llegue a arrancar).
+    """
+
+    def __init__(self, content: AsyncIterator[str], release: Callable[[], Awaitable[Any]], **kwargs: Any) -> None:
+        super().__init__(content, **kwargs)
+        self._release = release
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        try:
+            await super().__call__(scope, receive, send)
+        finally:
+            await self._release()
+
+
+@router.post("/{transfer_id}/message/stream")
+async def user_message_stream(
+    transfer_id: int,
+    payload: ChatMessage,
+    view: View = VIEW_QUERY,
+    db: Session = Depends(get_db_dep),
+    role: str = Depends(get_chat_role),
+    admission: ChatAdmission = Depends(get_chat_admission),
+) -> StreamingResponse:
+    """
+    Variante SSE de /message. Eventos (en orden):
+    - accepted: mensaje recibido (primer byte inmediato)
+    - token: fragmentos de texto del LLM según llegan
+    - responsabilidades / tareas: bloques parciales del JSON en construcción
+    - final: misma carga que /message (según `view`), con el estado ya persistido
+    - error: si falla el procesamiento (no se emite final); con
+      "retryable": true si otra petición modificó la transferencia
+    """
+    # 404 y admisión (503/429) antes de abrir el stream. Desde que se obtiene
+    # el hueco hasta devolver la respuesta no hay nada que pueda fallar: lo
+    # libera la propia respuesta al terminar
+    if await anyio.to_thread.run_sync(transfer_version, db, transfer_id) is None:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Transfer no encontrada")
+    slot = AsyncExitStack()
+    await slot.enter_async_context(admission.admit(role, transfer_id))
 
-    state = _load_state(t)
-    # Inserta el último mensaje del usuario en el estado
-    s = InterviewState(**state)
-    s.user_message = payload.message
+    async def _events() -> AsyncIterator[str]:
+        yield _sse("accepted", {"transfer_id": transfer_id})
+        out: Dict[str, Any] = {}
+        # Sesión propia: el generador sigue vivo después de que la ruta
+        # devuelva (y de que se cierre la sesión inyectada)
+        turn_db = SessionLocal()
+        try:
+            async with transfer_locks.hold(transfer_id):
+                s = await _load_state(turn_db, transfer_id)
+                base = s.persisted_turns
+                s.user_message = payload.message
+                config = graph_config(transfer_id, db=turn_db, stream=True)
+                async for mode, chunk in message_app.astream(s.model_dump(), config=config, stream_mode=["custom", "values"]):  # type: ignore
+                    if mode == "custom":
+                        yield _sse(chunk["event"], chunk["data"])
+                    else:
+                        out = chunk
+            final = await _respond(turn_db, transfer_id, out, view, base)
+        except StaleInterviewError:
+            metrics.inc("chat.conflicts")
+            yield _sse("error", {"detail": CONFLICT_DETAIL, "status": 409, "retryable": True})
+            return
+        except HTTPException as exc:
+            # Borrada entre la comprobación y el turno
+            yield _sse("error", {"detail": exc.detail, "status": exc.status_code})
+            return
+        except Exception:
+            logger.exception("Error procesando mensaje en streaming (transfer %s)", transfer_id)
+            yield _sse("error", {"detail": "Error procesando el mensaje"})
+            return
+        finally:
+            turn_db.close()
+        yield _sse("final", final)
 
-    app = build_message_app(lambda: SessionLocal(), transfer_id)
-    out: Dict[str, Any] = app.invoke(s.model_dump())  # type: ignore
+    return _AdmittedStreamingResponse(
+        _events(),
+        release=slot.aclose,
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
 
+
+def _thread_page_sync(db: Session, transfer_id: int, after: int, limit: int) -> Optional[Dict[str, Any]]:
+    if transfer_version(db, transfer_id) is None:
+        return None
+    # Pide uno más para saber si hay página siguiente
+    rows = list_turns(db, transfer_id, after=after, limit=limit + 1)
+    items = [{"seq": seq, "role": role, "content": content} for seq, role, content in rows[:limit]]
     return {
-        "assistant": out.get("last_assistant"),
-        "pending_step": out.get("pending_step"),
-        "responsabilidades": out.get("responsabilidades", []),
-        "tareas": out.get("tareas", {}),
-        "state": out,
+        "items": items,
+        "next_cursor": items[-1]["seq"] if len(rows) > limit else None,
     }
+
+
+@router.get("/{transfer_id}/thread", response_model=dict)
+async def get_thread(
+    transfer_id: int,
+    after: int = Query(-1, ge=-1, description="Devuelve turnos con seq > after"),
+    limit: int = Query(50, ge=1, le=200, description="Máximo de turnos"),
+    db: Session = Depends(get_db_dep),
+) -> dict:
+    """Historial incremental del chat (paginado por cursor de seq)."""
+    page = await anyio.to_thread.run_sync(_thread_page_sync, db, transfer_id, after, limit)
+    if page is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Transfer no encontrada")
+    return page
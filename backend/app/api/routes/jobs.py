@@ -0,0 +1,40 @@
+from __future__ import annotations
+
+from fastapi import APIRouter, HTTPException, WebSocket, status
+
+from app.services.jobs import TERMINAL, get_job_pool
+
+router = APIRouter(tags=["jobs"])
+
+
+@router.get("/{job_id}", response_model=dict)
+async def get_job(job_id: str) -> dict:
+    """Estado de un turno encolado (/chat-transfer/{id}/message?mode=async)."""
+    job = await get_job_pool().get(job_id)
+    if job is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Trabajo no encontrado")
+    return job
+
+
+@router.websocket("/{job_id}/ws")
+async def watch_job(websocket: WebSocket, job_id: str) -> None:
+    """
+    Envía el estado del trabajo cada vez que cambia y cierra la conexión al
+    terminar (done / failed). Trabajo inexistente: cierre con código 4404.
+    """
+    pool = get_job_pool()
+    await websocket.accept()
+    last = None
+    while True:
+        job = await pool.get(job_id)
+        if job is None:
+            await websocket.close(code=4404)
+            return
+        if job["status"] != last:
+            await websocket.send_json(job)
+            last = job["status"]
+        if last in TERMINAL:
+            await websocket.close()
+            return
+        # Despierta al terminar un trabajo en este proceso; si lo ejecuta otro, sondeo
+        await pool.wait_change(timeout=1.0)
@@ -0,0 +1,32 @@
+from fastapi import APIRouter, Depends, Header, Response, status
+from sqlalchemy.orm import Session
+
+from app.api.deps import get_db_dep
+from app.repositories.org_tree import get_org_tree_cache
+
+router = APIRouter(tags=["org-tree"])
+
+
+def _matches(if_none_match: str | None, etag: str) -> bool:
+    if not if_none_match:
+        return False
+    tags = [t.strip() for t in if_none_match.split(",")]
+    # Comparación débil (RFC 9110): W/"x" equivale a "x"
+    return "*" in tags or etag in [t[2:] if t.startswith("W/") else t for t in tags]
+
+
+@router.get("")
+def get_org_tree(
+    if_none_match: str | None = Header(default=None),
+    db: Session = Depends(get_db_dep),
+) -> Response:
+    """
+    Estructura completa proyectos -> equipos -> managers en una respuesta.
+    Con If-None-Match igual al ETag actual responde 304 sin cuerpo.
+    """
+    etag, body = get_org_tree_cache().get(db)
+    # no-cache: el cliente puede guardarla, pero revalida siempre con el ETag
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    if _matches(if_none_match, etag):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    return Response(content=body, media_type="application/json", headers=headers)
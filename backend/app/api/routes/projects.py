@@ -2,7 +2,11 @@ from fastapi import APIRouter, Depends, HTTPException, Query, status
 from sqlalchemy import func, select
 from sqlalchemy.orm import Session
 
-from app.api.deps import get_db_dep, pagination_params, require_roles
+from app.api.deps import cursor_param, get_db_dep, include_total_param, pagination_params, require_roles
+from app.api.pagination import keyset_page, list_response
+from app.repositories.counts import count_key, get_row_counts
+from app.repositories.org_tree import get_org_tree_cache
+from app.schemas.projection import dump_rows, schema_columns
 from app.models.project import Project
 from app.schemas.project import ProjectCreate, ProjectRead, ProjectUpdate
 
@@ -12,21 +16,22 @@ router = APIRouter(tags=["projects"])
 @router.get("", response_model=dict[str, object])
 def list_projects(
     page_size: tuple[int, int] = Depends(pagination_params),
+    cursor: str | None = Depends(cursor_param),
+    include_total: str = Depends(include_total_param),
     db: Session = Depends(get_db_dep),
 ):
     page, size = page_size
-    total = db.execute(select(func.count()).select_from(Project)).scalar_one()
-    items = (
-        db.execute(select(Project).offset((page - 1) * size).limit(size))
-        .scalars()
-        .all()
+    total = get_row_counts().total(
+        db, count_key("projects"), select(func.count()).select_from(Project), include_total
     )
-    return {
-        "items": [ProjectRead.model_validate(p) for p in items],
-        "total": total,
-        "page": page,
-        "size": size,
-    }
+    # Solo las columnas de ProjectRead (sin hidratar entidades)
+    base_q = select(*schema_columns(Project, ProjectRead))
+    if cursor is not None:
+        rows, next_cursor = keyset_page(db, base_q, [Project.id], cursor, size)
+        return list_response(dump_rows(ProjectRead, rows), total, size=size, next_cursor=next_cursor)
+
+    rows = db.execute(base_q.order_by(Project.id).offset((page - 1) * size).limit(size)).all()
+    return list_response(dump_rows(ProjectRead, rows), total, page=page, size=size)
 
 
 @router.post(
@@ -41,7 +46,9 @@ def create_project(body: ProjectCreate, db: Session = Depends(get_db_dep)) -> Pr
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Nombre de proyecto ya existe")
     proj = Project(name=body.name, description=body.description, is_active=body.is_active)
     db.add(proj)
+    get_row_counts().bump(db, count_key("projects"), 1)
     db.commit()
+    get_org_tree_cache().invalidate()
     db.refresh(proj)
     return ProjectRead.model_validate(proj)
 
@@ -78,6 +85,7 @@ def update_project(project_id: int, body: ProjectUpdate, db: Session = Depends(g
 
     db.add(proj)
     db.commit()
+    get_org_tree_cache().invalidate()
     db.refresh(proj)
     return ProjectRead.model_validate(proj)
 
@@ -92,5 +100,9 @@ def delete_project(project_id: int, db: Session = Depends(get_db_dep)) -> dict[s
     if not proj:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Proyecto no encontrado")
     db.delete(proj)
+    counts = get_row_counts()
+    counts.bump(db, count_key("projects"), -1)
+    counts.invalidate(db, "teams")  # sus equipos se borran en cascada
     db.commit()
+    get_org_tree_cache().invalidate()
     return {"deleted": project_id}
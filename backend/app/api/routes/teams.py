@@ -1,10 +1,15 @@
-from typing import Optional
+from typing import List, Optional, Set
 
 from fastapi import APIRouter, Depends, HTTPException, Query, status
 from sqlalchemy import func, select, insert
 from sqlalchemy.orm import Session
 
-from app.api.deps import get_db_dep, pagination_params, require_roles
+from app.api.deps import cursor_param, get_db_dep, include_total_param, pagination_params, require_roles
+from app.api.includes import TEAM_EMBEDS, embed, fields_param, include_param
+from app.api.pagination import keyset_page, list_response
+from app.repositories.counts import count_key, get_row_counts
+from app.repositories.org_tree import get_org_tree_cache
+from app.schemas.projection import dump_rows, schema_columns
 from app.models.project import Project
 from app.models.team import Team
 from app.models.user import User
@@ -18,28 +23,34 @@ router = APIRouter(tags=["teams"])
 def list_teams(
     project_id: Optional[int] = Query(default=None, description="Filtrar por proyecto"),
     page_size: tuple[int, int] = Depends(pagination_params),
+    cursor: Optional[str] = Depends(cursor_param),
+    include_total: str = Depends(include_total_param),
+    fields: Optional[Set[str]] = Depends(fields_param(TeamRead)),
+    include: List[str] = Depends(include_param(TEAM_EMBEDS)),
     db: Session = Depends(get_db_dep),
 ):
-    """Listado de equipos con filtro opcional por proyecto."""
+    """Listado de equipos con filtro opcional por proyecto (?fields=, ?include=project,managers)."""
     page, size = page_size
 
-    base_q = select(Team)
+    # Solo las columnas de TeamRead (sin hidratar entidades)
+    base_q = select(*schema_columns(Team, TeamRead))
     count_q = select(func.count()).select_from(Team)
 
     if project_id is not None:
         base_q = base_q.where(Team.project_id == project_id)
         count_q = count_q.where(Team.project_id == project_id)
 
-    total = db.execute(count_q).scalar_one()
-    items = db.execute(base_q.offset((page - 1) * size).limit(size)).scalars().all()
+    total = get_row_counts().total(db, count_key("teams", project_id=project_id), count_q, include_total)
+    if cursor is not None:
+        # Índice (project_id, id): el filtro y el orden salen del mismo índice
+        rows, next_cursor = keyset_page(db, base_q, [Team.id], cursor, size)
+        extra = {"next_cursor": next_cursor}
+    else:
+        rows = db.execute(base_q.order_by(Team.id).offset((page - 1) * size).limit(size)).all()
+        extra = {"page": page}
 
-    return {
-        "items": [TeamRead.model_validate(t) for t in items],
-        "total": total,
-        "page": page,
-        "size": size,
-        "project_id": project_id,
-    }
+    items = embed(db, dump_rows(TeamRead, rows, fields), rows, include, TEAM_EMBEDS)
+    return list_response(items, total, size=size, project_id=project_id, **extra)
 
 
 @router.post(
@@ -93,6 +104,9 @@ def create_team(body: TeamCreate, db: Session = Depends(get_db_dep)) -> TeamRead
         is_active=body.is_active,
     )
     db.add(team)
+    counts = get_row_counts()
+    counts.bump(db, count_key("teams"), 1)
+    counts.bump(db, count_key("teams", project_id=body.project_id), 1)
     db.commit()
     db.refresh(team)
 
@@ -102,6 +116,7 @@ def create_team(body: TeamCreate, db: Session = Depends(get_db_dep)) -> TeamRead
         [{"team_id": team.id, "user_id": u.id} for u in users],
     )
     db.commit()
+    get_org_tree_cache().invalidate()
     db.refresh(team)
 
     return TeamRead.model_validate(team)
@@ -124,6 +139,7 @@ def update_team(team_id: int, body: TeamUpdate, db: Session = Depends(get_db_dep
     team = db.get(Team, team_id)
     if not team:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Equipo no encontrado")
+    old_project_id = team.project_id
 
     # Si cambia el project_id, verificar su existencia
     if body.project_id is not None and body.project_id != team.project_id:
@@ -149,8 +165,13 @@ def update_team(team_id: int, body: TeamUpdate, db: Session = Depends(get_db_dep
     if body.is_active is not None:
         team.is_active = body.is_active
 
+    if team.project_id != old_project_id:
+        counts = get_row_counts()
+        counts.bump(db, count_key("teams", project_id=old_project_id), -1)
+        counts.bump(db, count_key("teams", project_id=team.project_id), 1)
     db.add(team)
     db.commit()
+    get_org_tree_cache().invalidate()
     db.refresh(team)
     return TeamRead.model_validate(team)
 
@@ -165,5 +186,9 @@ def delete_team(team_id: int, db: Session = Depends(get_db_dep)) -> dict[str, in
     if not team:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Equipo no encontrado")
     db.delete(team)
+    counts = get_row_counts()
+    counts.bump(db, count_key("teams"), -1)
+    counts.bump(db, count_key("teams", project_id=team.project_id), -1)
     db.commit()
+    get_org_tree_cache().invalidate()
     return {"deleted": team_id}
@@ -1,12 +1,22 @@
 from __future__ import annotations
 
+from typing import List, Optional, Set
+
 from fastapi import APIRouter, Depends, HTTPException, Query, status
 from sqlalchemy import func, select
 from sqlalchemy.orm import Session
+from sqlalchemy.orm.exc import StaleDataError
 
-from app.api.deps import get_db_dep, pagination_params, require_roles
+from app.api.deps import cursor_param, get_db_dep, include_total_param, pagination_params, require_roles
+from app.api.includes import TRANSFER_EMBEDS, embed, fields_param, include_param
+from app.api.pagination import keyset_page, list_response
+from app.ai.langgraph.state import Step
+from app.models.interview import TransferInterview
 from app.models.transfer import Transfer
 from app.models.user import User
+from app.repositories.counts import count_key, get_row_counts
+from app.repositories.interview_cache import get_interview_cache
+from app.schemas.projection import dump_rows, schema_columns
 from app.schemas.transfer import TransferCreate, TransferRead, TransferUpdate
 
 router = APIRouter(tags=["transfers"])
@@ -14,24 +24,48 @@ router = APIRouter(tags=["transfers"])
 
 @router.get("", response_model=dict[str, object], dependencies=[Depends(require_roles("ADMIN", "MANAGEMENT"))])
 def list_transfers(
+    pending_step: Optional[Step] = Query(default=None, description="Filtrar por paso pendiente de la entrevista"),
     page_size: tuple[int, int] = Depends(pagination_params),
+    cursor: Optional[str] = Depends(cursor_param),
+    include_total: str = Depends(include_total_param),
+    fields: Optional[Set[str]] = Depends(fields_param(TransferRead)),
+    include: List[str] = Depends(include_param(TRANSFER_EMBEDS)),
     db: Session = Depends(get_db_dep),
 ):
-    """Listado paginado de procesos de transferencia."""
+    """
+    Listado paginado de procesos de transferencia (filtro opcional por paso de
+    la entrevista; ?fields= e ?include=outgoing_user).
+    """
     page, size = page_size
 
-    total = db.execute(select(func.count()).select_from(Transfer)).scalar_one()
-    items = (
-        db.execute(select(Transfer).order_by(Transfer.created_at.desc()).offset((page - 1) * size).limit(size))
-        .scalars()
-        .all()
-    )
-    return {
-        "items": [TransferRead.model_validate(t) for t in items],
-        "total": total,
-        "page": page,
-        "size": size,
-    }
+    # Solo las columnas de TransferRead: sin entidades ni el JOIN de outgoing_user (lazy="joined")
+    base_q = select(*schema_columns(Transfer, TransferRead))
+    count_q = select(func.count()).select_from(Transfer)
+
+    if pending_step is not None:
+        # Columna derivada e indexada: no requiere leer el JSON de estado
+        base_q = base_q.join(TransferInterview, TransferInterview.transfer_id == Transfer.id).where(
+            TransferInterview.pending_step == pending_step
+        )
+        count_q = select(func.count()).select_from(TransferInterview).where(
+            TransferInterview.pending_step == pending_step
+        )
+
+    # El contador por pending_step no se ajusta en cada turno: se recalcula por antigüedad
+    total = get_row_counts().total(db, count_key("transfers", pending_step=pending_step), count_q, include_total)
+    if cursor is not None:
+        # Más recientes primero sobre el índice (created_at, id)
+        rows, next_cursor = keyset_page(db, base_q, [Transfer.created_at, Transfer.id], cursor, size, descending=True)
+        extra = {"next_cursor": next_cursor}
+    else:
+        rows = db.execute(
+            base_q.order_by(Transfer.created_at.desc(), Transfer.id.desc()).offset((page - 1) * size).limit(size)
+        ).all()
+        extra = {"page": page}
+
+    # outgoing_user en una sola consulta por página (no el JOIN por fila de la relación)
+    items = embed(db, dump_rows(TransferRead, rows, fields), rows, include, TRANSFER_EMBEDS)
+    return list_response(items, total, size=size, pending_step=pending_step, **extra)
 
 
 @router.post(
@@ -52,6 +86,7 @@ def create_transfer(body: TransferCreate, db: Session = Depends(get_db_dep)) ->
         manager_instructions=body.manager_instructions,
     )
     db.add(t)
+    get_row_counts().bump(db, count_key("transfers"), 1)
     db.commit()
     db.refresh(t)
     return TransferRead.model_validate(t)
@@ -87,7 +122,16 @@ def update_transfer(transfer_id: int, body: TransferUpdate, db: Session = Depend
         t.manager_instructions = body.manager_instructions
 
     db.add(t)
-    db.commit()
+    try:
+        # version_id_col: el UPDATE solo aplica si nadie cambió la fila desde la lectura
+        db.commit()
+    except StaleDataError:
+        db.rollback()
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="La transferencia se modificó a la vez; reintenta",
+            headers={"Retry-After": "1"},
+        )
     db.refresh(t)
     return TransferRead.model_validate(t)
 
@@ -102,5 +146,7 @@ def delete_transfer(transfer_id: int, db: Session = Depends(get_db_dep)) -> dict
     if not t:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Transferencia no encontrada")
     db.delete(t)
+    get_row_counts().bump(db, count_key("transfers"), -1)
     db.commit()
+    get_interview_cache().invalidate(transfer_id)
     return {"deleted": transfer_id}
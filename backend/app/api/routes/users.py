@@ -1,11 +1,17 @@
 from __future__ import annotations
 
+import anyio
 from fastapi import APIRouter, Depends, HTTPException, status
 from sqlalchemy import select, func
 from sqlalchemy.orm import Session
 
-from app.api.deps import get_db_dep, pagination_params, require_roles
-from app.core.security import get_password_hash, verify_password
+from app.api.deps import cursor_param, get_db_dep, include_total_param, pagination_params, require_roles
+from app.api.pagination import keyset_page, list_response
+from app.repositories.counts import count_key, get_row_counts
+from app.repositories.org_tree import get_org_tree_cache
+from app.repositories.users import get_user_by_email
+from app.schemas.projection import dump_rows, schema_columns
+from app.core.security import aget_password_hash, averify_password
 from app.models.user import User
 from app.schemas.user import UserCreate, UserRead, UserUpdate, UserLogin
 
@@ -16,40 +22,47 @@ router = APIRouter(tags=["users"])
 def list_users(
     db: Session = Depends(get_db_dep),
     page_size: tuple[int, int] = Depends(pagination_params),
+    cursor: str | None = Depends(cursor_param),
+    include_total: str = Depends(include_total_param),
 ):
     page, size = page_size
-    total = db.execute(select(func.count()).select_from(User)).scalar_one()
-    items = (
-        db.execute(select(User).offset((page - 1) * size).limit(size))
-        .scalars()
-        .all()
+    total = get_row_counts().total(
+        db, count_key("users"), select(func.count()).select_from(User), include_total
     )
-    return {
-        "items": [UserRead.model_validate(u) for u in items],
-        "total": total,
-        "page": page,
-        "size": size,
-    }
+    # Solo las columnas de UserRead (sin hidratar entidades)
+    base_q = select(*schema_columns(User, UserRead))
+    if cursor is not None:
+        rows, next_cursor = keyset_page(db, base_q, [User.id], cursor, size)
+        return list_response(dump_rows(UserRead, rows), total, size=size, next_cursor=next_cursor)
 
+    rows = db.execute(base_q.order_by(User.id).offset((page - 1) * size).limit(size)).all()
+    return list_response(dump_rows(UserRead, rows), total, page=page, size=size)
 
-@router.post("", response_model=UserRead, status_code=status.HTTP_201_CREATED, dependencies=[Depends(require_roles("ADMIN"))])
-def create_user(body: UserCreate, db: Session = Depends(get_db_dep)) -> UserRead:
-    existing = db.execute(select(User).where(User.email == body.email)).scalar_one_or_none()
-    if existing:
-        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Email ya registrado")
+
+def _insert_user(db: Session, body: UserCreate, hashed_password: str) -> UserRead:
     user = User(
         email=body.email,
-        hashed_password=get_password_hash(body.password),
+        hashed_password=hashed_password,
         full_name=body.full_name,
         role=body.role or "USER",
         is_active=True,
     )
     db.add(user)
+    get_row_counts().bump(db, count_key("users"), 1)
     db.commit()
     db.refresh(user)
     return UserRead.model_validate(user)
 
 
+# Rutas con bcrypt: async, BD en un hilo y hash en el pool dedicado (no retienen hilos del pool por defecto)
+@router.post("", response_model=UserRead, status_code=status.HTTP_201_CREATED, dependencies=[Depends(require_roles("ADMIN"))])
+async def create_user(body: UserCreate, db: Session = Depends(get_db_dep)) -> UserRead:
+    if await anyio.to_thread.run_sync(get_user_by_email, db, body.email):
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Email ya registrado")
+    hashed_password = await aget_password_hash(body.password)
+    return await anyio.to_thread.run_sync(_insert_user, db, body, hashed_password)
+
+
 @router.get("/{user_id}", response_model=UserRead, dependencies=[Depends(require_roles("ADMIN", "MANAGEMENT"))])
 def get_user(user_id: int, db: Session = Depends(get_db_dep)) -> UserRead:
     user = db.get(User, user_id)
@@ -58,42 +71,50 @@ def get_user(user_id: int, db: Session = Depends(get_db_dep)) -> UserRead:
     return UserRead.model_validate(user)
 
 
-@router.put("/{user_id}", response_model=UserRead, dependencies=[Depends(require_roles("ADMIN"))])
-def update_user(user_id: int, body: UserUpdate, db: Session = Depends(get_db_dep)) -> UserRead:
-    user = db.get(User, user_id)
-    if not user:
-        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Usuario no encontrado")
-
+def _apply_update(db: Session, user: User, body: UserUpdate, hashed_password: str | None) -> UserRead:
     if body.full_name is not None:
         user.full_name = body.full_name
     if body.role is not None:
         user.role = body.role
     if body.is_active is not None:
         user.is_active = body.is_active
-    if body.password:
-        user.hashed_password = get_password_hash(body.password)
+    if hashed_password is not None:
+        user.hashed_password = hashed_password
 
     db.add(user)
     db.commit()
+    # Los managers aparecen en /org-tree con sus datos
+    get_org_tree_cache().invalidate()
     db.refresh(user)
     return UserRead.model_validate(user)
 
 
+@router.put("/{user_id}", response_model=UserRead, dependencies=[Depends(require_roles("ADMIN"))])
+async def update_user(user_id: int, body: UserUpdate, db: Session = Depends(get_db_dep)) -> UserRead:
+    user = await anyio.to_thread.run_sync(db.get, User, user_id)
+    if not user:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Usuario no encontrado")
+    hashed_password = await aget_password_hash(body.password) if body.password else None
+    return await anyio.to_thread.run_sync(_apply_update, db, user, body, hashed_password)
+
+
 @router.delete("/{user_id}", response_model=dict[str, int], dependencies=[Depends(require_roles("ADMIN"))])
 def delete_user(user_id: int, db: Session = Depends(get_db_dep)) -> dict[str, int]:
     user = db.get(User, user_id)
     if not user:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Usuario no encontrado")
     db.delete(user)
+    get_row_counts().bump(db, count_key("users"), -1)
     db.commit()
+    get_org_tree_cache().invalidate()
     return {"deleted": user_id}
 
 
 # Endpoint de login simple para PoC (sin JWT): valida usuario/contraseña y devuelve datos básicos
 @router.post("/login", response_model=dict[str, object])
-def login_simple(body: UserLogin, db: Session = Depends(get_db_dep)) -> dict[str, object]:
-    user = db.execute(select(User).where(User.email == body.email)).scalar_one_or_none()
-    if not user or not user.is_active or not verify_password(body.password, user.hashed_password):
+async def login_simple(body: UserLogin, db: Session = Depends(get_db_dep)) -> dict[str, object]:
+    user = await anyio.to_thread.run_sync(get_user_by_email, db, body.email)
+    if not user or not user.is_active or not await averify_password(body.password, user.hashed_password):
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Credenciales inválidas")
     return {
         "id": user.id,
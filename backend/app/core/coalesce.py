@@ -0,0 +1,69 @@
+from __future__ import annotations
+
+import asyncio
+from typing import Awaitable, Callable, Dict, Generic, Hashable, List, Optional, TypeVar
+
+from app.core.metrics import metrics
+
+T = TypeVar("T")
+
+
+class _Batch(Generic[T]):
+    def __init__(self, first: str) -> None:
+        self.messages: List[str] = [first]
+        self.closed = False
+        self.waiters = 0
+        self.task: "Optional[asyncio.Task[T]]" = None
+
+
+class MessageCoalescer:
+    """
+    Agrupa los mensajes de una misma clave (transfer_id) que llegan dentro de
+    una ventana. La primera petición abre el lote; una tarea propia del lote
+    espera la ventana, ejecuta `run` una sola vez con los textos concatenados
+    y todas las peticiones del lote reciben el mismo resultado.
+    La tarea no depende de la petición que abrió el lote: si esta se cancela
+    (desconexión, timeout de admisión), el resto del lote sigue adelante. Solo
+    se cancela cuando no queda nadie esperando. Por eso `run` no debe usar
+    recursos de la petición que abrió el lote (p. ej. su sesión de BD).
+    """
+
+    def __init__(self, name: str) -> None:
+        self.name = name
+        self._open: Dict[Hashable, _Batch] = {}
+
+    async def submit(
+        self, key: Hashable, message: str, run: Callable[[str], Awaitable[T]], window: float
+    ) -> T:
+        batch = self._open.get(key)
+        if batch is not None and not batch.closed:
+            batch.messages.append(message)
+            metrics.inc(f"{self.name}.coalesced")
+        else:
+            batch = self._open[key] = _Batch(message)
+            batch.task = asyncio.ensure_future(self._run(key, batch, run, window))
+            # Evita el aviso "exception was never retrieved" si nadie más espera
+            batch.task.add_done_callback(lambda t: t.cancelled() or t.exception())
+        task = batch.task
+        assert task is not None
+        batch.waiters += 1
+        try:
+            return await asyncio.shield(task)
+        finally:
+            batch.waiters -= 1
+            if not batch.waiters and not task.done():
+                task.cancel()
+
+    async def _run(self, key: Hashable, batch: _Batch, run: Callable[[str], Awaitable[T]], window: float) -> T:
+        try:
+            await asyncio.sleep(window)
+        finally:
+            batch.closed = True
+            if self._open.get(key) is batch:
+                del self._open[key]
+        metrics.inc(f"{self.name}.batches")
+        return await run("\n".join(batch.messages))
+
+
+# Mensajes de chat por transferencia (ventana en Settings.CHAT_COALESCE_WINDOW_MS)
+chat_coalescer = MessageCoalescer("chat")
@@ -1,5 +1,5 @@
 from functools import lru_cache
-from typing import List, Any
+from typing import Any, Dict, List, Literal
 
 from pydantic import Field, field_validator
 from pydantic_settings import BaseSettings, SettingsConfigDict
@@ -48,6 +48,81 @@ class Settings(BaseSettings):
             return [str(x).strip() for x in v]
         return v
 
+    # LLM (OpenAI vía langchain-openai; sin OPENAI_API_KEY se usa el parser heurístico)
+    OPENAI_API_KEY: str | None = None
+    OPENAI_BASE_URL: str | None = None
+    OPENAI_MODEL: str = "gpt-4o-mini"
+    LLM_POOL_MAX_CONNECTIONS: int = 20
+    LLM_POOL_MAX_KEEPALIVE: int = 10
+    LLM_POOL_KEEPALIVE_EXPIRY: float = 60.0  # segundos
+    LLM_CONNECT_TIMEOUT: float = 5.0  # segundos
+    LLM_READ_TIMEOUT: float = 60.0  # segundos
+    LLM_WARMUP_ON_STARTUP: bool = False
+    LLM_IO_THREADS: int = 20  # hilos dedicados a llamadas bloqueantes al proveedor
+
+    # Hash de contraseñas (bcrypt) fuera del pool de hilos de las rutas
+    PASSWORD_HASH_WORKERS: int = 2
+    PASSWORD_HASH_PROCESSES: bool = True  # False: hilos dedicados en lugar de procesos
+
+    # Resiliencia de las llamadas al LLM (si fallan, se usa el parser heurístico)
+    LLM_CALL_DEADLINE: float = 30.0  # segundos por llamada, reintentos incluidos
+    LLM_RETRY_ATTEMPTS: int = 3  # intentos totales
+    LLM_RETRY_BASE_DELAY: float = 0.2  # segundos (backoff exponencial con jitter)
+    LLM_RETRY_MAX_DELAY: float = 2.0
+    LLM_BREAKER_FAILURE_THRESHOLD: int = 5  # fallos seguidos para abrir el breaker
+    LLM_BREAKER_RESET_SECONDS: float = 30.0  # tiempo abierto antes de la sonda
+    LLM_HEDGE_DELAY: float | None = None  # segundos; si se define, petición duplicada tras ese tiempo
+
+    # Planificador de llamadas al LLM: concurrencia por clase (interactive > review > bulk)
+    # y límites globales del proveedor (peticiones y tokens por minuto; None = sin límite)
+    LLM_CONCURRENCY_INTERACTIVE: int = 16
+    LLM_CONCURRENCY_REVIEW: int = 4
+    LLM_CONCURRENCY_BULK: int = 2
+    LLM_RATE_RPM: int | None = None
+    LLM_RATE_TPM: int | None = None
+
+    # Caché de extracciones LLM (memoria LRU+TTL y, opcional, SQLite compartido entre workers)
+    LLM_CACHE_ENABLED: bool = True
+    LLM_CACHE_MAX_ENTRIES: int = 1024
+    LLM_CACHE_TTL_SECONDS: float = 3600.0
+    LLM_CACHE_SQLITE_PATH: str | None = None
+    LLM_CACHE_SQLITE_MAX_ENTRIES: int = 10000
+
+    # Enrutado de extracciones: "llm" (siempre el proveedor) o "hybrid"
+    # (parser heurístico si su puntuación 0..1 alcanza el umbral)
+    LLM_EXTRACTION_MODE: Literal["llm", "hybrid"] = "llm"
+    LLM_HYBRID_THRESHOLD: float = 0.8
+    # ask_tasks: una extracción por responsabilidad, en paralelo (máx. N a la vez)
+    LLM_TASKS_PARALLEL: bool = False
+    LLM_TASKS_MAX_CONCURRENCY: int = 4
+
+    # Caché en proceso del estado de entrevistas activas (nº de transferencias)
+    INTERVIEW_STATE_CACHE_SIZE: int = 512
+    # Ventana (ms) para agrupar mensajes seguidos de una transferencia en un solo turno; 0 = desactivado
+    CHAT_COALESCE_WINDOW_MS: int = 0
+    # Admisión de las rutas de chat (por worker): peticiones en curso, cola y espera máxima (s)
+    CHAT_MAX_IN_FLIGHT: int = 32
+    CHAT_MAX_QUEUE: int = 64
+    CHAT_QUEUE_TIMEOUT: float = 10.0
+    # Límites por minuto: por rol de X-Role (p. ej. {"USER": 60}) y por transferencia (None = sin límite)
+    CHAT_ROLE_RPM: Dict[str, int] = Field(default_factory=dict)
+    CHAT_TRANSFER_RPM: int | None = None
+    # Modo async de /message (?mode=async): cola local en SQLite + workers en proceso
+    CHAT_JOBS_SQLITE_PATH: str = "./chat_jobs.db"
+    CHAT_JOB_WORKERS: int = 2
+    CHAT_JOBS_TTL_SECONDS: float = 86400.0  # conservación de trabajos terminados
+
+    # Idempotency-Key: respuestas guardadas (TTL en segundos y nº máximo de filas)
+    IDEMPOTENCY_TTL_SECONDS: float = 86400.0
+    IDEMPOTENCY_MAX_ENTRIES: int = 10000
+
+    # Totales de listados (include_total=approx): caché en proceso y recálculo del contador en BD (segundos)
+    COUNTS_CACHE_TTL_SECONDS: float = 30.0
+    COUNTS_REFRESH_SECONDS: float = 300.0
+
+    # /org-tree: caché en proceso (se invalida en cada escritura; el TTL cubre las de otros workers)
+    ORG_TREE_CACHE_TTL_SECONDS: float = 60.0
+
     # Admin bootstrap (startup seeding)
     ADMIN_EMAIL: str | None = None
     ADMIN_PASSWORD: str | None = None
@@ -0,0 +1,94 @@
+from __future__ import annotations
+
+import asyncio
+import multiprocessing
+import threading
+from concurrent.futures import Executor, Future, ProcessPoolExecutor, ThreadPoolExecutor
+from functools import lru_cache
+from typing import Any, Callable, TypeVar
+
+from app.core.config import get_settings
+from app.core.metrics import metrics
+
+T = TypeVar("T")
+
+
+class NamedExecutor:
+    """
+    Ejecutor con nombre y tamaño fijo (hilos o procesos), separado del pool de
+    hilos por defecto de AnyIO que atiende las rutas CRUD síncronas.
+    Gauges: executor.<nombre>.active, .queued y .saturation (active / workers).
+    """
+
+    def __init__(self, name: str, executor: Executor, max_workers: int) -> None:
+        self.name = name
+        self.max_workers = max_workers
+        self._executor = executor
+        self._lock = threading.Lock()
+        self._pending = 0
+        self._gauges(0)
+
+    def _gauges(self, pending: int) -> None:
+        active = min(pending, self.max_workers)
+        metrics.set_gauge(f"executor.{self.name}.active", active)
+        metrics.set_gauge(f"executor.{self.name}.queued", pending - active)
+        metrics.set_gauge(f"executor.{self.name}.saturation", active / self.max_workers)
+
+    def _done(self, _: Any = None) -> None:
+        with self._lock:
+            self._pending -= 1
+            self._gauges(self._pending)
+
+    def submit(self, fn: Callable[..., T], *args: Any, **kwargs: Any) -> "Future[T]":
+        with self._lock:
+            self._pending += 1
+            self._gauges(self._pending)
+        try:
+            fut = self._executor.submit(fn, *args, **kwargs)
+        except BaseException:
+            self._done()
+            raise
+        fut.add_done_callback(self._done)
+        return fut
+
+    def run(self, fn: Callable[..., T], *args: Any) -> T:
+        """Ejecuta y espera (desde código síncrono)."""
+        return self.submit(fn, *args).result()
+
+    async def arun(self, fn: Callable[..., T], *args: Any) -> T:
+        """Ejecuta y espera sin bloquear el event loop."""
+        return await asyncio.wrap_future(self.submit(fn, *args))
+
+    @property
+    def pending(self) -> int:
+        return self._pending
+
+    def shutdown(self) -> None:
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+
+@lru_cache(maxsize=1)
+def get_llm_executor() -> NamedExecutor:
+    """Hilos para llamadas bloqueantes al proveedor LLM (intentos y hedging de ResilientCaller)."""
+    n = get_settings().LLM_IO_THREADS
+    return NamedExecutor("llm_io", ThreadPoolExecutor(max_workers=n, thread_name_prefix="llm-io"), n)
+
+
+@lru_cache(maxsize=1)
+def get_hash_executor() -> NamedExecutor:
+    """Procesos para bcrypt (CPU): el hash no compite por el GIL con las rutas."""
+    settings = get_settings()
+    n = settings.PASSWORD_HASH_WORKERS
+    if settings.PASSWORD_HASH_PROCESSES:
+        # spawn: el proceso hijo no hereda hilos ni conexiones abiertas del servidor
+        pool: Executor = ProcessPoolExecutor(max_workers=n, mp_context=multiprocessing.get_context("spawn"))
+    else:
+        pool = ThreadPoolExecutor(max_workers=n, thread_name_prefix="password-hash")
+    return NamedExecutor("password_hash", pool, n)
+
+
+def shutdown_executors() -> None:
+    for getter in (get_llm_executor, get_hash_executor):
+        if getter.cache_info().currsize:
+            getter().shutdown()
+            getter.cache_clear()
@@ -0,0 +1,42 @@
+from __future__ import annotations
+
+import asyncio
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Dict, Hashable, List
+
+from app.core.metrics import metrics
+
+
+class KeyedAsyncLock:
+    """
+    Un asyncio.Lock por clave (p. ej. transfer_id), creado bajo demanda y
+    eliminado cuando nadie lo usa. Serializa solo las peticiones de la misma
+    clave; las de claves distintas no se esperan entre sí.
+    """
+
+    def __init__(self, name: str) -> None:
+        self.name = name
+        self._locks: Dict[Hashable, List] = {}  # clave -> [lock, usuarios]
+
+    @asynccontextmanager
+    async def hold(self, key: Hashable) -> AsyncIterator[None]:
+        entry = self._locks.get(key)
+        if entry is None:
+            entry = self._locks[key] = [asyncio.Lock(), 0]
+        entry[1] += 1
+        if entry[0].locked():
+            metrics.inc(f"{self.name}.lock.waits")
+        try:
+            async with entry[0]:
+                yield
+        finally:
+            entry[1] -= 1
+            if entry[1] == 0:
+                del self._locks[key]
+
+    def __len__(self) -> int:
+        return len(self._locks)
+
+
+# Turnos de chat: uno a la vez por transferencia (en este proceso)
+transfer_locks = KeyedAsyncLock("chat")
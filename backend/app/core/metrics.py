@@ -0,0 +1,59 @@
+from __future__ import annotations
+
+import threading
+from collections import defaultdict
+from typing import Any, Dict
+
+
+class Metrics:
+    """
+    Registro mínimo de métricas en proceso (contadores, gauges y tiempos).
+    Suficiente para la PoC; se expone en GET /api/v1/metrics.
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._counters: Dict[str, int] = defaultdict(int)
+        self._gauges: Dict[str, float] = {}
+        self._timings: Dict[str, Dict[str, float]] = {}
+
+    def inc(self, name: str, value: int = 1) -> None:
+        with self._lock:
+            self._counters[name] += value
+
+    def set_gauge(self, name: str, value: float) -> None:
+        with self._lock:
+            self._gauges[name] = value
+
+    def observe(self, name: str, seconds: float) -> None:
+        """Acumula una duración (count/sum/max) bajo `name`."""
+        with self._lock:
+            t = self._timings.setdefault(name, {"count": 0, "sum": 0.0, "max": 0.0})
+            t["count"] += 1
+            t["sum"] += seconds
+            if seconds > t["max"]:
+                t["max"] = seconds
+
+    def counter(self, name: str) -> int:
+        with self._lock:
+            return self._counters.get(name, 0)
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "counters": dict(self._counters),
+                "gauges": dict(self._gauges),
+                "timings": {
+                    k: {**v, "avg": (v["sum"] / v["count"]) if v["count"] else 0.0}
+                    for k, v in self._timings.items()
+                },
+            }
+
+    def reset(self) -> None:
+        with self._lock:
+            self._counters.clear()
+            self._gauges.clear()
+            self._timings.clear()
+
+
+metrics = Metrics()
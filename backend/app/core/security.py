@@ -5,18 +5,38 @@ import base64
 import json
 import time
 
+from app.core.executors import get_hash_executor
+
 # Mínimo utilitario de contraseñas para PoC (sin JWT, sin OAuth)
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 
 
-def get_password_hash(password: str) -> str:
+def _hash(password: str) -> str:
     return pwd_context.hash(password)
 
 
-def verify_password(plain_password: str, hashed_password: str) -> bool:
+def _verify(plain_password: str, hashed_password: str) -> bool:
     return pwd_context.verify(plain_password, hashed_password)
 
 
+# bcrypt es CPU intensivo: se ejecuta en el pool de procesos dedicado (ver app.core.executors).
+# Las rutas usan las variantes async: esperan el hash sin ocupar un hilo del pool de AnyIO.
+def get_password_hash(password: str) -> str:
+    return get_hash_executor().run(_hash, password)
+
+
+def verify_password(plain_password: str, hashed_password: str) -> bool:
+    return get_hash_executor().run(_verify, plain_password, hashed_password)
+
+
+async def aget_password_hash(password: str) -> str:
+    return await get_hash_executor().arun(_hash, password)
+
+
+async def averify_password(plain_password: str, hashed_password: str) -> bool:
+    return await get_hash_executor().arun(_verify, plain_password, hashed_password)
+
+
 def create_access_token(subject: str, role: str) -> str:
     """
     Simple PoC token generator (NOT secure for production).
@@ -4,9 +4,11 @@ from fastapi.middleware.cors import CORSMiddleware
 from app.core.config import get_settings
 from app.core.logging import setup_logging
 from app.api.api_v1 import api_router
+from app.api.idempotency import IdempotencyMiddleware
 import logging
 from app.db.base import Base
 from app.db.session import engine, SessionLocal
+from app.core.executors import shutdown_executors
 from app.services.bootstrap import ensure_admin_user
 
 settings = get_settings()
@@ -14,6 +16,9 @@ setup_logging(level=settings.LOG_LEVEL, structured=True)
 
 app = FastAPI(title=settings.APP_NAME)
 
+# Idempotency-Key en rutas de creación y chat (dentro de CORS: las respuestas repetidas también llevan cabeceras CORS)
+app.add_middleware(IdempotencyMiddleware)
+
 # CORS
 app.add_middleware(
     CORSMiddleware,
@@ -30,7 +35,7 @@ app.include_router(api_router)
 @app.on_event("startup")
 def on_startup() -> None:
     # Ensure models are imported before creating tables
-    from app.models import User, Project, Team, Transfer  # noqa: F401
+    from app.models import User, Project, Team, Transfer, TransferChatTurn, TransferInterview, IdempotencyKey, RowCount  # noqa: F401
     # Create tables (PoC/dev): for production prefer Alembic migrations
     Base.metadata.create_all(bind=engine)
 
@@ -43,6 +48,31 @@ def on_startup() -> None:
     finally:
         db.close()
 
+    # Warmup opcional de la conexión con el proveedor LLM (pool keep-alive)
+    if settings.LLM_WARMUP_ON_STARTUP:
+        from app.ai.llm import get_llm_adapter
+
+        if get_llm_adapter().warmup():
+            logger.info("Conexión LLM precalentada")
+
+    # Workers de turnos en segundo plano (retoman lo que quedó encolado)
+    from app.services.jobs import get_job_pool
+
+    get_job_pool().start()
+
+
+@app.on_event("shutdown")
+async def on_shutdown() -> None:
+    from app.ai.llm import get_llm_adapter
+    from app.services.jobs import get_job_pool
+
+    if get_job_pool.cache_info().currsize:
+        get_job_pool().stop()
+    shutdown_executors()
+
+    if get_llm_adapter.cache_info().currsize:
+        await get_llm_adapter().aclose()
+
 # Compatibilidad: endpoint raíz del Hola Mundo
 @app.get("/")
 def read_root():
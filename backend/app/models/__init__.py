@@ -2,5 +2,8 @@ from .user import User
 from .project import Project
 from .team import Team
 from .transfer import Transfer
+from .interview import TransferChatTurn, TransferInterview
+from .idempotency import IdempotencyKey
+from .counts import RowCount
 
-__all__ = ["User", "Project", "Team", "Transfer"]
+__all__ = ["User", "Project", "Team", "Transfer", "TransferChatTurn", "TransferInterview", "IdempotencyKey", "RowCount"]
@@ -0,0 +1,25 @@
+from __future__ import annotations
+
+from datetime import datetime
+
+from sqlalchemy import DateTime, Integer, String
+from sqlalchemy.orm import Mapped, mapped_column
+
+from app.db.base import Base
+
+
+class RowCount(Base):
+    """
+    Contador de filas por tabla o por tabla + filtro ("teams?project_id=3").
+    Se ajusta en las altas/bajas y se recalcula con COUNT(*) cuando
+    refreshed_at es antiguo (UTC sin zona, como en idempotency_keys).
+    """
+
+    __tablename__ = "row_counts"
+
+    key: Mapped[str] = mapped_column(String(255), primary_key=True)
+    value: Mapped[int] = mapped_column(Integer, nullable=False)
+    refreshed_at: Mapped[datetime] = mapped_column(DateTime, nullable=False)
+
+    def __repr__(self) -> str:  # pragma: no cover
+        return f"RowCount(key={self.key!r}, value={self.value!r})"
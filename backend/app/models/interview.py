@@ -0,0 +1,62 @@
+from __future__ import annotations
+
+from datetime import datetime
+
+from sqlalchemy import JSON, DateTime, ForeignKey, Integer, String, Text
+from sqlalchemy.dialects.postgresql import JSONB
+from sqlalchemy.orm import Mapped, mapped_column
+from sqlalchemy.sql import func
+
+from app.db.base import Base
+
+
+class TransferChatTurn(Base):
+    """Turno de la entrevista (append-only). Clave: (transfer_id, seq)."""
+
+    __tablename__ = "chat_turns"
+
+    transfer_id: Mapped[int] = mapped_column(
+        ForeignKey("transfers.id", ondelete="CASCADE"), primary_key=True
+    )
+    seq: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=False)
+    role: Mapped[str] = mapped_column(String(20), nullable=False)
+    content: Mapped[str] = mapped_column(Text, nullable=False)
+    # Trabajo de la cola (/message?mode=async) que escribió el turno: se guarda
+    # en la misma transacción, así un trabajo reclamado de nuevo sabe si ya se aplicó
+    job_id: Mapped[str | None] = mapped_column(String(32), nullable=True, index=True)
+
+    created_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True), server_default=func.now(), nullable=False
+    )
+
+    def __repr__(self) -> str:  # pragma: no cover
+        return f"TransferChatTurn(transfer_id={self.transfer_id!r}, seq={self.seq!r}, role={self.role!r})"
+
+
+class TransferInterview(Base):
+    """
+    Estructura extraída de la entrevista (una fila pequeña por transferencia).
+    state: JSON (JSONB en Postgres) con responsabilidades, tareas, pending_step
+    y last_assistant. Las columnas derivadas e indexadas se actualizan en cada
+    escritura para poder filtrar sin leer el JSON.
+    """
+
+    __tablename__ = "transfer_interviews"
+
+    transfer_id: Mapped[int] = mapped_column(
+        ForeignKey("transfers.id", ondelete="CASCADE"), primary_key=True
+    )
+    state: Mapped[dict] = mapped_column(JSON().with_variant(JSONB(), "postgresql"), nullable=False)
+
+    # Derivadas de state / chat_turns
+    pending_step: Mapped[str] = mapped_column(String(20), default="ask_resp", nullable=False, index=True)
+    turn_count: Mapped[int] = mapped_column(Integer, default=0, nullable=False, index=True)  # siguiente seq libre
+    last_activity_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True), server_default=func.now(), onupdate=func.now(), nullable=False, index=True
+    )
+
+    def __repr__(self) -> str:  # pragma: no cover
+        return (
+            f"TransferInterview(transfer_id={self.transfer_id!r}, pending_step={self.pending_step!r}, "
+            f"turn_count={self.turn_count!r})"
+        )
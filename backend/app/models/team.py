@@ -2,7 +2,7 @@ from __future__ import annotations
 
 from datetime import datetime
 
-from sqlalchemy import Boolean, DateTime, ForeignKey, Integer, String, Text, UniqueConstraint
+from sqlalchemy import Boolean, DateTime, ForeignKey, Index, Integer, String, Text, UniqueConstraint
 from sqlalchemy.orm import Mapped, mapped_column
 from sqlalchemy.sql import func
 
@@ -27,6 +27,8 @@ class Team(Base):
 
     __table_args__ = (
         UniqueConstraint("project_id", "name", name="uq_team_project_name"),
+        # Listado por proyecto paginado por cursor (project_id, id)
+        Index("ix_teams_project_id_id", "project_id", "id"),
     )
 
     def __repr__(self) -> str:  # pragma: no cover
@@ -1,7 +1,7 @@
 from __future__ import annotations
-from datetime import datetime
+from datetime import datetime, timezone
 
-from sqlalchemy import Integer, String, Text, ForeignKey, DateTime, func
+from sqlalchemy import Integer, String, Text, ForeignKey, DateTime, Index, func
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
 from app.db.base import Base
@@ -21,7 +21,25 @@ class Transfer(Base):
   # Instrucciones del manager para la IA
   manager_instructions: Mapped[str] = mapped_column(Text, nullable=False)
 
-  created_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), server_default=func.now(), nullable=False)
+  # Entrevista: turnos append-only + fila pequeña con la estructura extraída
+  chat_turns = relationship("TransferChatTurn", cascade="all, delete-orphan", order_by="TransferChatTurn.seq")
+  interview = relationship("TransferInterview", uselist=False, cascade="all, delete-orphan")
+
+  # Valor por defecto en Python (además del de servidor): en SQLite la fecha se
+  # guarda como texto y así tiene siempre el formato de los parámetros que
+  # compara la paginación por cursor (con microsegundos)
+  created_at: Mapped[datetime] = mapped_column(
+      DateTime(timezone=True), default=lambda: datetime.now(timezone.utc), server_default=func.now(), nullable=False
+  )
   updated_at: Mapped[datetime] = mapped_column(
       DateTime(timezone=True), server_default=func.now(), onupdate=func.now(), nullable=False
   )
+
+  # Versión para concurrencia optimista: la incrementa cada escritura (ORM o
+  # compare-and-swap del nodo persist); un valor distinto al leído => conflicto
+  version: Mapped[int] = mapped_column(Integer, nullable=False, server_default="1")
+
+  __mapper_args__ = {"version_id_col": version}
+
+  # Orden del listado y paginación por cursor: (created_at, id)
+  __table_args__ = (Index("ix_transfers_created_at_id", "created_at", "id"),)
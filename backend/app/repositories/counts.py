@@ -0,0 +1,139 @@
+from __future__ import annotations
+
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+from functools import lru_cache
+from typing import Any, Callable, Dict, Literal, Optional, Tuple
+
+from sqlalchemy import Select, delete, event, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from app.core.config import get_settings
+from app.core.metrics import metrics
+from app.models.counts import RowCount
+
+IncludeTotal = Literal["false", "approx", "exact"]
+
+
+def count_key(table: str, **filters: Any) -> str:
+    """Clave del contador: "teams" o "teams?project_id=3" (filtros None se ignoran)."""
+    parts = [f"{k}={v}" for k, v in sorted(filters.items()) if v is not None]
+    return f"{table}?{'&'.join(parts)}" if parts else table
+
+
+def _utcnow() -> datetime:
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+
+class RowCounts:
+    """
+    Totales de los listados sin COUNT(*) en cada petición:
+    caché TTL en proceso -> tabla row_counts -> COUNT(*) (y se guarda).
+    - approx: caché o contador (puede ir algo por detrás)
+    - exact: COUNT(*) siempre; de paso corrige el contador
+    Las altas y bajas ajustan el contador en su misma transacción (bump); los
+    contadores que no se ajustan (p. ej. transfers por pending_step, que cambia
+    en cada turno) se recalculan pasado `refresh_after`.
+    Los recálculos se guardan con su propia sesión (`session_factory`): nunca
+    se hace commit de la sesión de la petición. La caché se limpia después
+    del commit de la escritura, no antes.
+    """
+
+    def __init__(
+        self,
+        session_factory: Callable[[], Session],
+        ttl: float = 30.0,
+        refresh_after: float = 300.0,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self.session_factory = session_factory
+        self.ttl = ttl
+        self.refresh_after = refresh_after
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._cache: Dict[str, Tuple[float, int]] = {}
+
+    def total(self, db: Session, key: str, count_stmt: Select, mode: IncludeTotal) -> Optional[int]:
+        if mode == "false":
+            return None
+        if mode == "approx":
+            with self._lock:
+                item = self._cache.get(key)
+            if item is not None and item[0] > self._clock():
+                metrics.inc("counts.cache.hits")
+                return item[1]
+            row = db.get(RowCount, key)
+            if row is not None and row.refreshed_at > _utcnow() - timedelta(seconds=self.refresh_after):
+                metrics.inc("counts.table.hits")
+                self._remember(key, row.value)
+                return row.value
+        metrics.inc(f"counts.{mode}.computed")
+        value = db.execute(count_stmt).scalar_one()
+        self._store(key, value)
+        return value
+
+    def bump(self, db: Session, key: str, delta: int) -> None:
+        """Ajusta el contador dentro de la transacción en curso (si aún no existe, se calculará al leerlo)."""
+        db.execute(update(RowCount).where(RowCount.key == key).values(value=RowCount.value + delta))
+        self._forget_on_commit(db, lambda k: k == key)
+
+    def invalidate(self, db: Session, table: str) -> None:
+        """Descarta todos los contadores de `table` (bajas en cascada, cambios masivos)."""
+        db.execute(delete(RowCount).where((RowCount.key == table) | RowCount.key.startswith(f"{table}?")))
+        self._forget_on_commit(db, lambda k: k == table or k.startswith(f"{table}?"))
+
+    def clear(self) -> None:
+        with self._lock:
+            self._cache.clear()
+
+    def _remember(self, key: str, value: int) -> None:
+        with self._lock:
+            self._cache[key] = (self._clock() + self.ttl, value)
+
+    def _forget(self, match: Callable[[str], bool]) -> None:
+        with self._lock:
+            for k in [k for k in self._cache if match(k)]:
+                del self._cache[k]
+
+    def _forget_on_commit(self, db: Session, match: Callable[[str], bool]) -> None:
+        # Si se olvidara ya, un lector concurrente volvería a cachear el total
+        # antiguo (aún sin commit) hasta que venza el TTL
+        pending = db.info.get("row_counts.forget")
+        if pending is None:
+            pending = db.info["row_counts.forget"] = []
+            event.listen(db, "after_commit", self._after_commit)
+            event.listen(db, "after_rollback", lambda s: s.info.pop("row_counts.forget", None))
+        pending.append(match)
+
+    def _after_commit(self, db: Session) -> None:
+        for match in db.info.pop("row_counts.forget", None) or []:
+            self._forget(match)
+
+    def _store(self, key: str, value: int) -> None:
+        self._remember(key, value)
+        db = self.session_factory()
+        try:
+            row = db.get(RowCount, key)
+            if row is None:
+                db.add(RowCount(key=key, value=value, refreshed_at=_utcnow()))
+            else:
+                row.value = value
+                row.refreshed_at = _utcnow()
+            db.commit()
+        except IntegrityError:
+            # Otra petición creó el mismo contador a la vez
+            db.rollback()
+        finally:
+            db.close()
+
+
+@lru_cache(maxsize=1)
+def get_row_counts() -> RowCounts:
+    from app.db.session import SessionLocal  # import tardío
+
+    settings = get_settings()
+    return RowCounts(
+        SessionLocal, ttl=settings.COUNTS_CACHE_TTL_SECONDS, refresh_after=settings.COUNTS_REFRESH_SECONDS
+    )
@@ -0,0 +1,133 @@
+from __future__ import annotations
+
+from datetime import datetime, timedelta, timezone
+from typing import Callable, Optional, Tuple
+
+from sqlalchemy import delete, select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from app.core.metrics import metrics
+from app.models.idempotency import IdempotencyKey
+
+# (status_code, content_type, body)
+StoredResponse = Tuple[int, Optional[str], str]
+
+
+def _utcnow() -> datetime:
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+
+class IdempotencyStore:
+    """
+    Tabla acotada (TTL + nº máximo de filas) de respuestas por Idempotency-Key.
+    Cada operación abre y cierra su propia sesión corta.
+    """
+
+    def __init__(
+        self,
+        session_factory: Callable[[], Session],
+        ttl: float = 86400.0,
+        max_entries: int = 10000,
+        lease: float = 120.0,
+    ) -> None:
+        self.session_factory = session_factory
+        self.ttl = ttl
+        self.max_entries = max_entries
+        # Una reserva sin respuesta más antigua que esto se considera abandonada
+        self.lease = lease
+
+    def claim(self, scope: str, key: str, request_hash: str) -> Tuple[str, Optional[StoredResponse]]:
+        """
+        Reserva la clave para ejecutar la petición. Devuelve (resultado, respuesta):
+        - ("claimed", None): ejecutar y luego complete() o release()
+        - ("replay", respuesta): ya hay respuesta guardada
+        - ("in_progress", None): la original aún se está ejecutando
+        - ("mismatch", None): misma clave con otro cuerpo
+        """
+        now = _utcnow()
+        db = self.session_factory()
+        try:
+            row = db.get(IdempotencyKey, (scope, key))
+            if row is not None and (
+                row.expires_at <= now
+                or (row.status_code is None and row.created_at <= now - timedelta(seconds=self.lease))
+            ):
+                db.delete(row)
+                db.flush()
+                row = None
+            if row is None:
+                db.add(
+                    IdempotencyKey(
+                        scope=scope,
+                        key=key,
+                        request_hash=request_hash,
+                        created_at=now,
+                        expires_at=now + timedelta(seconds=self.ttl),
+                    )
+                )
+                try:
+                    db.commit()
+                    return "claimed", None
+                except IntegrityError:
+                    # Otra petición con la misma clave la reservó a la vez
+                    db.rollback()
+                    row = db.get(IdempotencyKey, (scope, key))
+                    if row is None:
+                        return "in_progress", None
+            if row.request_hash != request_hash:
+                return "mismatch", None
+            if row.status_code is None:
+                return "in_progress", None
+            return "replay", (row.status_code, row.content_type, row.body or "")
+        finally:
+            db.close()
+
+    def complete(self, scope: str, key: str, response: StoredResponse) -> None:
+        """Guarda la respuesta y purga caducadas / exceso sobre max_entries."""
+        status_code, content_type, body = response
+        db = self.session_factory()
+        try:
+            row = db.get(IdempotencyKey, (scope, key))
+            if row is None:
+                return
+            row.status_code = status_code
+            row.content_type = content_type
+            row.body = body
+            db.flush()
+            expired = db.execute(delete(IdempotencyKey).where(IdempotencyKey.expires_at <= _utcnow())).rowcount
+            # El exceso solo se purga entre respuestas completas: una reserva en
+            # curso (status_code NULL) debe seguir bloqueando los reintentos
+            completed = IdempotencyKey.status_code.is_not(None)
+            overflow_from = db.execute(
+                select(IdempotencyKey.created_at)
+                .where(completed)
+                .order_by(IdempotencyKey.created_at.desc())
+                .offset(self.max_entries)
+                .limit(1)
+            ).scalar_one_or_none()
+            overflow = 0
+            if overflow_from is not None:
+                overflow = db.execute(
+                    delete(IdempotencyKey).where(completed, IdempotencyKey.created_at <= overflow_from)
+                ).rowcount
+            db.commit()
+            if expired or overflow:
+                metrics.inc("idempotency.evictions", expired + overflow)
+        finally:
+            db.close()
+
+    def release(self, scope: str, key: str) -> None:
+        """Libera la reserva (la petición falló y se puede reintentar con la misma clave)."""
+        db = self.session_factory()
+        try:
+            db.execute(
+                delete(IdempotencyKey).where(
+                    IdempotencyKey.scope == scope,
+                    IdempotencyKey.key == key,
+                    IdempotencyKey.status_code.is_(None),
+                )
+            )
+            db.commit()
+        finally:
+            db.close()
@@ -0,0 +1,81 @@
+from __future__ import annotations
+
+import threading
+from collections import OrderedDict
+from functools import lru_cache
+from typing import Optional, Tuple
+
+from app.ai.langgraph.state import InterviewState
+from app.core.config import get_settings
+from app.core.metrics import metrics
+
+
+class InterviewStateCache:
+    """
+    LRU en proceso de estados de entrevista vivos, por transfer_id.
+    Cada entrada guarda la Transfer.version con la que se escribió; si la
+    versión en BD no coincide, la entrada se descarta (cualquier escritura
+    de la transferencia, p. ej. un PUT, sube la versión). Se rellena al
+    persistir (write-through) y al cargar.
+    """
+
+    def __init__(self, max_entries: int = 512) -> None:
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._data: "OrderedDict[int, Tuple[int, InterviewState]]" = OrderedDict()
+
+    def get(self, transfer_id: int, version: int) -> Optional[InterviewState]:
+        """Copia del estado si la versión coincide (el llamante puede mutarla)."""
+        with self._lock:
+            item = self._data.get(transfer_id)
+            if item is None:
+                metrics.inc("interview.cache.misses")
+                return None
+            cached_version, state = item
+            if cached_version != version:
+                del self._data[transfer_id]
+                metrics.inc("interview.cache.stale")
+                return None
+            self._data.move_to_end(transfer_id)
+        metrics.inc("interview.cache.hits")
+        return _detach(state)
+
+    def put(self, transfer_id: int, version: int, state: InterviewState) -> None:
+        snapshot = _detach(state, user_message=None, job_id=None)
+        with self._lock:
+            self._data[transfer_id] = (version, snapshot)
+            self._data.move_to_end(transfer_id)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+
+    def invalidate(self, transfer_id: int) -> None:
+        with self._lock:
+            self._data.pop(transfer_id, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+
+def _detach(state: InterviewState, **update: object) -> InterviewState:
+    """
+    Copia que no comparte contenedores mutables con `state`. Los turnos son
+    inmutables (ChatTurn frozen): basta con copiar la lista, no cada turno.
+    """
+    return state.model_copy(
+        update={
+            "responsabilidades": list(state.responsabilidades),
+            "tareas": {resp: list(tasks) for resp, tasks in state.tareas.items()},
+            "thread": list(state.thread),
+            **update,
+        }
+    )
+
+
+@lru_cache(maxsize=1)
+def get_interview_cache() -> InterviewStateCache:
+    """Caché compartida por proceso."""
+    return InterviewStateCache(get_settings().INTERVIEW_STATE_CACHE_SIZE)
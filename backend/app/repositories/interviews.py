@@ -0,0 +1,188 @@
+from __future__ import annotations
+
+import json
+from typing import Any, Dict, List, Optional, Tuple
+
+from sqlalchemy import insert, select, update
+from sqlalchemy.orm import Session
+
+from app.ai.langgraph.state import InterviewState
+from app.models.interview import TransferChatTurn, TransferInterview
+from app.models.transfer import Transfer
+from app.repositories.interview_cache import get_interview_cache
+
+
+class StaleInterviewError(RuntimeError):
+    """Otra escritura cambió la transferencia desde que se leyó el estado (reintentable)."""
+
+
+def _state_from_data(data: Any) -> InterviewState:
+    """Normaliza un estado guardado (dict). Si no es válido, devuelve un estado nuevo."""
+    if not isinstance(data, dict):
+        return InterviewState()
+    try:
+        return InterviewState(
+            responsabilidades=data.get("responsabilidades") or [],
+            tareas=data.get("tareas") or {},
+            pending_step=data.get("pending_step") or "ask_resp",
+            last_assistant=data.get("last_assistant"),
+            thread=[
+                {"role": turn.get("role", "assistant"), "content": turn.get("content", "")}
+                for turn in (data.get("thread") or [])
+                if isinstance(turn, dict)
+            ],
+        )
+    except Exception:
+        # Si está corrupto, reinicia
+        return InterviewState()
+
+
+def _state_from_json(raw: str | None) -> InterviewState:
+    """Estado en formato legado (JSON en texto dentro de Transfer.manager_instructions)."""
+    raw = (raw or "").strip()
+    if not raw:
+        return InterviewState()
+    try:
+        return _state_from_data(json.loads(raw))
+    except ValueError:
+        return InterviewState()
+
+
+def read_interview_state(db: Session, transfer: Transfer) -> InterviewState:
+    """
+    Carga el estado de la entrevista: solo la fila de estructura. El grafo no
+    lee el historial (solo añade turnos), así que `thread` empieza vacío y
+    `persisted_turns` es el seq del siguiente turno; el hilo completo se lee
+    aparte (read_thread / list_turns) cuando alguien lo pide.
+    Sin fila propia, interpreta el JSON legado de manager_instructions; esos
+    turnos se guardan en chat_turns en el siguiente persist.
+    """
+    row = db.get(TransferInterview, transfer.id)
+    if row is None:
+        s = _state_from_json(transfer.manager_instructions)
+        s.version = transfer.version
+        return s
+
+    s = _state_from_data(row.state)
+    s.persisted_turns = row.turn_count
+    s.version = transfer.version
+    return s
+
+
+def load_interview_state(db: Session, transfer: Transfer) -> Dict[str, Any]:
+    """Como read_interview_state, pero como dict (estado de los grafos)."""
+    return read_interview_state(db, transfer).model_dump()
+
+
+def transfer_version(db: Session, transfer_id: int) -> Optional[int]:
+    """Transfer.version actual; None si la transferencia no existe."""
+    return db.execute(select(Transfer.version).where(Transfer.id == transfer_id)).scalar_one_or_none()
+
+
+def get_interview_state(db: Session, transfer_id: int) -> Optional[InterviewState]:
+    """
+    Estado para el siguiente turno. Si la caché en proceso tiene la misma
+    versión que la BD, evita leer los turnos y volver a validar el estado.
+    Devuelve None si la transferencia no existe.
+    """
+    version = transfer_version(db, transfer_id)
+    if version is None:
+        return None
+    cache = get_interview_cache()
+    cached = cache.get(transfer_id, version)
+    if cached is not None:
+        return cached
+
+    s = read_interview_state(db, db.get(Transfer, transfer_id))
+    cache.put(transfer_id, s.version, s)
+    return s
+
+
+def read_thread(db: Session, transfer_id: int, upto: int) -> List[Dict[str, str]]:
+    """Hilo completo (turnos con seq < upto, en orden) para las respuestas view=full."""
+    return [
+        {"role": role, "content": content}
+        for role, content in db.execute(
+            select(TransferChatTurn.role, TransferChatTurn.content)
+            .where(TransferChatTurn.transfer_id == transfer_id, TransferChatTurn.seq < upto)
+            .order_by(TransferChatTurn.seq)
+        ).all()
+    ]
+
+
+def job_turns(db: Session, transfer_id: int, job_id: str) -> Optional[Tuple[int, List[Dict[str, str]]]]:
+    """
+    (seq del primero, turnos) que escribió el trabajo `job_id`, o None si
+    su turno no llegó a guardarse.
+    """
+    rows = db.execute(
+        select(TransferChatTurn.seq, TransferChatTurn.role, TransferChatTurn.content)
+        .where(TransferChatTurn.job_id == job_id, TransferChatTurn.transfer_id == transfer_id)
+        .order_by(TransferChatTurn.seq)
+    ).all()
+    if not rows:
+        return None
+    return rows[0][0], [{"role": role, "content": content} for _, role, content in rows]
+
+
+def list_turns(db: Session, transfer_id: int, after: int = -1, limit: int = 50) -> List[Tuple[int, str, str]]:
+    """Turnos (seq, role, content) con seq > after, en orden; usa la PK (transfer_id, seq)."""
+    return [
+        tuple(row)
+        for row in db.execute(
+            select(TransferChatTurn.seq, TransferChatTurn.role, TransferChatTurn.content)
+            .where(TransferChatTurn.transfer_id == transfer_id, TransferChatTurn.seq > after)
+            .order_by(TransferChatTurn.seq)
+            .limit(limit)
+        ).all()
+    ]
+
+
+def save_interview_state(db: Session, transfer_id: int, state: InterviewState) -> int:
+    """
+    Compare-and-swap sobre Transfer.version (debe seguir siendo state.version),
+    añade los turnos de state.thread (desde seq = persisted_turns) y reescribe la fila
+    pequeña de estructura. Devuelve la nueva versión. No hace commit.
+    Lanza StaleInterviewError si otra escritura se adelantó.
+    """
+    swapped = db.execute(
+        update(Transfer)
+        .where(Transfer.id == transfer_id, Transfer.version == state.version)
+        .values(version=Transfer.version + 1)
+    ).rowcount
+    if swapped != 1:
+        if transfer_version(db, transfer_id) is None:
+            raise ValueError(f"Transfer {transfer_id} no encontrada")
+        raise StaleInterviewError(f"Transfer {transfer_id} modificada por otra petición")
+
+    base = state.persisted_turns
+    new_turns = state.thread
+    if new_turns:
+        db.execute(
+            insert(TransferChatTurn),
+            [
+                {
+                    "transfer_id": transfer_id,
+                    "seq": base + i,
+                    "role": turn.role,
+                    "content": turn.content,
+                    "job_id": state.job_id,
+                }
+                for i, turn in enumerate(new_turns)
+            ],
+        )
+
+    payload = {
+        "responsabilidades": state.responsabilidades,
+        "tareas": state.tareas,
+        "pending_step": state.pending_step,
+        "last_assistant": state.last_assistant,
+    }
+    row = db.get(TransferInterview, transfer_id)
+    if row is None:
+        row = TransferInterview(transfer_id=transfer_id)
+    row.state = payload
+    row.pending_step = state.pending_step
+    row.turn_count = base + len(new_turns)
+    db.add(row)
+    return state.version + 1
@@ -0,0 +1,100 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import threading
+import time
+from collections import defaultdict
+from functools import lru_cache
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from app.core.config import get_settings
+from app.core.metrics import metrics
+from app.models.associations import team_managers
+from app.models.project import Project
+from app.models.team import Team
+from app.models.user import User
+from app.schemas.project import ProjectRead
+from app.schemas.projection import dump_rows, schema_columns
+from app.schemas.team import TeamRead
+from app.schemas.user import UserRead
+
+
+def build_org_tree(db: Session) -> Dict[str, Any]:
+    """
+    Árbol proyectos -> equipos -> managers con tres consultas (una por
+    tabla), sea cual sea el tamaño de la organización; se ensambla en memoria.
+    """
+    projects = db.execute(select(*schema_columns(Project, ProjectRead)).order_by(Project.id)).all()
+    teams = db.execute(select(*schema_columns(Team, TeamRead)).order_by(Team.project_id, Team.id)).all()
+    managers = db.execute(
+        select(team_managers.c.team_id, *schema_columns(User, UserRead))
+        .select_from(User)
+        .join(team_managers, team_managers.c.user_id == User.id)
+        .order_by(team_managers.c.team_id, User.id)
+    ).all()
+
+    by_team: Dict[int, List[Any]] = defaultdict(list)
+    for row, item in zip(managers, dump_rows(UserRead, managers)):
+        by_team[row.team_id].append(item)
+    by_project: Dict[int, List[Any]] = defaultdict(list)
+    for row, item in zip(teams, dump_rows(TeamRead, teams)):
+        item["managers"] = by_team.get(row.id, [])
+        by_project[row.project_id].append(item)
+    items = dump_rows(ProjectRead, projects)
+    for row, item in zip(projects, items):
+        item["teams"] = by_project.get(row.id, [])
+    return {"projects": items}
+
+
+class OrgTreeCache:
+    """
+    Árbol organizativo ya serializado (JSON) en memoria, con su ETag.
+    - Las rutas que modifican proyectos, equipos o managers llaman a
+      invalidate() tras su commit: sube la versión y descarta el árbol
+    - Un árbol construido con una versión anterior no se guarda (una
+      invalidación concurrente gana)
+    - `ttl` acota lo que un worker puede servir sin enterarse de las
+      escrituras hechas en otro proceso
+    Métricas: org_tree.cache.hits / org_tree.cache.misses y tiempo org_tree.build.
+    """
+
+    def __init__(self, ttl: float = 60.0, clock: Callable[[], float] = time.monotonic) -> None:
+        self.ttl = ttl
+        self._clock = clock
+        self._lock = threading.Lock()
+        self.version = 0
+        self._entry: Optional[Tuple[int, float, str, bytes]] = None  # (versión, expira, etag, cuerpo)
+
+    def get(self, db: Session) -> Tuple[str, bytes]:
+        """(etag, cuerpo JSON) del árbol, desde caché o reconstruido."""
+        with self._lock:
+            entry = self._entry
+            version = self.version
+        if entry is not None and entry[0] == version and entry[1] > self._clock():
+            metrics.inc("org_tree.cache.hits")
+            return entry[2], entry[3]
+
+        metrics.inc("org_tree.cache.misses")
+        started = time.perf_counter()
+        body = json.dumps(build_org_tree(db), ensure_ascii=False, separators=(",", ":")).encode()
+        metrics.observe("org_tree.build", time.perf_counter() - started)
+        # ETag del contenido: igual en todos los workers para el mismo árbol
+        etag = f'"{hashlib.sha256(body).hexdigest()[:32]}"'
+        with self._lock:
+            if self.version == version:
+                self._entry = (version, self._clock() + self.ttl, etag, body)
+        return etag, body
+
+    def invalidate(self) -> None:
+        with self._lock:
+            self.version += 1
+            self._entry = None
+
+
+@lru_cache(maxsize=1)
+def get_org_tree_cache() -> OrgTreeCache:
+    return OrgTreeCache(ttl=get_settings().ORG_TREE_CACHE_TTL_SECONDS)
@@ -0,0 +1,13 @@
+from __future__ import annotations
+
+from typing import Optional
+
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from app.models.user import User
+
+
+def get_user_by_email(db: Session, email: str) -> Optional[User]:
+    """Usuario por email (único) o None. Síncrono: desde rutas async, vía anyio.to_thread."""
+    return db.execute(select(User).where(User.email == email)).scalar_one_or_none()
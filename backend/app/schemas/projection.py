@@ -0,0 +1,32 @@
+from __future__ import annotations
+
+from functools import lru_cache
+from typing import AbstractSet, Any, Dict, List, Optional, Sequence, Type
+
+from pydantic import BaseModel, TypeAdapter
+from sqlalchemy.orm import InstrumentedAttribute
+
+
+def schema_columns(model: Any, schema: Type[BaseModel]) -> List[InstrumentedAttribute]:
+    """Columnas de `model` que necesita `schema` (mismo nombre que sus campos)."""
+    return [getattr(model, name) for name in schema.model_fields]
+
+
+@lru_cache(maxsize=None)
+def _list_adapter(schema: Type[BaseModel]) -> TypeAdapter:
+    # Un TypeAdapter por esquema, construido una sola vez por proceso
+    return TypeAdapter(List[schema])  # type: ignore[valid-type]
+
+
+def dump_rows(
+    schema: Type[BaseModel], rows: Sequence[Any], fields: Optional[AbstractSet[str]] = None
+) -> List[Dict[str, Any]]:
+    """
+    Valida y serializa de una vez filas proyectadas (Row con atributos por
+    columna) con el esquema de lectura; devuelve dicts listos para JSON.
+    Evita hidratar entidades ORM y el model_validate fila a fila.
+    `fields` limita las claves de cada elemento (?fields=).
+    """
+    adapter = _list_adapter(schema)
+    include = {"__all__": set(fields)} if fields is not None else None
+    return adapter.dump_python(adapter.validate_python(rows, from_attributes=True), mode="json", include=include)
@@ -22,6 +22,7 @@ class TransferUpdate(BaseModel):
 
 class TransferRead(TransferBase):
     id: int
+    version: int
     created_at: datetime
     updated_at: datetime
 
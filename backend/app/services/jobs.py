@@ -0,0 +1,243 @@
+from __future__ import annotations
+
+import asyncio
+import json
+import logging
+import sqlite3
+import threading
+import time
+import uuid
+from datetime import datetime, timezone
+from functools import lru_cache
+from typing import Any, Awaitable, Callable, Dict, List, NamedTuple, Optional
+
+import anyio
+
+from app.core.config import get_settings
+from app.core.metrics import metrics
+
+logger = logging.getLogger("jobs")
+
+TERMINAL = {"done", "failed"}
+
+
+class Job(NamedTuple):
+    id: str
+    transfer_id: int
+    message: str
+    view: str
+    enqueued_at: float
+    started_at: float
+
+
+class SQLiteJobQueue:
+    """
+    Cola local de turnos de chat en SQLite (sin servicios externos).
+    Estados: queued -> running -> done | failed. Un trabajo "running" con más
+    de `lease` segundos (proceso caído) vuelve a poder reclamarse. Los
+    terminados se purgan pasado `ttl`.
+    """
+
+    def __init__(self, path: str, ttl: float = 86400.0, lease: float = 600.0, clock: Callable[[], float] = time.time) -> None:
+        self.path = path
+        self.ttl = ttl
+        self.lease = lease
+        self._clock = clock
+        self._local = threading.local()
+        with self._conn() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS chat_jobs ("
+                " id TEXT PRIMARY KEY, transfer_id INTEGER NOT NULL, message TEXT NOT NULL,"
+                " view TEXT NOT NULL, status TEXT NOT NULL, result TEXT, error TEXT,"
+                " enqueued_at REAL NOT NULL, started_at REAL, finished_at REAL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS ix_chat_jobs_status ON chat_jobs (status, enqueued_at)")
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            # isolation_level=None: transacciones explícitas (BEGIN IMMEDIATE al reclamar)
+            conn = sqlite3.connect(self.path, timeout=5.0, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            self._local.conn = conn
+        return conn
+
+    def enqueue(self, transfer_id: int, message: str, view: str) -> str:
+        job_id = uuid.uuid4().hex
+        now = self._clock()
+        conn = self._conn()
+        conn.execute(
+            "INSERT INTO chat_jobs (id, transfer_id, message, view, status, enqueued_at) VALUES (?, ?, ?, ?, 'queued', ?)",
+            (job_id, transfer_id, message, view, now),
+        )
+        conn.execute("DELETE FROM chat_jobs WHERE status IN ('done', 'failed') AND finished_at <= ?", (now - self.ttl,))
+        return job_id
+
+    def claim(self) -> Optional[Job]:
+        """Marca como running el trabajo pendiente más antiguo y lo devuelve (o None)."""
+        now = self._clock()
+        conn = self._conn()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            row = conn.execute(
+                "SELECT id, transfer_id, message, view, enqueued_at FROM chat_jobs"
+                " WHERE status = 'queued' OR (status = 'running' AND started_at <= ?)"
+                " ORDER BY enqueued_at LIMIT 1",
+                (now - self.lease,),
+            ).fetchone()
+            if row is not None:
+                conn.execute("UPDATE chat_jobs SET status = 'running', started_at = ? WHERE id = ?", (now, row[0]))
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        return Job(*row, started_at=now) if row else None
+
+    def finish(self, job_id: str, result: Dict[str, Any]) -> None:
+        self._conn().execute(
+            "UPDATE chat_jobs SET status = 'done', result = ?, finished_at = ? WHERE id = ?",
+            (json.dumps(result, ensure_ascii=False), self._clock(), job_id),
+        )
+
+    def fail(self, job_id: str, error: Dict[str, Any]) -> None:
+        self._conn().execute(
+            "UPDATE chat_jobs SET status = 'failed', error = ?, finished_at = ? WHERE id = ?",
+            (json.dumps(error, ensure_ascii=False), self._clock(), job_id),
+        )
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        row = self._conn().execute(
+            "SELECT id, transfer_id, status, result, error, enqueued_at, started_at, finished_at"
+            " FROM chat_jobs WHERE id = ?",
+            (job_id,),
+        ).fetchone()
+        if row is None:
+            return None
+        return {
+            "id": row[0],
+            "transfer_id": row[1],
+            "status": row[2],
+            "result": json.loads(row[3]) if row[3] else None,
+            "error": json.loads(row[4]) if row[4] else None,
+            "enqueued_at": _iso(row[5]),
+            "started_at": _iso(row[6]),
+            "finished_at": _iso(row[7]),
+        }
+
+    def depth(self) -> int:
+        return self._conn().execute("SELECT COUNT(*) FROM chat_jobs WHERE status = 'queued'").fetchone()[0]
+
+
+def _iso(ts: Optional[float]) -> Optional[str]:
+    return datetime.fromtimestamp(ts, timezone.utc).isoformat() if ts is not None else None
+
+
+JobHandler = Callable[[Job], Awaitable[Dict[str, Any]]]
+
+
+class JobWorkerPool:
+    """
+    Workers asyncio en proceso sobre SQLiteJobQueue. Se arrancan en el event
+    loop en curso (startup o primer enqueue); si el loop cambia (tests), se
+    vuelven a crear. Métricas: gauge jobs.queue.depth, tiempos jobs.wait y
+    jobs.run, contadores jobs.enqueued / jobs.done / jobs.failed.
+    """
+
+    def __init__(self, queue: SQLiteJobQueue, handler: JobHandler, workers: int = 2, poll_interval: float = 1.0) -> None:
+        self.queue = queue
+        self.handler = handler
+        self.workers = workers
+        self.poll_interval = poll_interval
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._tasks: List["asyncio.Task[None]"] = []
+        self._wakeup: Optional[asyncio.Event] = None
+        self._finished: Optional[asyncio.Condition] = None
+
+    def start(self) -> None:
+        loop = asyncio.get_running_loop()
+        if self._loop is loop and self._tasks:
+            return
+        self._loop = loop
+        self._wakeup = asyncio.Event()
+        self._finished = asyncio.Condition()
+        self._tasks = [loop.create_task(self._worker(), name=f"chat-job-{i}") for i in range(self.workers)]
+
+    def stop(self) -> None:
+        for task in self._tasks:
+            task.cancel()
+        self._tasks = []
+        self._loop = None
+
+    async def submit(self, transfer_id: int, message: str, view: str) -> str:
+        self.start()
+        job_id = await anyio.to_thread.run_sync(self.queue.enqueue, transfer_id, message, view)
+        metrics.inc("jobs.enqueued")
+        await self._update_depth()
+        self._wakeup.set()  # type: ignore[union-attr]
+        return job_id
+
+    async def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        return await anyio.to_thread.run_sync(self.queue.get, job_id)
+
+    async def wait_change(self, timeout: float) -> None:
+        """Espera a que termine algún trabajo de este proceso (o al timeout)."""
+        if self._finished is None or self._loop is not asyncio.get_running_loop():
+            await asyncio.sleep(timeout)
+            return
+        async with self._finished:
+            try:
+                await asyncio.wait_for(self._finished.wait(), timeout)
+            except asyncio.TimeoutError:
+                pass
+
+    async def _update_depth(self) -> None:
+        metrics.set_gauge("jobs.queue.depth", await anyio.to_thread.run_sync(self.queue.depth))
+
+    async def _worker(self) -> None:
+        assert self._wakeup is not None
+        while True:
+            self._wakeup.clear()
+            try:
+                job = await anyio.to_thread.run_sync(self.queue.claim)
+            except sqlite3.Error:
+                logger.exception("No se pudo leer la cola de trabajos")
+                job = None
+            if job is None:
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), self.poll_interval)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+            await self._update_depth()
+            await self._run(job)
+
+    async def _run(self, job: Job) -> None:
+        metrics.observe("jobs.wait", job.started_at - job.enqueued_at)
+        started = time.perf_counter()
+        try:
+            result = await self.handler(job)
+        except Exception as exc:
+            # HTTPException (404/409) conserva su código; el resto es un 500 genérico
+            status_code = getattr(exc, "status_code", 500)
+            if status_code >= 500:
+                logger.exception("Error en el trabajo %s (transfer %s)", job.id, job.transfer_id)
+            detail = getattr(exc, "detail", "Error procesando el mensaje")
+            await anyio.to_thread.run_sync(self.queue.fail, job.id, {"status": status_code, "detail": detail})
+            metrics.inc("jobs.failed")
+        else:
+            await anyio.to_thread.run_sync(self.queue.finish, job.id, result)
+            metrics.inc("jobs.done")
+        finally:
+            metrics.observe("jobs.run", time.perf_counter() - started)
+        async with self._finished:  # type: ignore[union-attr]
+            self._finished.notify_all()  # type: ignore[union-attr]
+
+
+@lru_cache(maxsize=1)
+def get_job_pool() -> JobWorkerPool:
+    """Cola y workers compartidos por proceso (modo async de /message)."""
+    from app.api.routes.chat_transfer import run_message_job  # import tardío
+
+    settings = get_settings()
+    queue = SQLiteJobQueue(settings.CHAT_JOBS_SQLITE_PATH, ttl=settings.CHAT_JOBS_TTL_SECONDS)
+    return JobWorkerPool(queue, run_message_job, workers=settings.CHAT_JOB_WORKERS)
@@ -0,0 +1,85 @@
+"""
+Micro-benchmark del camino /chat-transfer/{id}/message (grafo de mensaje).
+
+Compara peticiones por segundo:
+- "per-request": compila el grafo en cada petición (comportamiento anterior)
+- "precompiled": reutiliza el grafo compilado a nivel de módulo
+
+Usa SQLite temporal y el parser heurístico (sin OPENAI_API_KEY), de modo que
+solo mide el coste propio del grafo y de la persistencia.
+
+Uso (desde backend/):
+    python -m benchmarks.bench_chat_message [iteraciones]
+"""
+from __future__ import annotations
+
+import os
+import sys
+import tempfile
+import time
+
+_tmp = tempfile.NamedTemporaryFile(suffix=".db", delete=False)
+os.environ["DATABASE_URL"] = f"sqlite:///{_tmp.name}"
+os.environ.pop("OPENAI_API_KEY", None)
+
+from app.db.base import Base  # noqa: E402
+from app.db.session import engine, SessionLocal  # noqa: E402
+from app.models import User, Transfer  # noqa: E402
+from app.ai.langgraph.flows import build_message_app, message_app, graph_config  # noqa: E402
+from app.repositories.interviews import read_interview_state  # noqa: E402
+
+
+MESSAGE = "- Coordinación de equipo\n- Gestión de proveedores\n- Reporting mensual"
+
+
+def _new_transfer() -> int:
+    db = SessionLocal()
+    try:
+        u = db.query(User).first()
+        if u is None:
+            u = User(email="bench@example.com", hashed_password="x", role="USER")
+            db.add(u)
+            db.commit()
+        t = Transfer(position="Bench", outgoing_user_id=u.id, manager_instructions="")
+        db.add(t)
+        db.commit()
+        return t.id
+    finally:
+        db.close()
+
+
+def _state(transfer_id: int) -> dict:
+    # Igual que la ruta: carga el estado guardado y añade el mensaje del usuario
+    db = SessionLocal()
+    try:
+        s = read_interview_state(db, db.get(Transfer, transfer_id))
+    finally:
+        db.close()
+    s.user_message = MESSAGE
+    return s.model_dump()
+
+
+def _run(label: str, n: int, get_app) -> float:
+    transfer_id = _new_transfer()
+    cfg = graph_config(transfer_id, SessionLocal)
+    elapsed = 0.0
+    for _ in range(n):
+        state = _state(transfer_id)  # la carga no entra en la medición
+        start = time.perf_counter()
+        get_app().invoke(state, config=cfg)
+        elapsed += time.perf_counter() - start
+    rps = n / elapsed
+    print(f"{label:<12} {n:>6} req  {elapsed:8.3f}s  {rps:10.1f} req/s")
+    return rps
+
+
+if __name__ == "__main__":
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 300
+    Base.metadata.create_all(bind=engine)
+    try:
+        before = _run("per-request", n, build_message_app)
+        after = _run("precompiled", n, lambda: message_app)
+        print(f"speedup      x{after / before:.2f}")
+    finally:
+        engine.dispose()
+        os.unlink(_tmp.name)
@@ -0,0 +1,97 @@
+"""
+Micro-benchmark de la paginación de GET /transfers según la profundidad.
+
+Compara el tiempo por página (20 filas) en la primera página y en una
+página profunda (cerca del final) con:
+- "offset": ORDER BY ... OFFSET n (paginación clásica por page)
+- "keyset": cursor con los valores de la última fila como parámetros (keyset_page)
+
+Con keyset la página profunda debe costar lo mismo que la primera.
+Usa SQLite temporal.
+
+Uso (desde backend/):
+    python -m benchmarks.bench_keyset_pagination [filas]
+"""
+from __future__ import annotations
+
+import os
+import sys
+import tempfile
+import time
+
+_tmp = tempfile.NamedTemporaryFile(suffix=".db", delete=False)
+os.environ["DATABASE_URL"] = f"sqlite:///{_tmp.name}"
+
+from sqlalchemy import insert, select  # noqa: E402
+
+from app.api.pagination import keyset_page  # noqa: E402
+from app.db.base import Base  # noqa: E402
+from app.db.session import engine, SessionLocal  # noqa: E402
+from app.models import User, Transfer  # noqa: E402
+from app.schemas.projection import schema_columns  # noqa: E402
+from app.schemas.transfer import TransferRead  # noqa: E402
+
+SIZE = 20
+KEYS = [Transfer.created_at, Transfer.id]
+ORDER = (Transfer.created_at.desc(), Transfer.id.desc())
+
+
+def _seed(n: int) -> None:
+    db = SessionLocal()
+    try:
+        u = User(email="bench@example.com", hashed_password="x", role="USER")
+        db.add(u)
+        db.commit()
+        rows = [{"position": f"Bench {i}", "outgoing_user_id": u.id, "manager_instructions": ""} for i in range(n)]
+        db.execute(insert(Transfer), rows)
+        db.commit()
+    finally:
+        db.close()
+
+
+def _deep_cursor(db, depth: int) -> str:
+    # Recorre con páginas grandes hasta `depth` filas (fuera de la medición)
+    cursor = ""
+    base = select(*schema_columns(Transfer, TransferRead))
+    for _ in range(depth // 1000):
+        _, cursor = keyset_page(db, base, KEYS, cursor, 1000, descending=True)
+    return cursor
+
+
+def _time(fn, reps: int) -> float:
+    start = time.perf_counter()
+    for _ in range(reps):
+        fn()
+    return (time.perf_counter() - start) / reps * 1000
+
+
+def _run(n: int, reps: int = 50) -> None:
+    base = select(*schema_columns(Transfer, TransferRead))
+    depth = n - n // 20  # ~95 % del listado
+    db = SessionLocal()
+    try:
+        deep = _deep_cursor(db, depth)
+        cases = {
+            ("offset", "first"): lambda: db.execute(base.order_by(*ORDER).limit(SIZE)).all(),
+            ("offset", "deep"): lambda: db.execute(base.order_by(*ORDER).offset(depth).limit(SIZE)).all(),
+            ("keyset", "first"): lambda: keyset_page(db, base, KEYS, "", SIZE, descending=True),
+            ("keyset", "deep"): lambda: keyset_page(db, base, KEYS, deep, SIZE, descending=True),
+        }
+        results = {case: _time(fn, reps) for case, fn in cases.items()}
+    finally:
+        db.close()
+    for (mode, page), ms in results.items():
+        print(f"{mode:<8} {page:<6} {ms:8.3f} ms/página")
+    for mode in ("offset", "keyset"):
+        print(f"{mode:<8} deep/first x{results[(mode, 'deep')] / results[(mode, 'first')]:.2f}")
+
+
+if __name__ == "__main__":
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 200_000
+    Base.metadata.create_all(bind=engine)
+    try:
+        _seed(n)
+        _run(n)
+    finally:
+        engine.dispose()
+        os.unlink(_tmp.name)
@@ -0,0 +1,87 @@
+"""
+Micro-benchmark de la serialización de los listados (GET /transfers).
+
+Compara filas por segundo para páginas de 100 y 10.000 transferencias:
+- "orm": select(Transfer) (entidades + JOIN de outgoing_user) y
+  TransferRead.model_validate fila a fila (comportamiento anterior)
+- "projected": select de las columnas de TransferRead y validación/volcado
+  en bloque con un TypeAdapter reutilizable (dump_rows)
+
+Mide consulta + serialización sobre SQLite temporal.
+
+Uso (desde backend/):
+    python -m benchmarks.bench_list_serialization [repeticiones]
+"""
+from __future__ import annotations
+
+import os
+import sys
+import tempfile
+import time
+
+_tmp = tempfile.NamedTemporaryFile(suffix=".db", delete=False)
+os.environ["DATABASE_URL"] = f"sqlite:///{_tmp.name}"
+
+from sqlalchemy import select  # noqa: E402
+
+from app.db.base import Base  # noqa: E402
+from app.db.session import engine, SessionLocal  # noqa: E402
+from app.models import User, Transfer  # noqa: E402
+from app.schemas.projection import dump_rows, schema_columns  # noqa: E402
+from app.schemas.transfer import TransferRead  # noqa: E402
+
+ROWS = 10_000
+ORDER = (Transfer.created_at.desc(), Transfer.id.desc())
+
+
+def _seed() -> None:
+    db = SessionLocal()
+    try:
+        u = User(email="bench@example.com", hashed_password="x", role="USER")
+        db.add(u)
+        db.commit()
+        db.add_all(
+            [Transfer(position=f"Bench {i}", outgoing_user_id=u.id, manager_instructions="- tarea") for i in range(ROWS)]
+        )
+        db.commit()
+    finally:
+        db.close()
+
+
+def _orm(db, size: int) -> list:
+    items = db.execute(select(Transfer).order_by(*ORDER).limit(size)).scalars().all()
+    return [TransferRead.model_validate(t).model_dump(mode="json") for t in items]
+
+
+def _projected(db, size: int) -> list:
+    rows = db.execute(select(*schema_columns(Transfer, TransferRead)).order_by(*ORDER).limit(size)).all()
+    return dump_rows(TransferRead, rows)
+
+
+def _run(label: str, size: int, n: int, fn) -> float:
+    elapsed = 0.0
+    for _ in range(n):
+        db = SessionLocal()  # sesión nueva: sin entidades en el identity map
+        try:
+            start = time.perf_counter()
+            fn(db, size)
+            elapsed += time.perf_counter() - start
+        finally:
+            db.close()
+    rps = size * n / elapsed
+    print(f"{label:<12} {size:>6} filas x{n:<4} {elapsed:8.3f}s  {rps:12.0f} filas/s")
+    return rps
+
+
+if __name__ == "__main__":
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 20
+    Base.metadata.create_all(bind=engine)
+    try:
+        _seed()
+        for size, reps in ((100, n * 50), (ROWS, n)):
+            before = _run("orm", size, reps, _orm)
+            after = _run("projected", size, reps, _projected)
+            print(f"speedup      x{after / before:.2f}")
+    finally:
+        engine.dispose()
+        os.unlink(_tmp.name)
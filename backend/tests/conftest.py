@@ -1,10 +1,57 @@
+import os
+import tempfile
+
 import pytest
-from httpx import AsyncClient
 
-from app.main import app
+# BD SQLite temporal para los tests (antes de importar la app/engine)
+_db_file = tempfile.NamedTemporaryFile(suffix=".db", delete=False)
+os.environ["DATABASE_URL"] = f"sqlite:///{_db_file.name}"
+_jobs_file = tempfile.NamedTemporaryFile(suffix=".db", delete=False)
+os.environ["CHAT_JOBS_SQLITE_PATH"] = _jobs_file.name
+os.environ.pop("OPENAI_API_KEY", None)
+
+from httpx import AsyncClient  # noqa: E402
+
+from app.main import app  # noqa: E402
+from app.db.base import Base  # noqa: E402
+from app.db.session import engine, SessionLocal  # noqa: E402
+from app.models import User, Transfer  # noqa: E402
+
+Base.metadata.create_all(bind=engine)
 
 
 @pytest.fixture
 async def client():
     async with AsyncClient(app=app, base_url="http://test") as ac:
         yield ac
+
+
+@pytest.fixture
+def db():
+    session = SessionLocal()
+    try:
+        yield session
+    finally:
+        session.close()
+
+
+@pytest.fixture
+def transfer_id(db) -> int:
+    """Crea una transferencia vacía (con su persona saliente) y devuelve su id."""
+    n = db.query(User).count()
+    user = User(email=f"outgoing{n}@example.com", hashed_password="x", role="USER")
+    db.add(user)
+    db.commit()
+    t = Transfer(position="Analista", outgoing_user_id=user.id, manager_instructions="")
+    db.add(t)
+    db.commit()
+    return t.id
+
+
+def pytest_sessionfinish(session, exitstatus):
+    engine.dispose()
+    for path in (_db_file.name, _jobs_file.name):
+        try:
+            os.unlink(path)
+        except OSError:
+            pass
@@ -0,0 +1,112 @@
+import asyncio
+
+import pytest
+
+from app.ai.langgraph import nodes
+from app.api.admission import AdmissionController, ChatAdmission, get_chat_admission
+from app.core.metrics import metrics
+from app.main import app
+from app.models import TransferChatTurn
+
+
+@pytest.fixture
+def admission():
+    def _install(max_in_flight=32, max_queue=64, queue_timeout=10.0, **limits):
+        instance = ChatAdmission(AdmissionController(max_in_flight, max_queue, queue_timeout), **limits)
+        app.dependency_overrides[get_chat_admission] = lambda: instance
+        return instance
+
+    yield _install
+    app.dependency_overrides.pop(get_chat_admission, None)
+
+
+@pytest.fixture
+def llm_calls(monkeypatch):
+    real = nodes.get_llm_adapter()
+    calls = []
+
+    class _SlowLLM:
+        async def aextract(self, *args, **kwargs):
+            calls.append(args)
+            await asyncio.sleep(0.2)
+            return await real.aextract(*args, **kwargs)
+
+    monkeypatch.setattr(nodes, "get_llm_adapter", lambda: _SlowLLM())
+    return calls
+
+
+@pytest.mark.asyncio
+async def test_overload_is_shed_with_503_without_llm_call(client, db, transfer_id, admission, llm_calls):
+    await client.post(f"/api/v1/chat-transfer/{transfer_id}/start")
+    admission(max_in_flight=1, max_queue=0)
+    metrics.reset()
+
+    url = f"/api/v1/chat-transfer/{transfer_id}/message"
+    responses = await asyncio.gather(
+        client.post(url, json={"message": "- Coordinación"}),
+        client.post(url, json={"message": "- Reporting"}),
+    )
+
+    assert sorted(r.status_code for r in responses) == [200, 503]
+    shed = next(r for r in responses if r.status_code == 503)
+    assert int(shed.headers["retry-after"]) >= 1
+    assert len(llm_calls) == 1
+    assert metrics.counter("admission.rejected.queue_full") == 1
+    assert db.query(TransferChatTurn).filter_by(transfer_id=transfer_id, role="user").count() == 1
+
+
+@pytest.mark.asyncio
+async def test_queued_request_runs_when_slot_frees(client, transfer_id, admission, llm_calls):
+    await client.post(f"/api/v1/chat-transfer/{transfer_id}/start")
+    admission(max_in_flight=1, max_queue=1)
+
+    url = f"/api/v1/chat-transfer/{transfer_id}/message"
+    responses = await asyncio.gather(
+        client.post(url, json={"message": "- Coordinación"}),
+        client.post(url, json={"message": "- Reporting"}),
+    )
+    assert [r.status_code for r in responses] == [200, 200]
+    assert len(llm_calls) == 2
+
+
+@pytest.mark.asyncio
+async def test_rate_limits_per_transfer_and_role(client, transfer_id, admission, llm_calls):
+    admission(transfer_limit=1, role_limits={"USER": 1})
+    url = f"/api/v1/chat-transfer/{transfer_id}/message"
+
+    assert (await client.post(url, json={"message": "- Uno"})).status_code == 200
+    limited = await client.post(url, json={"message": "- Dos"})
+    assert limited.status_code == 429
+    assert int(limited.headers["retry-after"]) >= 1
+    assert len(llm_calls) == 1
+
+    admission(role_limits={"USER": 1})
+    user = {"X-Role": "USER"}
+    assert (await client.post(url, json={"message": "- Tres"}, headers=user)).status_code == 200
+    assert (await client.post(url, json={"message": "- Cuatro"}, headers=user)).status_code == 429
+    assert (await client.post(url, json={"message": "- Cinco"}, headers={"X-Role": "ADMIN"})).status_code == 200
+
+
+@pytest.mark.asyncio
+async def test_unknown_role_is_admitted_as_anonymous(client, transfer_id, admission, llm_calls):
+    admission(role_limits={"ANONYMOUS": 1})
+    url = f"/api/v1/chat-transfer/{transfer_id}/message"
+
+    assert (await client.post(url, json={"message": "- Uno"}, headers={"X-Role": "GUEST"})).status_code == 200
+    # Comparte el límite de ANONYMOUS con las peticiones sin cabecera
+    assert (await client.post(url, json={"message": "- Dos"})).status_code == 429
+
+
+@pytest.mark.asyncio
+async def test_rejects_fast_when_estimated_wait_exceeds_deadline():
+    controller = AdmissionController(max_in_flight=1, max_queue=10, queue_timeout=1.0)
+    await controller.acquire()
+    controller.release(service_time=5.0)  # tiempo de servicio observado
+    await controller.acquire()
+
+    with pytest.raises(Exception) as exc:
+        await controller.acquire()
+    assert exc.value.status_code == 503
+    assert exc.value.headers["Retry-After"] == "5"
+    controller.release()
+    assert controller.in_flight == 0
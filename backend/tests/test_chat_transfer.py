@@ -0,0 +1,421 @@
+import asyncio
+import json
+
+import pytest
+from sqlalchemy import event
+
+from app.ai.langgraph.state import ChatTurn, InterviewState
+from app.ai.langgraph import nodes
+from app.api.admission import get_chat_admission
+from app.core.coalesce import MessageCoalescer
+from app.core.config import get_settings
+from app.core.locks import KeyedAsyncLock
+from app.core.metrics import metrics
+from app.db.session import SessionLocal, engine, get_db
+from app.main import app
+from app.models import Transfer, TransferChatTurn, TransferInterview
+from app.repositories.interview_cache import InterviewStateCache, get_interview_cache
+
+
+@pytest.mark.asyncio
+async def test_start_and_message_persist_state(client, db, transfer_id):
+    resp = await client.post(f"/api/v1/chat-transfer/{transfer_id}/start")
+    assert resp.status_code == 200
+    assert resp.json()["pending_step"] == "ask_resp"
+
+    resp = await client.post(
+        f"/api/v1/chat-transfer/{transfer_id}/message",
+        json={"message": "- Coordinación de equipo\n- Reporting mensual"},
+    )
+    assert resp.status_code == 200
+    data = resp.json()
+    assert data["responsabilidades"] == ["Coordinación de equipo", "Reporting mensual"]
+    assert data["pending_step"] == "ask_tasks"
+
+    interview = db.get(TransferInterview, transfer_id)
+    assert interview.state["responsabilidades"] == data["responsabilidades"]
+    assert (interview.pending_step, interview.turn_count) == ("ask_tasks", 3)
+    turns = db.query(TransferChatTurn).filter_by(transfer_id=transfer_id).order_by(TransferChatTurn.seq).all()
+    assert [(t.seq, t.role) for t in turns] == [(0, "assistant"), (1, "user"), (2, "assistant")]
+    # El estado del manager no se sobrescribe
+    assert db.get(Transfer, transfer_id).manager_instructions == ""
+
+
+@pytest.mark.asyncio
+async def test_message_appends_only_new_turns(client, db, transfer_id):
+    await client.post(f"/api/v1/chat-transfer/{transfer_id}/start")
+    for text in ("- Coordinación de equipo", "- Reporting mensual"):
+        resp = await client.post(f"/api/v1/chat-transfer/{transfer_id}/message", json={"message": text})
+        assert resp.status_code == 200
+
+    seqs = [t.seq for t in db.query(TransferChatTurn).filter_by(transfer_id=transfer_id).order_by(TransferChatTurn.seq)]
+    assert seqs == list(range(5))
+    assert len(resp.json()["state"]["thread"]) == 5
+
+
+@pytest.mark.asyncio
+async def test_legacy_state_is_migrated_on_next_turn(client, db, transfer_id):
+    t = db.get(Transfer, transfer_id)
+    t.manager_instructions = json.dumps(
+        {"responsabilidades": ["A"], "pending_step": "ask_tasks", "thread": [{"role": "assistant", "content": "hola"}]}
+    )
+    db.commit()
+
+    resp = await client.post(f"/api/v1/chat-transfer/{transfer_id}/message", json={"message": "- tarea 1"})
+    assert resp.status_code == 200
+    assert db.query(TransferChatTurn).filter_by(transfer_id=transfer_id).count() == 3
+
+
+@pytest.mark.asyncio
+async def test_message_unknown_transfer(client):
+    resp = await client.post("/api/v1/chat-transfer/999999/message", json={"message": "hola"})
+    assert resp.status_code == 404
+
+
+@pytest.mark.asyncio
+async def test_next_turn_reuses_cached_state(client, transfer_id):
+    metrics.reset()
+    await client.post(f"/api/v1/chat-transfer/{transfer_id}/start")
+    resp = await client.post(f"/api/v1/chat-transfer/{transfer_id}/message", json={"message": "- Coordinación"})
+    assert resp.status_code == 200
+    assert metrics.counter("interview.cache.hits") == 1
+
+    # Un PUT sube Transfer.version: la entrada se descarta y el estado se
+    # relee de transfer_interviews (manager_instructions ya no lo define)
+    resp = await client.put(
+        f"/api/v1/transfers/{transfer_id}", json={"manager_instructions": "otras"}, headers={"X-Role": "ADMIN"}
+    )
+    assert resp.status_code == 200
+    resp = await client.post(f"/api/v1/chat-transfer/{transfer_id}/message", json={"message": "- Reporting"})
+    assert resp.status_code == 200
+    assert (metrics.counter("interview.cache.hits"), metrics.counter("interview.cache.stale")) == (1, 1)
+    assert resp.json()["responsabilidades"] == ["Coordinación"]
+    assert len(resp.json()["state"]["thread"]) == 5
+
+
+@pytest.mark.asyncio
+async def test_message_uses_a_single_connection(client, transfer_id):
+    await client.post(f"/api/v1/chat-transfer/{transfer_id}/start")
+    usage = {"out": 0, "peak": 0, "commits": 0}
+
+    def _checkout(*args):
+        usage["out"] += 1
+        usage["peak"] = max(usage["peak"], usage["out"])
+
+    def _checkin(*args):
+        usage["out"] -= 1
+
+    def _commit(*args):
+        usage["commits"] += 1
+
+    listeners = [(engine, "checkout", _checkout), (engine, "checkin", _checkin), (engine, "commit", _commit)]
+    for target, name, fn in listeners:
+        event.listen(target, name, fn)
+    try:
+        resp = await client.post(f"/api/v1/chat-transfer/{transfer_id}/message", json={"message": "- Coordinación"})
+    finally:
+        for target, name, fn in listeners:
+            event.remove(target, name, fn)
+    assert resp.status_code == 200
+    assert usage["peak"] == 1
+    assert usage["commits"] == 1  # solo el del nodo persist
+
+
+@pytest.mark.asyncio
+async def test_concurrent_turns_are_queued_not_lost(client, db, transfer_id):
+    await client.post(f"/api/v1/chat-transfer/{transfer_id}/start")
+    responses = await asyncio.gather(
+        *(
+            client.post(f"/api/v1/chat-transfer/{transfer_id}/message", json={"message": text})
+            for text in ("- Coordinación de equipo", "- Reporting mensual")
+        )
+    )
+    assert [r.status_code for r in responses] == [200, 200]
+    roles = [t.role for t in db.query(TransferChatTurn).filter_by(transfer_id=transfer_id)]
+    assert roles.count("user") == 2
+    assert db.get(Transfer, transfer_id).version == 4  # alta + start + 2 mensajes
+
+
+@pytest.mark.asyncio
+async def test_burst_messages_are_coalesced_into_one_turn(client, db, transfer_id, monkeypatch):
+    await client.post(f"/api/v1/chat-transfer/{transfer_id}/start")
+    monkeypatch.setattr(get_settings(), "CHAT_COALESCE_WINDOW_MS", 100)
+    real = nodes.get_llm_adapter()
+    calls = []
+
+    class _CountingLLM:
+        async def aextract(self, step, text, *args, **kwargs):
+            calls.append(text)
+            return await real.aextract(step, text, *args, **kwargs)
+
+    monkeypatch.setattr(nodes, "get_llm_adapter", lambda: _CountingLLM())
+
+    async def _send(text, delay):
+        await asyncio.sleep(delay)
+        return await client.post(f"/api/v1/chat-transfer/{transfer_id}/message", json={"message": text})
+
+    responses = await asyncio.gather(_send("- Coordinación de equipo", 0), _send("- Reporting mensual", 0.02))
+
+    assert [r.status_code for r in responses] == [200, 200]
+    assert responses[0].json() == responses[1].json()
+    assert calls == ["- Coordinación de equipo\n- Reporting mensual"]
+    users = [t.content for t in db.query(TransferChatTurn).filter_by(transfer_id=transfer_id, role="user")]
+    assert users == ["- Coordinación de equipo\n- Reporting mensual"]
+
+
+@pytest.mark.asyncio
+async def test_coalesced_batch_survives_leader_cancellation():
+    coalescer = MessageCoalescer("test")
+    calls = []
+
+    async def _run(text):
+        calls.append(text)
+        return text
+
+    leader = asyncio.ensure_future(coalescer.submit(1, "uno", _run, 0.05))
+    await asyncio.sleep(0)
+    follower = asyncio.ensure_future(coalescer.submit(1, "dos", _run, 0.05))
+    await asyncio.sleep(0.01)
+    leader.cancel()  # p. ej. el cliente se desconecta durante la ventana
+
+    assert await asyncio.wait_for(follower, 1) == "uno\ndos"
+    assert calls == ["uno\ndos"]
+    assert leader.cancelled()
+
+
+@pytest.mark.asyncio
+async def test_coalesced_batch_does_not_use_the_leader_session(client, db, transfer_id, monkeypatch):
+    await client.post(f"/api/v1/chat-transfer/{transfer_id}/start")
+    monkeypatch.setattr(get_settings(), "CHAT_COALESCE_WINDOW_MS", 20)
+    real = nodes.get_llm_adapter()
+
+    class _SlowLLM:
+        async def aextract(self, *args, **kwargs):
+            await asyncio.sleep(0.1)
+            return await real.aextract(*args, **kwargs)
+
+    monkeypatch.setattr(nodes, "get_llm_adapter", lambda: _SlowLLM())
+
+    # Sesiones de petición marcadas al cerrarse; ninguna debe volver a usarse
+    def _request_db():
+        session = SessionLocal()
+        try:
+            yield session
+        finally:
+            session.close()
+            session.info["request_closed"] = True
+
+    reused = []
+
+    def _after_begin(session, transaction, connection):
+        if session.info.get("request_closed"):
+            reused.append(session)
+
+    app.dependency_overrides[get_db] = _request_db
+    event.listen(SessionLocal, "after_begin", _after_begin)
+    try:
+        url = f"/api/v1/chat-transfer/{transfer_id}/message"
+        leader = asyncio.ensure_future(client.post(url, json={"message": "- Coordinación de equipo"}))
+        await asyncio.sleep(0.01)
+        follower = asyncio.ensure_future(client.post(url, json={"message": "- Reporting mensual"}))
+        await asyncio.sleep(0.05)  # el lote ya leyó el estado y espera al LLM
+        leader.cancel()
+        resp = await asyncio.wait_for(follower, 2)
+    finally:
+        event.remove(SessionLocal, "after_begin", _after_begin)
+        app.dependency_overrides.pop(get_db, None)
+
+    assert resp.status_code == 200
+    assert resp.json()["responsabilidades"] == ["Coordinación de equipo", "Reporting mensual"]
+    assert reused == []
+    users = [t.content for t in db.query(TransferChatTurn).filter_by(transfer_id=transfer_id, role="user")]
+    assert users == ["- Coordinación de equipo\n- Reporting mensual"]
+
+
+@pytest.mark.asyncio
+async def test_coalesced_batch_is_cancelled_when_nobody_waits():
+    coalescer = MessageCoalescer("test")
+    calls = []
+
+    async def _run(text):
+        calls.append(text)
+        return text
+
+    leader = asyncio.ensure_future(coalescer.submit(1, "uno", _run, 0.05))
+    await asyncio.sleep(0.01)
+    leader.cancel()
+    await asyncio.sleep(0.1)
+
+    assert calls == []
+    # La clave queda libre: el siguiente mensaje abre un lote nuevo
+    assert await coalescer.submit(1, "dos", _run, 0) == "dos"
+
+@pytest.mark.asyncio
+async def test_stale_write_returns_retryable_conflict(client, db, transfer_id, monkeypatch):
+    await client.post(f"/api/v1/chat-transfer/{transfer_id}/start")
+    real = nodes.get_llm_adapter()
+
+    class _OtherWriterLLM:
+        async def aextract(self, *args, **kwargs):
+            # Otro worker escribe la misma transferencia mientras se llama al LLM
+            other = SessionLocal()
+            t = other.get(Transfer, transfer_id)
+            t.position = "Otra"
+            other.commit()
+            other.close()
+            return await real.aextract(*args, **kwargs)
+
+    monkeypatch.setattr(nodes, "get_llm_adapter", lambda: _OtherWriterLLM())
+    resp = await client.post(f"/api/v1/chat-transfer/{transfer_id}/message", json={"message": "- Coordinación"})
+    assert resp.status_code == 409
+    assert resp.headers["retry-after"] == "1"
+    # Nada del turno perdedor quedó escrito
+    assert db.query(TransferChatTurn).filter_by(transfer_id=transfer_id).count() == 1
+
+    monkeypatch.setattr(nodes, "get_llm_adapter", lambda: real)
+    resp = await client.post(f"/api/v1/chat-transfer/{transfer_id}/message", json={"message": "- Coordinación"})
+    assert resp.status_code == 200
+
+
+@pytest.mark.asyncio
+async def test_keyed_lock_only_serializes_same_key():
+    locks = KeyedAsyncLock("test")
+    order = []
+
+    async def _turn(key, name, delay):
+        async with locks.hold(key):
+            order.append(f"{name}+")
+            await asyncio.sleep(delay)
+            order.append(f"{name}-")
+
+    await asyncio.gather(_turn(1, "a", 0.05), _turn(1, "b", 0), _turn(2, "c", 0))
+    assert order.index("a-") < order.index("b+")  # misma clave: en cola
+    assert order.index("c+") < order.index("a-")  # otra clave: no espera
+    assert len(locks) == 0
+
+
+@pytest.mark.asyncio
+async def test_delta_view_returns_only_new_turns(client, transfer_id):
+    base = f"/api/v1/chat-transfer/{transfer_id}"
+    start = (await client.post(f"{base}/start?view=delta")).json()
+    assert [t["seq"] for t in start["turns"]] == [0]
+    assert "state" not in start
+
+    for _ in range(2):
+        data = (await client.post(f"{base}/message?view=delta", json={"message": "- Coordinación"})).json()
+    assert [(t["seq"], t["role"]) for t in data["turns"]] == [(3, "user"), (4, "assistant")]
+    assert data["cursor"] == 4
+
+
+@pytest.mark.asyncio
+async def test_cold_turn_does_not_read_the_thread(client, transfer_id):
+    base = f"/api/v1/chat-transfer/{transfer_id}"
+    await client.post(f"{base}/start")
+    for text in ("- A", "- B"):
+        await client.post(f"{base}/message", json={"message": text})
+    get_interview_cache().clear()
+    statements = []
+
+    def _record(conn, cursor, statement, *args):
+        statements.append(statement)
+
+    event.listen(engine, "before_cursor_execute", _record)
+    try:
+        data = (await client.post(f"{base}/message?view=delta", json={"message": "- C"})).json()
+    finally:
+        event.remove(engine, "before_cursor_execute", _record)
+    assert [t["seq"] for t in data["turns"]] == [5, 6]
+    assert not [s for s in statements if s.lstrip().upper().startswith("SELECT") and "chat_turns" in s]
+
+    # view=full sigue devolviendo el hilo completo
+    data = (await client.post(f"{base}/message", json={"message": "- D"})).json()
+    assert len(data["state"]["thread"]) == 9
+
+
+@pytest.mark.asyncio
+async def test_thread_pagination_by_seq_cursor(client, transfer_id):
+    base = f"/api/v1/chat-transfer/{transfer_id}"
+    await client.post(f"{base}/start")
+    for text in ("- A", "- B"):
+        await client.post(f"{base}/message", json={"message": text})
+
+    page = (await client.get(f"{base}/thread?limit=2")).json()
+    assert [t["seq"] for t in page["items"]] == [0, 1]
+    assert page["next_cursor"] == 1
+    page = (await client.get(f"{base}/thread?after={page['next_cursor']}&limit=3")).json()
+    assert [t["seq"] for t in page["items"]] == [2, 3, 4]
+    assert page["next_cursor"] is None
+
+    assert (await client.get("/api/v1/chat-transfer/999999/thread")).status_code == 404
+
+
+def test_interview_cache_drops_stale_versions():
+    cache = InterviewStateCache(max_entries=1)
+    cache.put(1, 3, InterviewState(responsabilidades=["A"]))
+    hit = cache.get(1, 3)
+    hit.responsabilidades.append("B")  # copia: no altera la caché
+    hit.tareas.setdefault("A", []).append("t")
+    hit.thread.append(ChatTurn(role="user", content="hola"))
+    cached = cache.get(1, 3)
+    assert (cached.responsabilidades, cached.tareas, cached.thread) == (["A"], {}, [])
+    assert cache.get(1, 4) is None
+    assert cache.get(1, 3) is None
+    cache.put(1, 1, InterviewState())
+    cache.put(2, 1, InterviewState())
+    assert len(cache) == 1
+
+
+def _parse_sse(text):
+    events = []
+    for block in text.strip().split("\n\n"):
+        lines = dict(line.split(": ", 1) for line in block.splitlines())
+        events.append((lines["event"], json.loads(lines["data"])))
+    return events
+
+
+@pytest.mark.asyncio
+async def test_message_stream_emits_partial_and_final(client, transfer_id):
+    resp = await client.post(
+        f"/api/v1/chat-transfer/{transfer_id}/message/stream",
+        json={"message": "- Coordinación de equipo\n- Reporting mensual"},
+    )
+    assert resp.status_code == 200
+    assert resp.headers["content-type"].startswith("text/event-stream")
+    events = _parse_sse(resp.text)
+    names = [e for e, _ in events]
+    assert names[0] == "accepted"
+    assert "responsabilidades" in names
+    assert names[-1] == "final"
+    assert events[-1][1]["pending_step"] == "ask_tasks"
+    # El hueco de admisión se devuelve al terminar el stream
+    assert get_chat_admission().controller.in_flight == 0
+
+
+@pytest.mark.asyncio
+async def test_message_stream_unknown_transfer_is_404_without_slot(client):
+    resp = await client.post("/api/v1/chat-transfer/999999/message/stream", json={"message": "- Uno"})
+    assert resp.status_code == 404
+    assert get_chat_admission().controller.in_flight == 0
+
+
+@pytest.mark.asyncio
+async def test_message_stream_releases_slot_on_disconnect(transfer_id):
+    body = json.dumps({"message": "- Uno"}).encode()
+    messages = [{"type": "http.request", "body": body, "more_body": False}]
+
+    async def receive():
+        if messages:
+            return messages.pop(0)
+        return {"type": "http.disconnect"}  # el cliente corta en cuanto se abre el stream
+
+    async def send(message):
+        pass
+
+    scope = {
+        "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1", "method": "POST", "scheme": "http",
+        "path": f"/api/v1/chat-transfer/{transfer_id}/message/stream", "raw_path": b"", "query_string": b"",
+        "root_path": "", "headers": [(b"content-type", b"application/json")],
+        "client": ("test", 1), "server": ("test", 80),
+    }
+    await app(scope, receive, send)
+    assert get_chat_admission().controller.in_flight == 0
@@ -0,0 +1,74 @@
+import pytest
+from sqlalchemy import func, select
+
+from app.core.metrics import metrics
+from app.models import Project, RowCount, Transfer
+from app.repositories.counts import count_key, get_row_counts
+
+ADMIN = {"X-Role": "ADMIN"}
+
+
+@pytest.mark.asyncio
+async def test_approx_total_follows_creates_without_count(client, db, transfer_id):
+    get_row_counts().clear()
+    exact = (await client.get("/api/v1/transfers", params={"include_total": "exact"}, headers=ADMIN)).json()["total"]
+    assert exact == db.query(Transfer).count()
+    assert db.get(RowCount, count_key("transfers")).value == exact
+
+    outgoing = db.get(Transfer, transfer_id).outgoing_user_id
+    body = {"position": "Contada", "outgoing_user_id": outgoing, "manager_instructions": ""}
+    created = (await client.post("/api/v1/transfers", json=body, headers=ADMIN)).json()
+
+    metrics.reset()
+    for _ in range(2):
+        resp = await client.get("/api/v1/transfers", params={"include_total": "approx"}, headers=ADMIN)
+        assert resp.json()["total"] == exact + 1
+    assert metrics.counter("counts.approx.computed") == 0
+    assert metrics.counter("counts.table.hits") == 1
+    assert metrics.counter("counts.cache.hits") == 1
+
+    await client.delete(f"/api/v1/transfers/{created['id']}", headers=ADMIN)
+    resp = await client.get("/api/v1/transfers", params={"include_total": "approx"}, headers=ADMIN)
+    assert resp.json()["total"] == exact
+
+
+@pytest.mark.asyncio
+async def test_total_is_exact_by_default_and_false_skips_counting(client, db, transfer_id):
+    # Por defecto, total exacto (también con cursor); approx y false son opcionales
+    for params in ({}, {"cursor": ""}):
+        page = (await client.get("/api/v1/transfers", params=params, headers=ADMIN)).json()
+        assert page["total"] == db.query(Transfer).count()
+
+    metrics.reset()
+    for params in ({"include_total": "false"}, {"cursor": "", "include_total": "false"}):
+        page = (await client.get("/api/v1/transfers", params=params, headers=ADMIN)).json()
+        assert "total" not in page
+    assert metrics.counter("counts.exact.computed") == metrics.counter("counts.approx.computed") == 0
+
+
+def test_recount_does_not_commit_the_request_session(db):
+    counts = get_row_counts()
+    db.add(Project(name="Sin commit"))
+    counts.total(db, count_key("projects"), select(func.count()).select_from(Project), "exact")
+    db.rollback()
+
+    assert db.query(Project).filter_by(name="Sin commit").count() == 0
+    assert db.get(RowCount, count_key("projects")) is not None  # guardado con su propia sesión
+
+
+def test_bump_forgets_cached_total_after_commit(db):
+    counts = get_row_counts()
+    key = count_key("projects")
+    counts.total(db, key, select(func.count()).select_from(Project), "exact")
+    cached = counts._cache[key][1]
+
+    counts.bump(db, key, 1)
+    # Hasta el commit, otros lectores siguen viendo el total confirmado
+    assert counts._cache[key][1] == cached
+    db.commit()
+    assert key not in counts._cache
+
+    counts.total(db, key, select(func.count()).select_from(Project), "approx")
+    counts.bump(db, key, -1)
+    db.rollback()
+    assert key in counts._cache
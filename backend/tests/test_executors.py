@@ -0,0 +1,67 @@
+import asyncio
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+import anyio
+import pytest
+
+from app.ai.resilience import ResilientCaller
+from app.core.config import get_settings
+from app.core.executors import NamedExecutor, get_hash_executor, get_llm_executor
+from app.core import security
+from app.core.metrics import metrics
+from app.models import User
+
+
+def test_named_executor_reports_queue_and_saturation():
+    executor = NamedExecutor("test", ThreadPoolExecutor(max_workers=1), 1)
+    release = threading.Event()
+    futures = [executor.submit(release.wait) for _ in range(2)]
+
+    gauges = metrics.snapshot()["gauges"]
+    assert gauges["executor.test.active"] == 1
+    assert gauges["executor.test.queued"] == 1
+    assert gauges["executor.test.saturation"] == 1.0
+
+    release.set()
+    for fut in futures:
+        fut.result()
+    assert executor.pending == 0
+    assert metrics.snapshot()["gauges"]["executor.test.queued"] == 0
+    executor.shutdown()
+
+
+def test_hash_executor_runs_in_separate_process():
+    executor = get_hash_executor()
+    assert isinstance(executor._executor, ProcessPoolExecutor)
+    assert executor.run(os.getpid) != os.getpid()
+    assert executor.pending == 0
+
+
+def test_llm_attempts_use_dedicated_threads():
+    caller = ResilientCaller.from_settings(get_settings())
+    assert caller._executor() is get_llm_executor()
+    assert caller.call(threading.current_thread).name.startswith("llm-io")
+
+
+@pytest.mark.asyncio
+async def test_concurrent_logins_do_not_hold_default_threads(client, db, monkeypatch):
+    db.add(User(email="hashpool@example.com", hashed_password="x", role="USER"))
+    db.commit()
+    # bcrypt lento simulado en hilos del pool de hash (el monkeypatch no llega a procesos spawn)
+    pool = NamedExecutor("password_hash", ThreadPoolExecutor(max_workers=8), 8)
+    monkeypatch.setattr(security, "get_hash_executor", lambda: pool)
+    monkeypatch.setattr(security, "_verify", lambda plain, hashed: time.sleep(0.3) or True)
+
+    body = {"email": "hashpool@example.com", "password": "secret"}
+    logins = [asyncio.ensure_future(client.post("/api/v1/users/login", json=body)) for _ in range(8)]
+    await asyncio.sleep(0.15)  # todas verificando la contraseña
+    borrowed = anyio.to_thread.current_default_thread_limiter().borrowed_tokens
+    responses = await asyncio.gather(*logins)
+    pool.shutdown()
+
+    assert [r.status_code for r in responses] == [200] * 8
+    assert pool.pending == 0
+    assert borrowed == 0
@@ -0,0 +1,81 @@
+import time
+
+import pytest
+
+from app.db.session import SessionLocal
+from app.models import IdempotencyKey, Transfer, TransferChatTurn
+from app.repositories.idempotency import IdempotencyStore
+
+ADMIN = {"X-Role": "ADMIN"}
+
+
+@pytest.mark.asyncio
+async def test_replayed_message_does_not_run_twice(client, db, transfer_id):
+    await client.post(f"/api/v1/chat-transfer/{transfer_id}/start")
+    url = f"/api/v1/chat-transfer/{transfer_id}/message"
+    headers = {"Idempotency-Key": "msg-1"}
+
+    first = await client.post(url, json={"message": "- Coordinación"}, headers=headers)
+    again = await client.post(url, json={"message": "- Coordinación"}, headers=headers)
+
+    assert first.status_code == again.status_code == 200
+    assert again.json() == first.json()
+    assert again.headers["idempotent-replayed"] == "true"
+    assert db.query(TransferChatTurn).filter_by(transfer_id=transfer_id, role="user").count() == 1
+
+
+@pytest.mark.asyncio
+async def test_same_key_with_other_query_is_rejected(client, transfer_id):
+    await client.post(f"/api/v1/chat-transfer/{transfer_id}/start")
+    url = f"/api/v1/chat-transfer/{transfer_id}/message"
+    headers = {"Idempotency-Key": "msg-query"}
+
+    first = await client.post(url, json={"message": "- Coordinación"}, headers=headers)
+    other = await client.post(url, params={"view": "delta"}, json={"message": "- Coordinación"}, headers=headers)
+
+    assert first.status_code == 200
+    assert other.status_code == 422
+
+
+@pytest.mark.asyncio
+async def test_replayed_create_returns_same_row(client, db, transfer_id):
+    outgoing = db.get(Transfer, transfer_id).outgoing_user_id
+    body = {"position": "Idempotente", "outgoing_user_id": outgoing, "manager_instructions": ""}
+    headers = {**ADMIN, "Idempotency-Key": "create-1"}
+
+    first = await client.post("/api/v1/transfers", json=body, headers=headers)
+    again = await client.post("/api/v1/transfers", json=body, headers=headers)
+
+    assert first.status_code == again.status_code == 201
+    assert again.json()["id"] == first.json()["id"]
+    assert db.query(Transfer).filter_by(position="Idempotente").count() == 1
+
+    other = await client.post("/api/v1/transfers", json={**body, "position": "Otra"}, headers=headers)
+    assert other.status_code == 422
+
+
+def test_store_reports_in_progress_and_expires():
+    store = IdempotencyStore(SessionLocal, ttl=0.05)
+    assert store.claim("POST /x", "k", "h") == ("claimed", None)
+    assert store.claim("POST /x", "k", "h") == ("in_progress", None)
+    store.complete("POST /x", "k", (201, "application/json", "{}"))
+    assert store.claim("POST /x", "k", "h") == ("replay", (201, "application/json", "{}"))
+
+    time.sleep(0.06)
+    assert store.claim("POST /x", "k", "h") == ("claimed", None)
+    store.release("POST /x", "k")
+
+
+def test_store_is_bounded():
+    store = IdempotencyStore(SessionLocal, max_entries=2)
+    # Reserva en curso más antigua que todas: no cuenta ni se purga
+    store.claim("POST /bounded", "running", "h")
+    for i in range(4):
+        time.sleep(0.001)
+        store.claim("POST /bounded", f"k{i}", "h")
+        store.complete("POST /bounded", f"k{i}", (200, None, ""))
+    with SessionLocal() as db:
+        keys = {k for (k,) in db.query(IdempotencyKey.key).filter_by(scope="POST /bounded")}
+    assert keys == {"running", "k2", "k3"}
+    assert store.claim("POST /bounded", "running", "h") == ("in_progress", None)
+    store.release("POST /bounded", "running")
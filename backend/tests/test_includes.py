@@ -0,0 +1,70 @@
+import pytest
+from sqlalchemy import event, insert
+
+from app.db.session import engine
+from app.models import Project, Team, Transfer, User
+from app.models.associations import team_managers
+
+ADMIN = {"X-Role": "ADMIN"}
+
+
+def _seed_teams(db, n):
+    project = Project(name=f"Includes {db.query(Project).count()}")
+    manager = User(email=f"includes{db.query(User).count()}@example.com", hashed_password="x", role="MANAGEMENT")
+    db.add_all([project, manager])
+    db.commit()
+    teams = [Team(name=f"Equipo {i}", project_id=project.id) for i in range(n)]
+    db.add_all(teams)
+    db.commit()
+    db.execute(insert(team_managers), [{"team_id": t.id, "user_id": manager.id} for t in teams])
+    db.commit()
+    return project, manager
+
+
+async def _count_statements(client, url, params, headers=None):
+    statements = []
+
+    def _record(conn, cursor, statement, *args):
+        statements.append(statement)
+
+    event.listen(engine, "before_cursor_execute", _record)
+    try:
+        resp = await client.get(url, params=params, headers=headers)
+    finally:
+        event.remove(engine, "before_cursor_execute", _record)
+    assert resp.status_code == 200
+    return resp.json(), len(statements)
+
+
+@pytest.mark.asyncio
+async def test_team_includes_cost_fixed_statements(client, db):
+    project, manager = _seed_teams(db, 12)
+    params = {"project_id": project.id, "include": "project,managers", "include_total": "false"}
+
+    small, n_small = await _count_statements(client, "/api/v1/teams", {**params, "size": 2})
+    large, n_large = await _count_statements(client, "/api/v1/teams", {**params, "size": 12})
+
+    assert len(large["items"]) == 12
+    assert n_small == n_large
+    team = large["items"][0]
+    assert team["project"]["id"] == project.id
+    assert [m["id"] for m in team["managers"]] == [manager.id]
+
+
+@pytest.mark.asyncio
+async def test_sparse_fields_and_transfer_outgoing_user(client, db):
+    user = User(email="sparse@example.com", hashed_password="x", role="USER")
+    db.add(user)
+    db.commit()
+    db.add(Transfer(position="Sparse", outgoing_user_id=user.id, manager_instructions=""))
+    db.commit()
+
+    resp = await client.get(
+        "/api/v1/transfers", params={"fields": "position", "include": "outgoing_user", "size": 1}, headers=ADMIN
+    )
+    item = resp.json()["items"][0]
+    assert set(item) == {"id", "position", "outgoing_user"}
+    assert item["outgoing_user"]["email"] == "sparse@example.com"
+
+    assert (await client.get("/api/v1/transfers", params={"fields": "nope"}, headers=ADMIN)).status_code == 400
+    assert (await client.get("/api/v1/teams", params={"include": "outgoing_user"})).status_code == 400
@@ -0,0 +1,82 @@
+import asyncio
+
+import pytest
+from starlette.testclient import TestClient
+
+from app.api.routes.chat_transfer import run_message_job
+from app.core.metrics import metrics
+from app.main import app
+from app.models import TransferChatTurn
+from app.services.jobs import Job
+
+
+async def _wait_done(client, job_id, timeout=5.0):
+    for _ in range(int(timeout / 0.05)):
+        job = (await client.get(f"/api/v1/jobs/{job_id}")).json()
+        if job["status"] in ("done", "failed"):
+            return job
+        await asyncio.sleep(0.05)
+    raise AssertionError(f"trabajo {job_id} sin terminar")
+
+
+@pytest.mark.asyncio
+async def test_async_message_returns_202_and_completes(client, db, transfer_id):
+    metrics.reset()
+    await client.post(f"/api/v1/chat-transfer/{transfer_id}/start")
+
+    resp = await client.post(
+        f"/api/v1/chat-transfer/{transfer_id}/message?mode=async&view=delta",
+        json={"message": "- Coordinación de equipo"},
+    )
+    assert resp.status_code == 202
+    job_id = resp.json()["job_id"]
+    assert resp.headers["location"] == f"/api/v1/jobs/{job_id}"
+
+    job = await _wait_done(client, job_id)
+    assert job["status"] == "done"
+    assert job["result"]["responsabilidades"] == ["Coordinación de equipo"]
+    assert [t["role"] for t in job["result"]["turns"]] == ["user", "assistant"]
+    assert db.query(TransferChatTurn).filter_by(transfer_id=transfer_id, role="user").count() == 1
+
+    snap = metrics.snapshot()
+    assert snap["counters"]["jobs.done"] == 1
+    assert snap["timings"]["jobs.wait"]["count"] == 1
+    assert snap["timings"]["jobs.run"]["count"] == 1
+    assert snap["gauges"]["jobs.queue.depth"] == 0
+
+
+@pytest.mark.asyncio
+async def test_reclaimed_job_does_not_append_its_turn_twice(client, db, transfer_id):
+    await client.post(f"/api/v1/chat-transfer/{transfer_id}/start")
+    job = Job("reclaimed", transfer_id, "- Coordinación de equipo", "delta", 0.0, 0.0)
+
+    first = await run_message_job(job)
+    # El proceso cae antes de queue.finish(): el lease vence y otro worker lo reclama
+    again = await run_message_job(job)
+
+    assert again["turns"] == first["turns"]
+    assert [t["seq"] for t in again["turns"]] == [1, 2]
+    assert db.query(TransferChatTurn).filter_by(transfer_id=transfer_id, role="user").count() == 1
+
+
+@pytest.mark.asyncio
+async def test_async_message_unknown_transfer_is_not_enqueued(client):
+    metrics.reset()
+    resp = await client.post("/api/v1/chat-transfer/999999/message?mode=async", json={"message": "hola"})
+    assert resp.status_code == 404
+    assert metrics.counter("jobs.enqueued") == 0
+    assert (await client.get("/api/v1/jobs/desconocido")).status_code == 404
+
+
+def test_websocket_reports_completion(transfer_id):
+    with TestClient(app) as tc:
+        tc.post(f"/api/v1/chat-transfer/{transfer_id}/start")
+        job_id = tc.post(
+            f"/api/v1/chat-transfer/{transfer_id}/message?mode=async", json={"message": "- Reporting mensual"}
+        ).json()["job_id"]
+        with tc.websocket_connect(f"/api/v1/jobs/{job_id}/ws") as ws:
+            statuses = [ws.receive_json()]
+            while statuses[-1]["status"] not in ("done", "failed"):
+                statuses.append(ws.receive_json())
+    assert statuses[-1]["status"] == "done"
+    assert statuses[-1]["result"]["responsabilidades"] == ["Reporting mensual"]
@@ -0,0 +1,149 @@
+import asyncio
+import threading
+import time
+
+import pytest
+
+from app.ai.cache import MemoryLRUCache
+from app.ai.langgraph import nodes
+from app.ai.langgraph.state import InterviewState
+from app.ai.llm import LLMAdapter, _parse_partial_json, score_heuristic, split_by_responsibility
+from app.core.config import get_settings
+from app.core.metrics import metrics
+
+
+def test_parse_partial_json_closes_open_containers():
+    assert _parse_partial_json('{"responsabilidades": ["A", "B') == {"responsabilidades": ["A"]}
+    assert _parse_partial_json('{"tareas": {"A": ["x"], "B"') == {"tareas": {"A": ["x"]}}
+    assert _parse_partial_json("sin json") == {}
+
+
+def test_stream_extract_emits_partial_blocks():
+    llm = LLMAdapter()
+    llm.has_openai = True
+    doc = '{"responsabilidades": ["A", "B"], "tareas": {"A": ["t1"]}, "mensajes": {"assistant": "ok"}}'
+    llm._stream_openai = lambda text: iter(doc[i : i + 7] for i in range(0, len(doc), 7))
+
+    events = list(llm.stream_extract("ask_resp", "texto"))
+
+    assert ("responsabilidades", ["A"]) in events
+    assert ("responsabilidades", ["A", "B"]) in events
+    assert events[-1] == ("result", (["A", "B"], {"A": ["t1"]}, "ok"))
+    assert "".join(d for e, d in events if e == "token") == doc
+
+
+class _FakeAsyncLLM:
+    def __init__(self, content):
+        self.content = content
+        self.calls = 0
+
+    async def ainvoke(self, msgs):
+        self.calls += 1
+        return type("Msg", (), {"content": self.content})()
+
+
+@pytest.mark.asyncio
+async def test_aextract_uses_async_client():
+    llm = LLMAdapter()
+    llm.has_openai = True
+    llm._llm = _FakeAsyncLLM('{"responsabilidades": ["A"], "tareas": {}}')
+
+    resps, tasks, assistant = await llm.aextract("ask_resp", "- A")
+
+    assert llm._llm.calls == 1
+    assert resps == ["A"] and tasks == {}
+    assert assistant  # texto por defecto del siguiente paso
+
+
+def test_score_heuristic_rewards_structure_and_coverage():
+    bullets = "- Coordinación de equipo\n- Gestión de proveedores\n- Reporting mensual"
+    resps = ["Coordinación de equipo", "Gestión de proveedores", "Reporting mensual"]
+    assert score_heuristic("ask_resp", bullets, [], resps, {}) == 1.0
+    assert score_heuristic("ask_resp", "Coordino el equipo y hago reporting", [], ["x"], {}) < 0.8
+
+    known = ["A", "B"]
+    text = "Responsabilidad: A\n- t1\n- t2\nResponsabilidad: B\n- t3\n- t4"
+    assert score_heuristic("ask_tasks", text, known, [], {"A": ["t1", "t2"], "B": ["t3", "t4"]}) == 1.0
+    # Sin encabezados y con B sin tareas: baja la confianza
+    assert score_heuristic("ask_tasks", "- t1\n- t2", known, [], {"A": ["t1", "t2"]}) < 0.8
+
+
+def test_hybrid_mode_skips_llm_when_heuristic_is_confident():
+    metrics.reset()
+    llm = LLMAdapter(cache=MemoryLRUCache())
+    llm.has_openai = True
+    llm.extraction_mode = "hybrid"
+    calls = []
+    llm._call_openai = lambda text: calls.append(text) or (["X"], {}, "llm")
+
+    resps, _, _ = llm.extract("ask_resp", "- Coordinación de equipo\n- Gestión de proveedores")
+    assert resps == ["Coordinación de equipo", "Gestión de proveedores"]
+    assert calls == []
+    assert metrics.counter("llm.route.ask_resp.heuristic") == 1
+
+    llm.extract("ask_resp", "Coordino el equipo y además llevo las compras")
+    assert len(calls) == 1
+    assert metrics.counter("llm.route.ask_resp.llm") == 1
+    assert "llm.extract.ask_resp.llm" in metrics.snapshot()["timings"]
+
+
+def test_split_by_responsibility_uses_known_names():
+    text = "\nResponsabilidad: coordinación\n- t1\nResp: Compras\n- t2\n- t3"
+    assert split_by_responsibility(text, ["Coordinación"]) == [
+        ("Coordinación", "Responsabilidad: coordinación\n- t1"),
+        ("Compras", "Resp: Compras\n- t2\n- t3"),
+    ]
+    assert split_by_responsibility("Responsabilidad: A\n- t1", ["A"]) == []
+    # Texto antes del primer encabezado: no se parte (no se pierde)
+    assert split_by_responsibility("- suelta\n" + text, ["Coordinación"]) == []
+
+
+@pytest.mark.asyncio
+async def test_parallel_task_extraction_merges_per_responsibility(monkeypatch):
+    class _SlowLLM:
+        async def aextract(self, step, text, known_resps=None):
+            await asyncio.sleep(0.2)
+            return [], {"otra clave": [l[2:] for l in text.splitlines() if l.startswith("- ")]}, "ok"
+
+    monkeypatch.setattr(nodes, "get_llm_adapter", lambda: _SlowLLM())
+    monkeypatch.setattr(get_settings(), "LLM_TASKS_PARALLEL", True)
+    state = InterviewState(
+        pending_step="ask_tasks",
+        responsabilidades=["A", "B", "C"],
+        user_message="Responsabilidad: A\n- a1\nResponsabilidad: B\n- b1\nResponsabilidad: C\n- c1\n- c2",
+    ).model_dump()
+
+    start = time.perf_counter()
+    out = await nodes.anode_process_user(state, {})
+    assert time.perf_counter() - start < 0.5  # ~ el trozo más lento, no la suma
+
+    assert out["tareas"] == {"A": ["a1"], "B": ["b1"], "C": ["c1", "c2"]}
+    assert out["pending_step"] == "review"
+
+
+def test_sync_task_extraction_uses_shared_llm_pool(monkeypatch):
+    threads = []
+
+    class _SlowLLM:
+        def extract(self, step, text, known_resps=None):
+            threads.append(threading.current_thread().name)
+            time.sleep(0.1)
+            return [], {"x": [l[2:] for l in text.splitlines() if l.startswith("- ")]}, "ok"
+
+    monkeypatch.setattr(nodes, "get_llm_adapter", lambda: _SlowLLM())
+    monkeypatch.setattr(get_settings(), "LLM_TASKS_PARALLEL", True)
+    state = InterviewState(
+        pending_step="ask_tasks",
+        responsabilidades=["A", "B", "C"],
+        user_message="Responsabilidad: A\n- a1\nResponsabilidad: B\n- b1\nResponsabilidad: C\n- c1",
+    ).model_dump()
+
+    start = time.perf_counter()
+    out = nodes.node_process_user(state, {})
+    assert time.perf_counter() - start < 0.25
+
+    assert out["tareas"] == {"A": ["a1"], "B": ["b1"], "C": ["c1"]}
+    # Sin pools por petición: el hilo del llamante y los compartidos de llm-io
+    caller = threading.current_thread().name
+    assert caller in threads
+    assert all(name == caller or name.startswith("llm-io") for name in threads)
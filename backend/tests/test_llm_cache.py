@@ -0,0 +1,62 @@
+from app.ai.cache import MemoryLRUCache, SQLiteCache, TieredCache, cache_key
+from app.ai.llm import LLMAdapter
+from app.core.metrics import metrics
+
+VALUE = (["A"], {"A": ["t1"]}, "ok")
+
+
+class _Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_cache_key_normalizes_whitespace():
+    a = cache_key("ask_resp", "  - Coordinación   de equipo \n\n", [], "m")
+    b = cache_key("ask_resp", "- Coordinación de equipo", [], "m")
+    assert a == b
+    assert a != cache_key("ask_tasks", "- Coordinación de equipo", [], "m")
+    assert a != cache_key("ask_resp", "- Coordinación de equipo", ["X"], "m")
+
+
+def test_memory_lru_evicts_and_expires():
+    metrics.reset()
+    clock = _Clock()
+    cache = MemoryLRUCache(max_entries=2, ttl=10, clock=clock)
+    cache.set("a", VALUE)
+    cache.set("b", VALUE)
+    cache.get("a")  # "b" pasa a ser el menos reciente
+    cache.set("c", VALUE)
+    assert cache.get("b") is None
+    assert cache.get("a") == VALUE
+    assert metrics.counter("llm.cache.evictions") == 1
+
+    clock.now = 11
+    assert cache.get("a") is None
+
+
+def test_sqlite_tier_is_shared_between_instances(tmp_path):
+    path = str(tmp_path / "cache.db")
+    TieredCache(MemoryLRUCache(), SQLiteCache(path)).set("k", VALUE)
+
+    other = TieredCache(MemoryLRUCache(), SQLiteCache(path))
+    assert other.get("k") == VALUE
+    assert other.memory.get("k") == VALUE  # promocionado a memoria
+
+
+def test_extract_skips_llm_on_repeated_input():
+    llm = LLMAdapter()
+    llm.has_openai = True
+    calls = []
+
+    def _fake_call(text):
+        calls.append(text)
+        return VALUE
+
+    llm._call_openai = _fake_call
+
+    assert llm.extract("ask_resp", "- A") == VALUE
+    assert llm.extract("ask_resp", " - A ") == VALUE
+    assert len(calls) == 1
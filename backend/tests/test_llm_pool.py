@@ -0,0 +1,55 @@
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from app.ai.http_pool import build_http_client, pool_stats
+from app.ai.llm import LLMAdapter, get_llm_adapter
+from app.core.config import Settings
+from app.core.metrics import metrics
+
+
+class _KeepAliveHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self):  # noqa: N802
+        body = b"{}"
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def local_server():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _KeepAliveHandler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{server.server_address[1]}"
+    server.shutdown()
+    server.server_close()
+
+
+def test_pool_reuses_connection(local_server):
+    metrics.reset()
+    with build_http_client(Settings()) as http:
+        for _ in range(3):
+            assert http.get(f"{local_server}/models").status_code == 200
+    assert pool_stats() == {"hits": 2, "misses": 1}
+
+
+def test_llm_adapter_is_process_wide():
+    assert get_llm_adapter() is get_llm_adapter()
+
+
+@pytest.mark.asyncio
+async def test_llm_adapter_aclose_closes_async_pool():
+    adapter = LLMAdapter(Settings(OPENAI_API_KEY="sk-test"))
+    if not adapter.has_openai:
+        pytest.skip("langchain-openai no instalado")
+    await adapter.aclose()
+    assert adapter._http.is_closed and adapter._ahttp.is_closed
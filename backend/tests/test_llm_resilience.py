@@ -0,0 +1,172 @@
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from app.ai.llm import LLMAdapter
+from app.ai.resilience import CircuitBreaker
+from app.ai.scheduler import llm_priority
+from app.core.config import Settings
+from app.core.metrics import metrics
+
+CONTENT = json.dumps({"responsabilidades": ["Desde LLM", "Otra"], "tareas": {}, "mensajes": {"assistant": "ok"}})
+
+
+class _FakeLLMHandler(BaseHTTPRequestHandler):
+    """Imita /chat/completions; el guion del servidor inyecta latencia y fallos por petición."""
+
+    protocol_version = "HTTP/1.1"
+
+    def do_POST(self):  # noqa: N802
+        self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        with self.server.lock:
+            self.server.hits += 1
+            action = self.server.plan.pop(0) if self.server.plan else "ok"
+        if action.startswith("slow:"):
+            time.sleep(float(action.split(":", 1)[1]))
+        status = int(action) if action.isdigit() else 200
+        body = json.dumps(
+            {
+                "id": "chatcmpl-test",
+                "object": "chat.completion",
+                "created": 0,
+                "model": "fake",
+                "choices": [{"index": 0, "message": {"role": "assistant", "content": CONTENT}, "finish_reason": "stop"}],
+            }
+            if status == 200
+            else {"error": {"message": "boom", "type": "server_error"}}
+        ).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+class _QuietServer(ThreadingHTTPServer):
+    def handle_error(self, request, client_address):
+        # Las peticiones perdedoras (hedging/plazo) cierran la conexión: no es un error del test
+        pass
+
+
+@pytest.fixture
+def fake_llm():
+    server = _QuietServer(("127.0.0.1", 0), _FakeLLMHandler)
+    server.lock = threading.Lock()
+    server.hits = 0
+    server.plan = []
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def _adapter(server, **overrides) -> LLMAdapter:
+    settings = Settings(
+        OPENAI_API_KEY="test",
+        OPENAI_BASE_URL=f"http://127.0.0.1:{server.server_address[1]}",
+        LLM_CACHE_ENABLED=False,
+        LLM_RETRY_BASE_DELAY=0.01,
+        **overrides,
+    )
+    return LLMAdapter(settings)
+
+
+def test_retries_transient_errors(fake_llm):
+    metrics.reset()
+    fake_llm.plan = ["500", "503"]
+    llm = _adapter(fake_llm)
+
+    resps, _, _ = llm.extract("ask_resp", "texto libre")
+
+    assert resps == ["Desde LLM", "Otra"]
+    assert fake_llm.hits == 3
+    assert metrics.counter("llm.retries") == 2
+
+
+def test_deadline_falls_back_without_waiting_for_provider(fake_llm):
+    metrics.reset()
+    fake_llm.plan = ["slow:0.8"]
+    llm = _adapter(fake_llm, LLM_CALL_DEADLINE=0.2, LLM_RETRY_ATTEMPTS=1)
+
+    start = time.perf_counter()
+    resps, _, _ = llm.extract("ask_resp", "- Coordinación de equipo")
+
+    assert time.perf_counter() - start < 0.6
+    assert resps == ["Coordinación de equipo"]  # parser heurístico
+    assert metrics.counter("llm.timeouts") == 1
+
+
+def test_open_breaker_skips_provider(fake_llm):
+    metrics.reset()
+    fake_llm.plan = ["500", "500"]
+    llm = _adapter(fake_llm, LLM_RETRY_ATTEMPTS=1, LLM_BREAKER_FAILURE_THRESHOLD=2)
+
+    for _ in range(3):
+        llm.extract("ask_resp", "- Coordinación de equipo")
+
+    assert fake_llm.hits == 2
+    assert llm.resilience.breaker.state == "open"
+    assert metrics.counter("llm.breaker.rejected") == 1
+    assert metrics.counter("llm.route.fallback") == 3
+
+
+def test_breaker_half_open_probe_closes_on_success():
+    clock = [0.0]
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=10, clock=lambda: clock[0])
+    breaker.record_failure()
+    assert not breaker.allow()
+    clock[0] = 10
+    assert breaker.allow()
+    assert breaker.state == "half_open"
+    assert not breaker.allow()  # una sola sonda
+    breaker.record_success()
+    assert breaker.state == "closed"
+
+
+def test_hedged_request_wins_over_slow_primary(fake_llm):
+    metrics.reset()
+    fake_llm.plan = ["slow:0.8"]
+    llm = _adapter(fake_llm, LLM_HEDGE_DELAY=0.1)
+
+    start = time.perf_counter()
+    resps, _, _ = llm.extract("ask_resp", "texto libre")
+
+    assert time.perf_counter() - start < 0.6
+    assert resps == ["Desde LLM", "Otra"]
+    assert metrics.counter("llm.hedge.wins") == 1
+
+
+@pytest.mark.asyncio
+async def test_async_retries_and_hedges(fake_llm):
+    metrics.reset()
+    fake_llm.plan = ["500", "slow:0.8"]
+    llm = _adapter(fake_llm, LLM_HEDGE_DELAY=0.1)
+
+    start = time.perf_counter()
+    resps, _, _ = await llm.aextract("ask_resp", "texto libre")
+
+    assert time.perf_counter() - start < 0.6
+    assert resps == ["Desde LLM", "Otra"]
+    assert metrics.counter("llm.retries") == 1
+    assert metrics.counter("llm.hedge.wins") == 1
+
+
+def test_provider_calls_go_through_scheduler(fake_llm):
+    metrics.reset()
+    llm = _adapter(fake_llm, LLM_RATE_TPM=100000)
+
+    llm.extract("ask_resp", "texto libre")
+    with llm_priority("bulk"):
+        llm.extract("ask_resp", "otro texto")
+
+    timings = metrics.snapshot()["timings"]
+    assert timings["llm.scheduler.wait.interactive"]["count"] == 1
+    assert timings["llm.scheduler.wait.bulk"]["count"] == 1
+    assert llm.scheduler.active("interactive") == llm.scheduler.active("bulk") == 0
@@ -0,0 +1,94 @@
+import asyncio
+
+import pytest
+
+from app.ai.scheduler import LLMScheduler, TokenBucket, llm_priority
+
+
+async def _settle():
+    for _ in range(5):
+        await asyncio.sleep(0)
+
+
+async def _call(sched, klass, order, hold):
+    async with sched.aslot(klass=klass):
+        order.append(klass)
+        await hold.wait()
+
+
+@pytest.mark.asyncio
+async def test_interactive_overtakes_queued_bulk_when_rate_limited():
+    clock = [0.0]
+    sched = LLMScheduler({"interactive": 2, "review": 1, "bulk": 1}, rpm=1, clock=lambda: clock[0])
+    order = []
+    holds = [asyncio.Event() for _ in range(3)]
+
+    tasks = [asyncio.create_task(_call(sched, "interactive", order, holds[0]))]
+    await _settle()
+    tasks.append(asyncio.create_task(_call(sched, "bulk", order, holds[1])))
+    await _settle()
+    tasks.append(asyncio.create_task(_call(sched, "interactive", order, holds[2])))
+    await _settle()
+    assert order == ["interactive"]  # cubo RPM vacío
+
+    clock[0] = 60
+    holds[0].set()
+    await _settle()
+    assert order == ["interactive", "interactive"]  # llegó después, pero va antes
+
+    clock[0] = 120
+    holds[2].set()
+    await _settle()
+    assert order == ["interactive", "interactive", "bulk"]
+    holds[1].set()
+    await asyncio.gather(*tasks)
+
+
+@pytest.mark.asyncio
+async def test_full_bulk_class_does_not_block_interactive():
+    sched = LLMScheduler({"interactive": 1, "review": 1, "bulk": 1})
+    order = []
+    hold = asyncio.Event()
+    tasks = [asyncio.create_task(_call(sched, klass, order, hold)) for klass in ("bulk", "bulk", "interactive")]
+    await _settle()
+    assert order == ["bulk", "interactive"]
+    assert sched.active("bulk") == 1
+    hold.set()
+    await asyncio.gather(*tasks)
+    assert order == ["bulk", "interactive", "bulk"]
+
+
+@pytest.mark.asyncio
+async def test_cancelled_waiter_leaves_the_queue():
+    sched = LLMScheduler({"interactive": 1, "review": 1, "bulk": 1})
+    order = []
+    hold = asyncio.Event()
+    first = asyncio.create_task(_call(sched, "interactive", order, hold))
+    waiting = asyncio.create_task(_call(sched, "interactive", order, hold))
+    await _settle()
+    waiting.cancel()
+    await _settle()
+    hold.set()
+    await first
+    assert order == ["interactive"]
+    assert sched.active("interactive") == 0
+
+
+def test_sync_slot_uses_context_priority():
+    sched = LLMScheduler({"interactive": 1, "review": 1, "bulk": 1})
+    with llm_priority("bulk"):
+        with sched.slot(tokens=10):
+            assert sched.active("bulk") == 1
+    assert sched.active("bulk") == 0
+    with pytest.raises(ValueError):
+        with llm_priority("urgente"):
+            pass
+
+
+def test_token_bucket_refills_per_minute():
+    clock = [0.0]
+    bucket = TokenBucket(600, clock=lambda: clock[0])
+    bucket.take(600)
+    assert bucket.wait_time(10) == pytest.approx(1.0)
+    clock[0] = 1.0
+    assert bucket.wait_time(10) == 0
@@ -0,0 +1,65 @@
+import pytest
+from sqlalchemy import event, insert
+
+from app.core.metrics import metrics
+from app.db.session import engine
+from app.models import Project, Team, User
+from app.models.associations import team_managers
+from app.repositories.org_tree import get_org_tree_cache
+
+ADMIN = {"X-Role": "ADMIN"}
+
+
+def _seed(db, name):
+    project = Project(name=name)
+    manager = User(email=f"{name.replace(' ', '')}@example.com", hashed_password="x", role="MANAGEMENT")
+    db.add_all([project, manager])
+    db.commit()
+    teams = [Team(name=f"Org {i}", project_id=project.id) for i in range(3)]
+    db.add_all(teams)
+    db.commit()
+    db.execute(insert(team_managers), [{"team_id": t.id, "user_id": manager.id} for t in teams])
+    db.commit()
+    # Escrituras directas por ORM: no pasan por las rutas que invalidan
+    get_org_tree_cache().invalidate()
+    return project, manager
+
+
+@pytest.mark.asyncio
+async def test_org_tree_builds_with_fixed_queries_and_revalidates(client, db):
+    project, manager = _seed(db, "Org tree")
+    statements = []
+
+    def _record(conn, cursor, statement, *args):
+        statements.append(statement)
+
+    event.listen(engine, "before_cursor_execute", _record)
+    try:
+        resp = await client.get("/api/v1/org-tree")
+    finally:
+        event.remove(engine, "before_cursor_execute", _record)
+    assert resp.status_code == 200
+    assert len(statements) == 3
+
+    node = next(p for p in resp.json()["projects"] if p["id"] == project.id)
+    assert [t["name"] for t in node["teams"]] == ["Org 0", "Org 1", "Org 2"]
+    assert all([m["id"] for m in t["managers"]] == [manager.id] for t in node["teams"])
+
+    etag = resp.headers["etag"]
+    hits = metrics.counter("org_tree.cache.hits")
+    again = await client.get("/api/v1/org-tree", headers={"If-None-Match": etag})
+    assert again.status_code == 304 and again.content == b""
+    assert metrics.counter("org_tree.cache.hits") == hits + 1
+
+
+@pytest.mark.asyncio
+async def test_org_tree_invalidated_by_mutation_routes(client, db):
+    project, _ = _seed(db, "Org mutations")
+    etag = (await client.get("/api/v1/org-tree")).headers["etag"]
+
+    resp = await client.put(f"/api/v1/projects/{project.id}", json={"name": "Org renombrado"}, headers=ADMIN)
+    assert resp.status_code == 200
+
+    resp = await client.get("/api/v1/org-tree", headers={"If-None-Match": etag})
+    assert resp.status_code == 200 and resp.headers["etag"] != etag
+    assert any(p["name"] == "Org renombrado" for p in resp.json()["projects"])
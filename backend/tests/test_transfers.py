@@ -0,0 +1,136 @@
+from datetime import datetime, timezone
+
+import pytest
+from sqlalchemy import event
+
+from app.api.pagination import decode_cursor
+from app.db.session import engine
+from app.models import Transfer, User
+
+ADMIN = {"X-Role": "ADMIN"}
+
+
+@pytest.mark.asyncio
+async def test_list_transfers_filters_by_pending_step(client, transfer_id):
+    await client.post(f"/api/v1/chat-transfer/{transfer_id}/start")
+    await client.post(f"/api/v1/chat-transfer/{transfer_id}/message", json={"message": "- Coordinación"})
+
+    resp = await client.get("/api/v1/transfers", params={"pending_step": "ask_tasks", "size": 100}, headers=ADMIN)
+    assert resp.status_code == 200
+    assert transfer_id in [t["id"] for t in resp.json()["items"]]
+
+    resp = await client.get("/api/v1/transfers", params={"pending_step": "review", "size": 100}, headers=ADMIN)
+    assert transfer_id not in [t["id"] for t in resp.json()["items"]]
+
+
+@pytest.mark.asyncio
+async def test_list_transfers_rejects_unknown_step(client):
+    resp = await client.get("/api/v1/transfers", params={"pending_step": "nope"}, headers=ADMIN)
+    assert resp.status_code == 422
+
+
+
+def _seed_transfers(db, n):
+    user = User(email=f"cursor{db.query(User).count()}@example.com", hashed_password="x", role="USER")
+    db.add(user)
+    db.commit()
+    # Mismo created_at para casi todas: el desempate por id debe mantener el orden
+    db.add_all([Transfer(position=f"Cursor {i}", outgoing_user_id=user.id, manager_instructions="") for i in range(n)])
+    db.commit()
+
+
+@pytest.mark.asyncio
+async def test_cursor_pagination_walks_transfers_without_gaps(client, db):
+    _seed_transfers(db, 7)
+    expected = (await client.get("/api/v1/transfers", params={"size": 100}, headers=ADMIN)).json()["items"]
+
+    seen, cursor = [], ""
+    while cursor is not None:
+        page = (await client.get("/api/v1/transfers", params={"cursor": cursor, "size": 3}, headers=ADMIN)).json()
+        seen += [t["id"] for t in page["items"]]
+        cursor = page["next_cursor"]
+
+    assert seen == [t["id"] for t in expected]
+
+
+@pytest.mark.asyncio
+async def test_cursor_pagination_with_sub_second_timestamps(client, db):
+    # Fechas explícitas con distintos microsegundos junto a las del valor por defecto
+    user = User(email="mixed@example.com", hashed_password="x", role="USER")
+    db.add(user)
+    db.commit()
+    now = datetime.now(timezone.utc)
+    db.add_all([
+        Transfer(position=f"Mixta {i}", outgoing_user_id=user.id, manager_instructions="",
+                 created_at=now.replace(microsecond=i * 1000))
+        for i in range(4)
+    ])
+    _seed_transfers(db, 4)
+    expected = (await client.get("/api/v1/transfers", params={"size": 100}, headers=ADMIN)).json()["items"]
+    seen, cursor = [], ""
+    while cursor is not None:
+        page = (await client.get("/api/v1/transfers", params={"cursor": cursor, "size": 3}, headers=ADMIN)).json()
+        seen += [t["id"] for t in page["items"]]
+        cursor = page["next_cursor"]
+        if cursor is not None:
+            # El cursor se decodifica al tipo de la columna (se compara como fecha, no como texto)
+            created_at, last_id = decode_cursor(cursor, [Transfer.created_at, Transfer.id])
+            assert isinstance(created_at, datetime) and last_id == seen[-1]
+
+    assert seen == [t["id"] for t in expected]
+
+@pytest.mark.asyncio
+async def test_deep_cursor_page_seeks_the_index(client, db):
+    _seed_transfers(db, 5)
+    first = (await client.get("/api/v1/transfers", params={"cursor": "", "size": 2}, headers=ADMIN)).json()
+    executed = []
+
+    def _record(conn, cursor, statement, parameters, *args):
+        if "FROM transfers" in statement and "LIMIT" in statement:
+            executed.append((statement, parameters))
+
+    event.listen(engine, "before_cursor_execute", _record)
+    try:
+        await client.get("/api/v1/transfers", params={"cursor": first["next_cursor"], "size": 2}, headers=ADMIN)
+    finally:
+        event.remove(engine, "before_cursor_execute", _record)
+
+    # Cursor como parámetros: rango sobre el índice (coste independiente de la profundidad)
+    assert executed
+    with engine.connect() as conn:
+        for statement, parameters in executed:
+            plan = " ".join(row[-1] for row in conn.exec_driver_sql(f"EXPLAIN QUERY PLAN {statement}", parameters))
+            assert "SEARCH transfers USING INDEX ix_transfers_created_at_id" in plan
+            assert "SCAN" not in plan
+
+@pytest.mark.asyncio
+async def test_cursor_pagination_on_projects_and_invalid_cursor(client):
+    for i in range(3):
+        await client.post("/api/v1/projects", json={"name": f"Cursor {i}"}, headers=ADMIN)
+    first = (await client.get("/api/v1/projects", params={"cursor": "", "size": 2})).json()
+    second = (await client.get("/api/v1/projects", params={"cursor": first["next_cursor"], "size": 2})).json()
+    ids = [p["id"] for p in first["items"] + second["items"]]
+    assert ids == sorted(ids) and len(set(ids)) == len(ids)
+
+    assert (await client.get("/api/v1/projects", params={"cursor": "no-es-un-cursor"})).status_code == 400
+
+
+@pytest.mark.asyncio
+async def test_list_transfers_selects_columns_without_joining_users(client, db):
+    _seed_transfers(db, 3)
+    statements = []
+
+    def _record(conn, cursor, statement, *args):
+        statements.append(statement)
+
+    event.listen(engine, "before_cursor_execute", _record)
+    try:
+        items = (await client.get("/api/v1/transfers", params={"size": 3}, headers=ADMIN)).json()["items"]
+    finally:
+        event.remove(engine, "before_cursor_execute", _record)
+
+    listing = [s for s in statements if "FROM transfers" in s and "LIMIT" in s]
+    assert listing and all("users" not in s for s in listing)
+    # Misma representación que el detalle (model_validate de la entidad)
+    for item in items:
+        assert item == (await client.get(f"/api/v1/transfers/{item['id']}", headers=ADMIN)).json()
@@ -1,6 +1,13 @@
 import { useContext, useMemo } from "react";
 import RoleContext from "../context/roleContext";
 
+// Una clave por operación lógica: los reintentos de esa operación la reutilizan
+// para que el backend devuelva la respuesta guardada en lugar de repetirla
+export function newIdempotencyKey() {
+  if (globalThis.crypto?.randomUUID) return globalThis.crypto.randomUUID();
+  return `${Date.now().toString(36)}-${Math.random().toString(36).slice(2)}`;
+}
+
 function buildBaseUrl() {
   const base = (import.meta.env.VITE_API_URL || "http://localhost:8000").replace(/\/$/, "");
   return `${base}/api/v1`;
@@ -30,14 +37,17 @@ export default function useApi() {
     }
     if (!res.ok) {
       const message = (data && data.detail) || data || `HTTP ${res.status}`;
-      throw new Error(message);
+      const error = new Error(message);
+      error.status = res.status;
+      error.retryAfter = Number(res.headers.get("Retry-After")) || null;
+      throw error;
     }
     return data;
   }
 
   return {
     get: (path) => request(path, { method: "GET" }),
-    post: (path, body) => request(path, { method: "POST", body }),
+    post: (path, body, headers) => request(path, { method: "POST", body, headers }),
     put: (path, body) => request(path, { method: "PUT", body }),
     del: (path) => request(path, { method: "DELETE" }),
     baseUrl,
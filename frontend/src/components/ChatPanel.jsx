@@ -1,8 +1,16 @@
 import { useEffect, useRef, useState } from "react";
-import useApi from "../api/useApi";
+import useApi, { newIdempotencyKey } from "../api/useApi";
+
+// Respuestas tras las que se reintenta el mismo envío (misma Idempotency-Key)
+const RETRYABLE_STATUS = new Set([409, 429, 503]);
+const MAX_ATTEMPTS = 3;
+
+function sleep(ms) {
+  return new Promise((resolve) => setTimeout(resolve, ms));
+}
 
 export default function ChatPanel() {
-  const { post } = useApi();
+  const { get, post } = useApi();
 
   const [transferIdInput, setTransferIdInput] = useState("");
   const [activeTransferId, setActiveTransferId] = useState(null);
@@ -21,21 +29,51 @@ export default function ChatPanel() {
   const [sending, setSending] = useState(false);
   const [error, setError] = useState("");
   const endRef = useRef(null);
+  // Último envío sin respuesta: si se reenvía el mismo texto, reutiliza su clave
+  const pendingSendRef = useRef(null);
 
   useEffect(() => {
     endRef.current?.scrollIntoView({ behavior: "smooth" });
   }, [messages.length]);
 
-  function threadToMessages(thread = []) {
+  // POST con Idempotency-Key; los reintentos (red caída, 409/429/503) repiten la
+  // misma clave, así un turno que ya se procesó no se vuelve a ejecutar
+  async function postIdempotent(path, body, key) {
+    for (let attempt = 1; ; attempt++) {
+      try {
+        return await post(path, body, { "Idempotency-Key": key });
+      } catch (e) {
+        const retryable = e.status == null || RETRYABLE_STATUS.has(e.status);
+        if (!retryable || attempt >= MAX_ATTEMPTS) throw e;
+        await sleep((e.retryAfter || attempt) * 1000);
+      }
+    }
+  }
+
+  // Turnos del backend ({seq, role, content}); el seq da un id estable
+  function turnsToMessages(turns = []) {
     const now = Date.now();
-    return thread.map((t, i) => ({
-      id: `${t.role}-${now}-${i}`,
+    return turns.map((t) => ({
+      id: `t-${t.seq}`,
       role: t.role,
       content: t.content,
-      ts: now + i,
+      ts: now + t.seq,
     }));
   }
 
+  // Historial completo por páginas (cursor = último seq recibido)
+  async function loadThread(transferId) {
+    const turns = [];
+    let after = -1;
+    for (;;) {
+      const page = await get(`/chat-transfer/${transferId}/thread?after=${after}&limit=200`);
+      turns.push(...(page?.items || []));
+      if (page?.next_cursor == null) break;
+      after = page.next_cursor;
+    }
+    return turnsToMessages(turns);
+  }
+
   async function handleStart() {
     const idNum = Number(transferIdInput);
     if (!idNum || Number.isNaN(idNum) || idNum <= 0) {
@@ -45,9 +83,8 @@ export default function ChatPanel() {
     setSending(true);
     setError("");
     try {
-      const data = await post(`/chat-transfer/${idNum}/start`, {});
-      const thread = data?.state?.thread || [];
-      const msgs = threadToMessages(thread);
+      const data = await postIdempotent(`/chat-transfer/${idNum}/start?view=delta`, {}, newIdempotencyKey());
+      const msgs = await loadThread(idNum);
       const assistant = data?.assistant;
       const merged =
         assistant && (!msgs.length || msgs[msgs.length - 1]?.content !== assistant)
@@ -102,18 +139,17 @@ export default function ChatPanel() {
     setMessages((prev) => [...prev, userMsg]);
     setInput("");
 
-    try {
-      const data = await post(`/chat-transfer/${currentId}/message`, { message: text });
-      // Sincroniza con el hilo devuelto por el backend para evitar duplicados
-      const thread = data?.state?.thread || [];
-      const synced = threadToMessages(thread);
-      const assistant = data?.assistant;
-      const merged =
-        assistant && (!synced.length || synced[synced.length - 1]?.content !== assistant)
-          ? [...synced, { id: "a-" + Date.now(), role: "assistant", content: assistant, ts: Date.now() }]
-          : synced;
+    const pending = pendingSendRef.current;
+    const key =
+      pending && pending.transferId === currentId && pending.text === text ? pending.key : newIdempotencyKey();
+    pendingSendRef.current = { transferId: currentId, text, key };
 
-      setMessages(merged);
+    try {
+      const data = await postIdempotent(`/chat-transfer/${currentId}/message?view=delta`, { message: text }, key);
+      pendingSendRef.current = null;
+      // Solo llegan los turnos nuevos: sustituyen al mensaje optimista
+      const added = turnsToMessages(data?.turns || []);
+      setMessages((prev) => [...prev.filter((m) => m.id !== userMsg.id), ...added]);
       setPendingStep(data?.pending_step || null);
       setActiveTransferId(currentId);
     } catch (e) {